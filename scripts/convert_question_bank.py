@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+题库格式转换脚本
+
+将 questions/ 下按类型划分的 JSON 题库转换为 JSONL 题库（每行一道题）及其偏移索引
+（<输出>.idx.npy、<输出>.ids.npy）。questions/bank.jsonl 存在时应用以 mmap 方式读取题库，
+启动时不再整体加载。也可用 --input 追加导入额外的 JSONL/JSON 题目（如教师出题）。
+
+用法: python scripts/convert_question_bank.py [--output questions/bank.jsonl] [--input extra.jsonl ...]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    from src.core.question_store import JSONL_BANK_PATH
+
+    parser = argparse.ArgumentParser(description="将JSON题库转换为 JSONL + 偏移索引")
+    parser.add_argument("--output", default=JSONL_BANK_PATH, help="输出的 JSONL 文件路径")
+    parser.add_argument("--input", nargs="*", default=[], help="额外导入的题目文件（.jsonl 或 JSON 数组）")
+    parser.add_argument("--no-bank", action="store_true", help="不包含 questions/ 下的现有JSON题库")
+    return parser.parse_args()
+
+
+def iter_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    from src.core.question_bank import FILE_MAP, QUESTIONS_DIR, ensure_question_files
+    from src.core.question_store import write_jsonl_bank
+
+    def iter_items():
+        if not args.no_bank:
+            ensure_question_files()
+            for fname in FILE_MAP.values():
+                yield from iter_file(str(Path(QUESTIONS_DIR) / fname))
+        for path in args.input:
+            yield from iter_file(path)
+
+    started = time.time()
+    summary = write_jsonl_bank(iter_items(), args.output)
+    print(f"✅ 已写入 {summary['written']} 道题到 {args.output}（跳过 {summary['skipped']} 条无效题目，"
+          f"耗时 {time.time() - started:.1f}s）")
+
+
+if __name__ == "__main__":
+    main()
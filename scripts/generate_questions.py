@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+大规模题库生成脚本
+
+枚举题干模板 × 填充项 × 数量要求 × 附加要求的组合空间，多进程生成、按内容去重后写入 JSONL 题库
+（默认 questions/bank.jsonl，应用运行中会自动热更新）。可通过 --slots 提供额外的填充项，
+或用 --expand 请LLM为每个槽位补充新的主题/物品/问题/场景。
+
+用法: python scripts/generate_questions.py [--per-type 250000] [--workers 8] [--expand 200]
+      [--slots slots.json] [--output questions/bank.jsonl] [--no-existing] [--keep-shards DIR]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 加载环境变量
+load_dotenv()
+
+
+def parse_args():
+    from src.core.question_store import JSONL_BANK_PATH
+
+    parser = argparse.ArgumentParser(description="生成大规模去重题库")
+    parser.add_argument("--per-type", type=int, default=None, help="每个题型最多枚举的组合数（默认全部）")
+    parser.add_argument("--workers", type=int, default=None, help="生成进程数")
+    parser.add_argument("--output", default=JSONL_BANK_PATH, help="输出的 JSONL 题库路径")
+    parser.add_argument("--slots", default=None, help="额外填充项 JSON 文件，如 {\"主题\": [\"纸杯\"], \"场景\": [...]}")
+    parser.add_argument("--expand", type=int, default=0, help="请LLM为每个槽位补充的新值个数（0 表示不调用LLM）")
+    parser.add_argument("--concurrency", type=int, default=None, help="LLM扩充时的并发请求数")
+    parser.add_argument("--no-existing", action="store_true", help="不合并 questions/ 下的现有JSON题库及输出路径处已有的 JSONL 题库")
+    parser.add_argument("--keep-shards", default=None, help="保留分片文件到该目录")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    from src.core.question_generator import DEFAULT_SLOT_VALUES, aexpand_slot_values, generate_question_bank
+
+    slot_values = {k: list(v) for k, v in DEFAULT_SLOT_VALUES.items()}
+    if args.slots:
+        with open(args.slots, "r", encoding="utf-8") as f:
+            for slot, values in json.load(f).items():
+                if slot not in slot_values:
+                    print(f"❌ 未知的槽位: {slot}（可选: {'、'.join(slot_values)}）")
+                    sys.exit(1)
+                slot_values[slot] = list(dict.fromkeys(slot_values[slot] + list(values)))
+
+    if args.expand > 0:
+        from langchain_openai import ChatOpenAI
+        from src.core.config import Config
+        from src.core.event_loop import run_sync
+        from src.core.http_transport import chat_client_kwargs
+
+        llm = ChatOpenAI(openai_api_key=Config.api_key, model=Config.model_name_a, base_url=Config.base_url,
+                         temperature=0.9, timeout=60, max_retries=2, **chat_client_kwargs())
+        print(f"🤖 正在请LLM为每个槽位补充约 {args.expand} 个新值...")
+        slot_values = run_sync(aexpand_slot_values(llm, slot_values, args.expand, args.concurrency))
+    print("🧩 填充项数量: " + "，".join(f"{k} {len(v)}" for k, v in slot_values.items()))
+
+    summary = generate_question_bank(
+        per_type=args.per_type,
+        output=args.output,
+        slot_values=slot_values,
+        workers=args.workers,
+        include_existing=not args.no_existing,
+        shard_dir=args.keep_shards,
+        keep_shards=bool(args.keep_shards),
+    )
+    print(f"✅ 已生成 {summary['written']} 道题（候选 {summary['candidates']}，去重后 {summary['unique']}，"
+          f"产出率 {summary['yield']:.1%}，现有题目 {summary['existing']}），耗时 {summary['elapsed_seconds']:.1f}s")
+    print(json.dumps(summary["types"], ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+离线测评批量导入脚本
+
+读取纸笔测评誊录的 JSONL（每行一名学生，格式见 src/core/ingestion.py），并行评分后写入
+学生档案、测评会话与测评结果，结束时输出吞吐（answers/s）与失败明细。已导入的会话会被跳过，
+因此中断后可直接重新运行。
+
+用法: python scripts/ingest.py transcripts.jsonl [--concurrency 16] [--failures failed.jsonl]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 加载环境变量
+load_dotenv()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="批量导入离线测评答案并评分")
+    parser.add_argument("path", help="JSONL 文件路径")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时处理的学生数")
+    parser.add_argument("--failures", default=None, help="将失败明细写入该 JSONL 文件")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    if not Path(args.path).exists():
+        print(f"❌ 文件不存在: {args.path}")
+        sys.exit(1)
+
+    from src.core.creativity_graph import CreativityAssessmentGraph
+
+    graph = CreativityAssessmentGraph()
+    print(f"📥 开始导入: {args.path}")
+    summary = graph.ingest_jsonl(args.path, concurrency=args.concurrency)
+
+    failures = summary.pop("failures")
+    if args.failures and failures:
+        with open(args.failures, "w", encoding="utf-8") as f:
+            for item in failures:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    print("✅ 导入完成" if not summary["failed"] else "⚠️  导入完成（部分失败）")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    for item in failures[:20]:
+        print(f"  第 {item['line']} 行 ({item['student_id']}): {item['error']}")
+
+
+if __name__ == "__main__":
+    main()
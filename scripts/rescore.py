@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+历史答案批量重新评分脚本
+
+更换评分模型（SILICONFLOW_MODEL_CHAT_A/B）或评分提示词（需同时提升 EVALUATION_PROMPT_VERSION）后，
+对 assessment_sessions 中的历史答案重新评分并覆盖 assessment_results。进度按任务名保存在
+rescore_checkpoints 表中，中断后以相同 --job 重新运行即可从断点继续。
+
+用法: python scripts/rescore.py --job model-v2 [--chunk-size 20] [--concurrency 8] [--limit N] [--restart]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 加载环境变量
+load_dotenv()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="批量重新评分历史答案")
+    parser.add_argument("--job", default="default", help="任务名，用于断点续跑")
+    parser.add_argument("--chunk-size", type=int, default=None, help="每次读取并提交的会话数")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时评分的答案数上限")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多处理的会话数")
+    parser.add_argument("--restart", action="store_true", help="忽略已有断点，从头开始")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    from src.core.creativity_graph import CreativityAssessmentGraph
+    from src.core.rescoring import BulkRescorer
+
+    rescorer = BulkRescorer(CreativityAssessmentGraph(), job_id=args.job,
+                            chunk_size=args.chunk_size, concurrency=args.concurrency)
+    if args.restart:
+        rescorer.reset()
+    checkpoint = rescorer.db.get_rescore_checkpoint(args.job)
+    if checkpoint:
+        print(f"🔁 从断点继续: 已完成 {checkpoint['sessions_done']} 个会话（最后 {checkpoint['last_session_id']}）")
+
+    try:
+        stats = rescorer.run(max_sessions=args.limit)
+    except KeyboardInterrupt:
+        print("\n⏸️  已中断，重新运行相同 --job 即可继续")
+        sys.exit(130)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        print("评分服务恢复后重新运行相同 --job 即可从断点继续")
+        sys.exit(1)
+    print("✅ 重新评分完成")
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,11 @@ import time
 import uuid
 
 from src.core.creativity_graph import CreativityAssessmentGraph
+from src.core.scoring_queue import ScoringQueue
+from src.core.rescoring import build_assessment_result
 from src.analysis.analysis import CreativityAnalyzer
 from src.data.database import DatabaseManager
-from src.data.models import StudentProfile, AssessmentResult, CreativityScore, CreativityDimension
+from src.data.models import StudentProfile, AssessmentResult, AssessmentSession, Answer, CreativityScore, CreativityDimension
 from src.core.config import Config
 from src.core.logging_utils import get_app_logger
 
@@ -31,8 +33,10 @@ st.set_page_config(
 @st.cache_resource
 def init_components():
     """初始化组件"""
+    graph = CreativityAssessmentGraph()
     return {
-        "graph": CreativityAssessmentGraph(),
+        "graph": graph,
+        "scorer": ScoringQueue(graph),
         "analyzer": CreativityAnalyzer(),
         "db": DatabaseManager()
     }
@@ -116,11 +120,13 @@ def start_assessment(student_profile: StudentProfile):
     st.session_state.answers = []
     st.session_state.evaluations = []  # 累计每题评分
     st.session_state.start_time = datetime.now()
-    st.session_state.session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    # 秒级时间戳之外加随机后缀：同一秒开始测评的学生不会共用评分队列中的任务
+    st.session_state.session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
     # 生成题目
     with st.spinner("正在生成测评题目..."):
-        questions = components["graph"].create_questions(Config.MAX_QUESTIONS)
+        questions = components["graph"].create_questions(Config.MAX_QUESTIONS, student_profile.student_id)
+    # 题目在 save_completed_assessment 保存测评时计入该学生的已做集合，下次测评不再重复
 
     st.session_state.questions = questions
 
@@ -177,6 +183,11 @@ def display_assessment_interface():
         if st.session_state.get(confirmed_answer_key, "") != st.session_state.get(answer_key, ""):
             st.session_state[confirm_flag_key] = False
 
+    # 已确认答案的本地即时预估（不调用LLM）
+    if st.session_state.get(confirm_flag_key, False):
+        provisional = components["graph"].provisional_score(st.session_state.get(confirmed_answer_key, ""))
+        st.caption(f"即时预估：流畅性 {provisional['fluency']:.1f} · 精细性 {provisional['elaboration']:.1f}（最终得分以AI评分为准）")
+
     col_next, col_end = st.columns([1, 3])
     with col_next:
         next_disabled = not st.session_state.get(confirm_flag_key, False)
@@ -187,15 +198,9 @@ def display_assessment_interface():
             else:
                 # 保存答案
                 save_answer(question, final_answer)
-                # 评分并累计
-                with st.spinner("正在评分..."):
-                    scores = components["graph"].score_answer(question.content, final_answer)
-                _app_log.info("score_done: qid=%s scores=%s", question.id, scores)
-                st.session_state.evaluations.append({
-                    "question_id": question.id,
-                    "scores": scores,
-                    "timestamp": datetime.now(),
-                })
+                # 提交后台评分，不阻塞进入下一题
+                components["scorer"].submit(st.session_state.session_id, question.id, question.content, final_answer)
+                _app_log.info("score_submitted: qid=%s", question.id)
                 st.session_state.current_question += 1
                 st.rerun()
     with col_end:
@@ -220,48 +225,52 @@ def complete_assessment():
     """完成测评"""
     st.session_state.assessment_in_progress = False
     
+    # 等待后台评分队列中尚未完成的评分
+    with st.spinner("正在汇总评分..."):
+        scored = components["scorer"].collect(st.session_state.session_id)
+    questions_by_id = {q.id: q for q in st.session_state.questions}
+    for ans in st.session_state.answers:
+        scores = scored.get(ans["question_id"])
+        if scores is None:
+            continue
+        _app_log.info("score_done: qid=%s scores=%s", ans["question_id"], scores)
+        # 评分完成后再收录进独创性语料，避免答案自身的词项降低其稀有度
+        components["graph"].originality.add_answer(questions_by_id[ans["question_id"]].content, ans["content"])
+        st.session_state.evaluations.append({
+            "question_id": ans["question_id"],
+            "scores": scores,
+            "timestamp": datetime.now(),
+        })
+
     # 生成测评结果（基于累计评分）
-    questions = st.session_state.questions
     evaluations = st.session_state.evaluations
     student_profile = st.session_state.student_profile
 
-    # 汇总各维度平均分
-    totals = {d.value: 0.0 for d in CreativityDimension}
-    n = max(1, len(evaluations))
-    for ev in evaluations:
-        s = ev["scores"]
-        for d in totals:
-            totals[d] += float(s.get(d, 0))
-    for d in totals:
-        totals[d] /= n
-
-    # 转为 CreativityScore 列表
-    dimension_scores = []
-    for dimension in CreativityDimension:
-        score = float(totals[dimension.value])
-        dimension_scores.append(CreativityScore(
-            dimension=dimension,
-            score=score,
-            max_score=10.0,
-            percentage=score * 10
-        ))
-
-    total_score = sum(s.score for s in dimension_scores)
-    overall_level = "优秀" if total_score >= 35 else "良好" if total_score >= 30 else "一般"
-
-    assessment_result = AssessmentResult(
+    # 汇总各维度平均分（LLM不可用而延后评分的题目不计入）
+    deferred_count = sum(1 for ev in evaluations if ev["scores"].get("deferred"))
+    if deferred_count:
+        st.info(f"有 {deferred_count} 道题因评分服务暂不可用将稍后重新评分，当前结果仅基于已评分题目。")
+    assessment_result = build_assessment_result(
+        st.session_state.session_id,
+        student_profile.student_id,
+        student_profile.name,
+        [ev["scores"] for ev in evaluations],
+    )
+    total_score = assessment_result.total_score
+
+    # 会话与结果一并保存：有题目延后评分时，重新评分任务据此重建结果
+    session_data = AssessmentSession(
         session_id=st.session_state.session_id,
         student_id=student_profile.student_id,
         student_name=student_profile.name,
-        total_score=total_score,
-        dimension_scores=dimension_scores,
-        overall_level=overall_level,
-        recommendations=["继续努力，保持创新思维！"],
-        completed_at=datetime.now()
+        start_time=st.session_state.start_time,
+        end_time=datetime.now(),
+        questions=st.session_state.questions,
+        answers=[Answer(student_id=student_profile.student_id, scores=scored.get(ans["question_id"]), **ans)
+                 for ans in st.session_state.answers],
+        status="completed",
     )
-
-    # 保存结果
-    components["db"].save_assessment_result(assessment_result)
+    components["db"].save_completed_assessment(student_profile, session_data, assessment_result)
     _app_log.info("complete_assessment: session=%s total=%.2f", st.session_state.session_id, total_score)
 
     # 显示结果
@@ -0,0 +1,190 @@
+"""
+LangGraph 检查点持久化：测评工作流每个节点完成后将 GraphState 写入数据库，按会话ID续跑
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.serde.types import TASKS
+
+from src.core.config import Config
+from src.data.database import DatabaseManager
+from src.data.models import Answer, CreativityDimension, Question, QuestionType
+
+_QUESTION = "__q"
+_ANSWER = "__a"
+_COMPACT_TYPE = "assessment"
+
+
+def _compact(obj: Any) -> Any:
+    if isinstance(obj, Question):
+        return {_QUESTION: [obj.id, obj.type.value, obj.title, obj.content, obj.time_limit,
+                            [d.value for d in obj.dimensions], obj.scoring_criteria]}
+    if isinstance(obj, Answer):
+        fields = [obj.question_id, obj.student_id, obj.content, obj.timestamp.isoformat(), obj.time_spent]
+        return {_ANSWER: fields if obj.scores is None else fields + [obj.scores]}
+    if isinstance(obj, dict):
+        return {k: _compact(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_compact(v) for v in obj]
+    return obj
+
+
+def _revive(obj: Any) -> Any:
+    if isinstance(obj, list):
+        return [_revive(v) for v in obj]
+    if not isinstance(obj, dict):
+        return obj
+    if len(obj) == 1:
+        if _QUESTION in obj:
+            qid, qtype, title, content, time_limit, dimensions, criteria = obj[_QUESTION]
+            return Question(id=qid, type=QuestionType(qtype), title=title, content=content, time_limit=time_limit,
+                            dimensions=[CreativityDimension(d) for d in dimensions], scoring_criteria=criteria)
+        if _ANSWER in obj:
+            question_id, student_id, content, timestamp, time_spent, *scores = obj[_ANSWER]
+            return Answer(question_id=question_id, student_id=student_id, content=content,
+                          timestamp=datetime.fromisoformat(timestamp), time_spent=time_spent,
+                          scores=scores[0] if scores else None)
+    return {k: _revive(v) for k, v in obj.items()}
+
+
+class AssessmentSerializer(JsonPlusSerializer):
+    """Question/Answer 按字段顺序编码为紧凑数组（不写类路径与字段名），再交给默认的 msgpack 编码。
+
+    只使用 JsonPlusSerializer 的公开接口 dumps_typed/loads_typed；默认编码不是 msgpack 时按原样回退。
+    """
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        type_, data = super().dumps_typed(_compact(obj))
+        if type_ == "msgpack":
+            return _COMPACT_TYPE, data
+        return super().dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_ == _COMPACT_TYPE:
+            return _revive(super().loads_typed(("msgpack", data_)))
+        return super().loads_typed(data)
+
+
+class DatabaseCheckpointSaver(BaseCheckpointSaver[int]):
+    """基于 DatabaseManager（默认即应用的 SQLite 库）的检查点存储，thread_id 使用测评会话ID。"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, keep: Optional[int] = None):
+        super().__init__(serde=AssessmentSerializer())
+        self.db = db or DatabaseManager()
+        # 每个会话保留的检查点数（续跑只需最新一个，父检查点用于恢复待发送任务）
+        self.keep = Config.GRAPH_CHECKPOINT_KEEP if keep is None else keep
+
+    def _to_tuple(self, row: Dict[str, Any]) -> CheckpointTuple:
+        thread_id, checkpoint_ns = row["thread_id"], row["checkpoint_ns"]
+        checkpoint_id, parent_id = row["checkpoint_id"], row["parent_checkpoint_id"]
+        writes = self.db.get_graph_writes(thread_id, checkpoint_ns, checkpoint_id)
+        sends = []
+        if parent_id:
+            sends = [value for _, channel, value in self.db.get_graph_writes(thread_id, checkpoint_ns, parent_id)
+                     if channel == TASKS]
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint={
+                **self.serde.loads_typed(row["checkpoint"]),
+                "pending_sends": [self.serde.loads_typed(s) for s in sends],
+            },
+            metadata=self.serde.loads_typed(row["metadata"]),
+            parent_config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": parent_id,
+            }} if parent_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value)) for task_id, channel, value in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        row = self.db.get_graph_checkpoint(configurable["thread_id"], configurable.get("checkpoint_ns", ""),
+                                           get_checkpoint_id(config))
+        return self._to_tuple(row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        configurable = (config or {}).get("configurable", {})
+        checkpoint_id = get_checkpoint_id(config) if config else None
+        rows = self.db.list_graph_checkpoints(
+            configurable.get("thread_id"), configurable.get("checkpoint_ns"),
+            get_checkpoint_id(before) if before else None,
+            None if filter or checkpoint_id else limit,
+        )
+        for row in rows:
+            if checkpoint_id and row["checkpoint_id"] != checkpoint_id:
+                continue
+            item = self._to_tuple(row)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield item
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)  # type: ignore[misc]
+        configurable = config["configurable"]
+        thread_id, checkpoint_ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        self.db.put_graph_checkpoint(thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"),
+                                     self.serde.dumps_typed(c), self.serde.dumps_typed(metadata), self.keep)
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        configurable = config["configurable"]
+        self.db.put_graph_writes(
+            configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"], task_id,
+            [(WRITES_IDX_MAP.get(channel, idx), channel, self.serde.dumps_typed(value))
+             for idx, (channel, value) in enumerate(writes)],
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """删除会话的全部检查点与写入（测评正常结束后调用）。"""
+        self.db.delete_graph_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
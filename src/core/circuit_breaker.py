@@ -0,0 +1,138 @@
+"""
+LLM端点熔断器：closed / open / half-open 三态，按最近调用的失败率（含超时）触发
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+
+_log = get_app_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器处于打开状态，调用被直接拒绝。"""
+
+
+class CircuitBreaker:
+    """滑动窗口失败率熔断器。"""
+
+    def __init__(self, name: str,
+                 failure_rate_threshold: Optional[float] = None,
+                 window: Optional[int] = None,
+                 min_calls: Optional[int] = None,
+                 open_seconds: Optional[float] = None,
+                 half_open_max_calls: Optional[int] = None):
+        self.name = name
+        self.failure_rate_threshold = Config.CIRCUIT_FAILURE_RATE if failure_rate_threshold is None else failure_rate_threshold
+        self.min_calls = Config.CIRCUIT_MIN_CALLS if min_calls is None else min_calls
+        self.open_seconds = Config.CIRCUIT_OPEN_SECONDS if open_seconds is None else open_seconds
+        self.half_open_max_calls = Config.CIRCUIT_HALF_OPEN_CALLS if half_open_max_calls is None else half_open_max_calls
+        self._outcomes: Deque[bool] = deque(maxlen=Config.CIRCUIT_WINDOW if window is None else window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._half_open_in_flight = 0
+            _log.info("circuit %s -> half_open", self.name)
+        return self._state
+
+    def allows_request(self) -> bool:
+        """不改变计数地判断当前是否允许调用。"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == CLOSED or (state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls)
+
+    def before_call(self) -> None:
+        """调用前检查；打开状态或半开探测名额已满时抛出 CircuitOpenError。"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"circuit {self.name} is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+                _log.info("circuit %s -> closed", self.name)
+            self._outcomes.append(True)
+
+    def record_failure(self, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            if self._state == CLOSED and calls >= self.min_calls and failures / calls >= self.failure_rate_threshold:
+                self._trip()
+
+    def record_cancelled(self) -> None:
+        """调用被取消（未得到结果）时归还半开探测名额。"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_in_flight = 0
+        self._outcomes.clear()
+        _log.warning("circuit %s -> open for %.0fs", self.name, self.open_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self._current_state(time.monotonic()),
+                "window_calls": calls,
+                "window_failures": calls - sum(self._outcomes),
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(base_url: Optional[str], model: Optional[str]) -> CircuitBreaker:
+    """获取进程级共享的熔断器（按端点与模型区分）。"""
+    name = f"{base_url or 'default'}#{model or 'default'}"
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def circuit_stats() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {name: b.stats() for name, b in breakers.items()}
@@ -32,6 +32,115 @@ class Config:
     MAX_QUESTIONS = int(os.getenv("MAX_QUESTIONS", 10))
     TIME_LIMIT_MINUTES = int(os.getenv("TIME_LIMIT_MINUTES", 30))
     
+    # 评分缓存配置
+    SCORE_CACHE_ENABLED = os.getenv("SCORE_CACHE_ENABLED", "True").lower() == "true"
+    SCORE_CACHE_TTL_SECONDS = int(os.getenv("SCORE_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+    SCORE_CACHE_MAX_ENTRIES = int(os.getenv("SCORE_CACHE_MAX_ENTRIES", 100000))
+    
+    # 批量评分：每次LLM调用打包的答案数
+    SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", 5))
+    
+    # 后台评分队列的并发 worker 数
+    SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", 8))
+    
+    # 延迟预算（秒，0 表示关闭）：超出后若已有一个Agent返回则直接采用其结果
+    SCORING_LATENCY_BUDGET = float(os.getenv("SCORING_LATENCY_BUDGET", 0))
+    # 对冲请求：单个Agent耗时超过其历史分位数时向同一模型补发一次请求
+    SCORING_HEDGE_ENABLED = os.getenv("SCORING_HEDGE_ENABLED", "False").lower() == "true"
+    SCORING_HEDGE_PERCENTILE = float(os.getenv("SCORING_HEDGE_PERCENTILE", 95))
+    SCORING_HEDGE_MIN_SAMPLES = int(os.getenv("SCORING_HEDGE_MIN_SAMPLES", 20))
+    
+    # 自适应复评：先由Agent A评分，仅在必要时调用Agent B
+    SCORING_ADAPTIVE = os.getenv("SCORING_ADAPTIVE", "False").lower() == "true"
+    # Agent A 四维平均分落在该区间内时视为不确定，需要复评
+    SCORING_UNCERTAINTY_BAND = tuple(float(x) for x in os.getenv("SCORING_UNCERTAINTY_BAND", "4.0,8.0").split(","))
+    # 确定性较高时仍随机复评的比例（用于评分者一致性统计）
+    SCORING_SECOND_OPINION_RATE = float(os.getenv("SCORING_SECOND_OPINION_RATE", 0.1))
+    # 归一化后短于该字符数的答案不做复评
+    SCORING_TRIVIAL_ANSWER_CHARS = int(os.getenv("SCORING_TRIVIAL_ANSWER_CHARS", 5))
+    
+    # 多评分者集成：JSON列表，如 [{"model": "m1", "temperature": 0}, {"model": "m2", "role_hint": "..."}]；
+    # 为空时使用默认的双Agent评分
+    SCORING_RATERS = os.getenv("SCORING_RATERS", "")
+    # 达到法定人数的评分者各维度分差均不超过容差时提前结束，取消其余调用
+    SCORING_QUORUM = int(os.getenv("SCORING_QUORUM", 2))
+    SCORING_AGREEMENT_TOLERANCE = float(os.getenv("SCORING_AGREEMENT_TOLERANCE", 1.0))
+    # 聚合方式：median / trimmed_mean / mean
+    SCORING_AGGREGATION = os.getenv("SCORING_AGGREGATION", "median")
+    SCORING_TRIM_FRACTION = float(os.getenv("SCORING_TRIM_FRACTION", 0.2))
+    
+    # 流式评分：逐块解析模型输出，四个维度分数齐全且评语达到指定字符数后即停止读取
+    SCORING_STREAM_ENABLED = os.getenv("SCORING_STREAM_ENABLED", "False").lower() == "true"
+    SCORING_STREAM_EARLY_STOP = os.getenv("SCORING_STREAM_EARLY_STOP", "True").lower() == "true"
+    SCORING_STREAM_COMMENT_CHARS = int(os.getenv("SCORING_STREAM_COMMENT_CHARS", 200))
+    
+    # 合并相同（题目, 答案, 模型）的并发评分请求，只调用一次LLM
+    SCORING_SINGLEFLIGHT_ENABLED = os.getenv("SCORING_SINGLEFLIGHT_ENABLED", "True").lower() == "true"
+    
+    # 评分调用重试：限流/服务端错误指数退避（含抖动，遵循 Retry-After），传输错误快速重试，
+    # 输出无法解析时重新请求；SCORING_DEADLINE_SECONDS 为单次评分的总时限（0 表示不限）
+    SCORING_RETRY_MAX_ATTEMPTS = int(os.getenv("SCORING_RETRY_MAX_ATTEMPTS", 3))
+    SCORING_RETRY_BASE_DELAY = float(os.getenv("SCORING_RETRY_BASE_DELAY", 0.5))
+    SCORING_RETRY_MAX_DELAY = float(os.getenv("SCORING_RETRY_MAX_DELAY", 8.0))
+    SCORING_RETRY_TRANSPORT_DELAY = float(os.getenv("SCORING_RETRY_TRANSPORT_DELAY", 0.1))
+    SCORING_PARSE_RETRIES = int(os.getenv("SCORING_PARSE_RETRIES", 1))
+    SCORING_DEADLINE_SECONDS = float(os.getenv("SCORING_DEADLINE_SECONDS", 45))
+    
+    # LLM限流：全局并发上限，以及每个模型的每秒请求数 / 每分钟Token数（0 表示不限）
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+    LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", 0))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 0))
+    # 按模型覆盖，如 {"deepseek-ai/DeepSeek-V3": {"rps": 5, "tpm": 100000}}
+    LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+    LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", 300))
+    
+    # 熔断器：最近 CIRCUIT_WINDOW 次调用中失败率（含超时）达到阈值即打开，打开期间快速失败
+    CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5))
+    CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", 20))
+    CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", 5))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+    CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", 1))
+    
+    # 统计独创性：同题历史答案少于该数量时不给出统计分
+    ORIGINALITY_MIN_DOCUMENTS = int(os.getenv("ORIGINALITY_MIN_DOCUMENTS", 20))
+    
+    # 近重复答案检测：同题答案 MinHash 相似度达到阈值时复用已有评分
+    NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "True").lower() == "true"
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.85))
+    NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", 200000))
+    NEAR_DUPLICATE_MIN_CHARS = int(os.getenv("NEAR_DUPLICATE_MIN_CHARS", 10))
+    
+    # 历史答案批量重新评分（scripts/rescore.py）
+    RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", 20))
+    RESCORE_CONCURRENCY = int(os.getenv("RESCORE_CONCURRENCY", 8))
+    # 评分服务持续不可用时，一块会话最多重试的次数（超过后停止任务，断点保持不变）
+    RESCORE_MAX_CHUNK_RETRIES = int(os.getenv("RESCORE_MAX_CHUNK_RETRIES", 5))
+    
+    # 离线测评批量导入（scripts/ingest.py）：同时处理的学生数
+    INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 16))
+    
+    # run_assessments 同时运行的测评会话数
+    ASSESSMENT_CONCURRENCY = int(os.getenv("ASSESSMENT_CONCURRENCY", 8))
+    
+    # 测评工作流检查点：每个节点完成后持久化状态，按会话ID续跑
+    GRAPH_CHECKPOINT_ENABLED = os.getenv("GRAPH_CHECKPOINT_ENABLED", "True").lower() == "true"
+    GRAPH_CHECKPOINT_KEEP = int(os.getenv("GRAPH_CHECKPOINT_KEEP", 2))
+    
+    # 共享HTTP连接池（所有LLM客户端复用；HTTP/2 需安装可选依赖 h2，即 httpx[http2]）
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "False").lower() == "true"
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 64))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 32))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+    
+    # 题库文件变化检测间隔（秒），0 表示不自动重新加载
+    QUESTION_BANK_RELOAD_SECONDS = float(os.getenv("QUESTION_BANK_RELOAD_SECONDS", 2))
+    # 重新加载后旧的 mmap 题库快照延迟关闭的秒数（留给仍在使用旧快照的抽题请求）
+    QUESTION_BANK_CLOSE_GRACE_SECONDS = float(os.getenv("QUESTION_BANK_CLOSE_GRACE_SECONDS", 30))
+    
+    # 题库生成：进程数与LLM扩充填充项时的并发请求数
+    GENERATOR_WORKERS = int(os.getenv("GENERATOR_WORKERS", os.cpu_count() or 4))
+    GENERATOR_LLM_CONCURRENCY = int(os.getenv("GENERATOR_LLM_CONCURRENCY", 4))
+    
     # 创造力测评维度
     CREATIVITY_DIMENSIONS = {
         "fluency": "流畅性",  # 产生想法的数量
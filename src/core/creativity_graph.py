@@ -1,19 +1,55 @@
 """
 基于LangGraph的创造力测评工作流
 """
-from typing import Dict, Any, List, TypedDict
+from typing import Dict, Any, List, Optional, Tuple, TypedDict
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+import asyncio
 import json
 import random
+import threading
+import time
+import uuid
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from src.data.models import Question, Answer, AssessmentSession, QuestionType, CreativityDimension
+from src.data.models import Question, Answer, AssessmentSession, QuestionType, CreativityDimension, SCORE_DIMENSIONS
 from src.core.config import Config
-from src.core.question_bank import ensure_question_files, sample_questions_per_type
+from src.core.question_bank import ensure_question_files, sample_questions
 from src.core.logging_utils import get_app_logger, get_llm_logger
+from src.core.event_loop import run_sync
+from src.core.score_cache import ScoreCache, make_score_key, normalize_text
+from src.core.latency import LatencyTracker
+from src.core.rate_limit import get_rate_limiter
+from src.core.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from src.core.lexical_scorer import LexicalScorer
+from src.core.originality_index import OriginalityIndex
+from src.core.near_duplicate import NearDuplicateIndex
+from src.core.ingestion import aingest_transcripts
+from src.core.rescoring import build_assessment_result
+from src.core.checkpointer import DatabaseCheckpointSaver
+from src.core.http_transport import chat_client_kwargs
+from src.core.ensemble import EnsembleScorer, parse_rater_configs
+from src.core.stream_parser import IncrementalScoreParser
+from src.core.singleflight import SingleFlight
+from src.core.retry import CIRCUIT_OPEN, FATAL, PARSE, RATE_LIMIT, RetryPolicy, ScoreParseError, classify_error, remaining_time, reset_deadline, set_deadline
+from src.data.database import DatabaseManager
+
+DEFAULT_SCORE = 7.0
+AGENT_A_ROLE = "严谨的评分者，偏保守且注重细节"
+AGENT_B_ROLE = "发散的评分者，鼓励创造性表达与多样性"
+# 评分提示词版本：修改提示词后需递增，使旧缓存失效
+EVALUATION_PROMPT_VERSION = "v1"
+_EVALUATION_RUBRIC = (
+    "请从以下维度评分：\n"
+    "1. 流畅性 (Fluency): 答案的数量和丰富程度\n"
+    "2. 灵活性 (Flexibility): 答案的多样性和变化性\n"
+    "3. 独创性 (Originality): 答案的独特性和创新性\n"
+    "4. 精细性 (Elaboration): 答案的详细程度和深度\n\n"
+)
+_REASK_SUFFIX = "\n注意：上一次的输出无法解析为完整的JSON，请严格按上述格式仅输出JSON对象，且包含全部四个维度的数值分数。\n"
 
 class GraphState(TypedDict):
     """LangGraph状态定义"""
@@ -26,6 +62,15 @@ class GraphState(TypedDict):
     session_data: Dict[str, Any]
     next_action: str
 
+def _counts_as_outage(exc: BaseException) -> bool:
+    """调用异常是否计入熔断失败：限流与带 4xx 状态码的客户端错误不计入。"""
+    kind = classify_error(exc)
+    if kind == RATE_LIMIT:
+        return False
+    status = getattr(exc, "status_code", None)
+    return not (kind == FATAL and isinstance(status, int) and 400 <= status < 500)
+
+
 class CreativityAssessmentGraph:
     """创造力测评LangGraph工作流"""
     
@@ -39,6 +84,7 @@ class CreativityAssessmentGraph:
         temperature=0,
         timeout=15,
         max_retries=0,
+        **chat_client_kwargs(),  # 共享连接池
         )
         # 为并行Agent准备两套客户端（可设置轻微温度差异以增加多样性）
         self.llm_a = self.llm
@@ -49,7 +95,27 @@ class CreativityAssessmentGraph:
         temperature=0.3,
         timeout=15,
         max_retries=0,
+        **chat_client_kwargs(),  # 共享连接池
         )
+        # 配置了 SCORING_RATERS 时改用N评分者集成（法定人数一致即提前结束）
+        raters = parse_rater_configs(Config.SCORING_RATERS)
+        self.ensemble = EnsembleScorer(self, raters) if raters else None
+        self.db = DatabaseManager()
+        self.score_cache = ScoreCache(db=self.db) if Config.SCORE_CACHE_ENABLED else None
+        self.latency = LatencyTracker()
+        self.lexical = LexicalScorer()
+        self.originality = OriginalityIndex(db=self.db, lexical=self.lexical)
+        self.near_duplicates = NearDuplicateIndex(
+            db=self.db,
+            namespace="|".join([*self._scoring_models(), self._score_version()]),
+        ) if Config.NEAR_DUPLICATE_ENABLED else None
+        self._agreement: Dict[str, Dict[str, float]] = {}
+        self._agreement_lock = threading.Lock()
+        self._stream_counts = {"streams": 0, "early_stops": 0, "fallbacks": 0}
+        self._stream_lock = threading.Lock()
+        self.singleflight = SingleFlight() if Config.SCORING_SINGLEFLIGHT_ENABLED else None
+        self.retry_policy = RetryPolicy()
+        self.checkpointer = DatabaseCheckpointSaver(self.db) if Config.GRAPH_CHECKPOINT_ENABLED else None
         self.graph = self._build_graph()
     
     def _build_graph(self) -> StateGraph:
@@ -61,8 +127,8 @@ class CreativityAssessmentGraph:
         workflow.add_node("generate_questions", self._generate_questions)
         workflow.add_node("present_question", self._present_question)
         workflow.add_node("collect_answer", self._collect_answer)
-        workflow.add_node("evaluate_answer", self._evaluate_answer)
         workflow.add_node("generate_next_question", self._generate_next_question)
+        workflow.add_node("evaluate_answers", RunnableLambda(self._evaluate_answers, afunc=self._aevaluate_answers))
         workflow.add_node("finalize_assessment", self._finalize_assessment)
         
         # 设置入口点
@@ -72,21 +138,21 @@ class CreativityAssessmentGraph:
         workflow.add_edge("initialize_session", "generate_questions")
         workflow.add_edge("generate_questions", "present_question")
         workflow.add_edge("present_question", "collect_answer")
-        workflow.add_edge("collect_answer", "evaluate_answer")
-        workflow.add_edge("evaluate_answer", "generate_next_question")
+        workflow.add_edge("collect_answer", "generate_next_question")
+        workflow.add_edge("evaluate_answers", "finalize_assessment")
         workflow.add_edge("finalize_assessment", END)
         
-        # 添加条件边
+        # 添加条件边：全部答案收集完成后统一并行评估
         workflow.add_conditional_edges(
             "generate_next_question",
             self._should_continue,
             {
                 "continue": "present_question",
-                "finish": "finalize_assessment"
+                "finish": "evaluate_answers"
             }
         )
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
     
     def _initialize_session(self, state: GraphState) -> GraphState:
         """初始化测评会话"""
@@ -207,90 +273,33 @@ class CreativityAssessmentGraph:
         )
         
         state["answers"].append(answer)
-        state["next_action"] = "evaluate_answer"
+        state["next_action"] = "generate_next_question"
         
         return state
     
-    def _evaluate_answer(self, state: GraphState) -> GraphState:
-        """评估学生答案"""
-        current_index = state["current_question_index"]
-        question = state["questions"][current_index]
-        answer = state["answers"][-1]
+    async def _aevaluate_answers(self, state: GraphState) -> GraphState:
+        """并行评估本次会话收集的全部答案（双Agent评分）"""
+        questions = {q.id: q for q in state["questions"]}
+        answers = [a for a in state["answers"] if a.question_id in questions]
+        print(f"正在并行评估 {len(answers)} 道题的答案...")
         
-        print(f"正在评估答案: {answer.question_id}")
+        scores = await asyncio.gather(*(
+            self.ascore_answer(questions[a.question_id].content, a.content, state["session_id"], a.question_id)
+            for a in answers
+        ))
+        state["session_data"]["evaluations"] = [{
+            "question_id": a.question_id,
+            "scores": s,
+            "timestamp": datetime.now().isoformat()
+        } for a, s in zip(answers, scores)]
         
-        # 使用LLM评估答案的创造力维度
-        evaluation_prompt = (
-            "请评估以下学生答案的创造力水平，从四个维度进行评分（0-10分）：\n\n"
-            f"题目: {question.content}\n"
-            f"学生答案: {answer.content}\n\n"
-            "请从以下维度评分：\n"
-            "1. 流畅性 (Fluency): 答案的数量和丰富程度\n"
-            "2. 灵活性 (Flexibility): 答案的多样性和变化性\n"
-            "3. 独创性 (Originality): 答案的独特性和创新性\n"
-            "4. 精细性 (Elaboration): 答案的详细程度和深度\n\n"
-            "请以JSON格式返回评分结果：\n"
-            "{\n"
-            "    \"fluency\": 分数,\n"
-            "    \"flexibility\": 分数,\n"
-            "    \"originality\": 分数,\n"
-            "    \"elaboration\": 分数,\n"
-            "    \"comments\": \"评价意见\"\n"
-            "}\n"
-            "重要要求：仅输出上述JSON对象本身，不要包含任何多余文字、解释或代码块标记。\n"
-        )
-        
-        try:
-            response = self.llm.invoke([HumanMessage(content=evaluation_prompt)])
-            raw = getattr(response, "content", "") or ""
-            print("LLM原始返回：", raw)
-            # 解析模型返回，兼容带说明文字/代码块
-            text = raw.strip()
-            if text.startswith("```"):
-                # 去掉反引号包裹
-                text = text.strip("`")
-                # 去掉可能的json语言标记
-                if text.lower().startswith("json\n"):
-                    text = text[5:]
-            import re, json as _json
-            match = re.search(r"\{[\s\S]*\}", text)
-            json_str = match.group(0) if match else text
-            evaluation = _json.loads(json_str)
-            
-            # 存储评估结果
-            if "evaluations" not in state["session_data"]:
-                state["session_data"]["evaluations"] = []
-            
-            state["session_data"]["evaluations"].append({
-                "question_id": question.id,
-                "scores": evaluation,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            print(f"评估完成: {evaluation}")
-            
-        except Exception as e:
-            print(f"评估过程中出现错误: {e}")
-            try:
-                print("LLM原始返回：", raw[:1000])
-            except Exception:
-                pass
-            # 使用默认评分
-            state["session_data"]["evaluations"].append({
-                "question_id": question.id,
-                "scores": {
-                    "fluency": 7.0,
-                    "flexibility": 7.0,
-                    "originality": 7.0,
-                    "elaboration": 7.0,
-                    "comments": "自动评分"
-                },
-                "timestamp": datetime.now().isoformat()
-            })
-        
-        state["next_action"] = "generate_next_question"
+        state["next_action"] = "finalize_assessment"
         return state
     
+    def _evaluate_answers(self, state: GraphState) -> GraphState:
+        """_aevaluate_answers 的同步版本（graph.invoke 时使用）"""
+        return run_sync(self._aevaluate_answers(state))
+    
     def _generate_next_question(self, state: GraphState) -> GraphState:
         """生成下一题或结束测评"""
         state["current_question_index"] += 1
@@ -320,6 +329,8 @@ class CreativityAssessmentGraph:
             "elaboration": 0
         }
         
+        # LLM不可用而延后评分的题目不计入
+        evaluations = [e for e in evaluations if not e["scores"].get("deferred")]
         for eval_data in evaluations:
             scores = eval_data["scores"]
             for dimension in dimension_totals:
@@ -344,10 +355,9 @@ class CreativityAssessmentGraph:
         state["next_action"] = "completed"
         return state
     
-    def run_assessment(self, student_id: str, student_name: str) -> Dict[str, Any]:
-        """运行完整的创造力测评"""
-        initial_state = GraphState(
-            session_id=f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+    def _initial_state(self, student_id: str, student_name: str, session_id: Optional[str] = None) -> GraphState:
+        return GraphState(
+            session_id=session_id or f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}",
             student_id=student_id,
             student_name=student_name,
             current_question_index=0,
@@ -356,37 +366,75 @@ class CreativityAssessmentGraph:
             session_data={},
             next_action=""
         )
-        
-        result = self.graph.invoke(initial_state)
-        return result
+    
+    def _thread_config(self, session_id: str, **extra: Any) -> Dict[str, Any]:
+        """检查点按会话ID区分"""
+        return {"configurable": {"thread_id": session_id}, **extra}
+    
+    def _discard_finished_checkpoints(self, config: Dict[str, Any]) -> None:
+        """测评正常结束后删除该会话的检查点与写入；中断的测评保留检查点以便续跑。"""
+        if self.checkpointer is None:
+            return
+        snapshot = self.graph.get_state(config)
+        if snapshot.values and not snapshot.next:
+            self.checkpointer.delete_thread(config["configurable"]["thread_id"])
 
-    def create_questions(self, num_questions: int) -> List[Question]:
-        """对外暴露：从题库抽取指定数量的题目"""
+    async def _adiscard_finished_checkpoints(self, config: Dict[str, Any]) -> None:
+        if self.checkpointer is None:
+            return
+        snapshot = await self.graph.aget_state(config)
+        if snapshot.values and not snapshot.next:
+            await self.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+
+    def run_assessment(self, student_id: str, student_name: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """运行完整的创造力测评；传入已有 session_id 时从该会话最后完成的节点继续。"""
+        if session_id and self.checkpointer is not None:
+            config = self._thread_config(session_id)
+            snapshot = self.graph.get_state(config)
+            if snapshot.values:
+                if not snapshot.next:
+                    self.checkpointer.delete_thread(session_id)
+                    return snapshot.values
+                self.app_log.info("Resuming assessment %s before %s", session_id, snapshot.next)
+                try:
+                    return self.graph.invoke(None, config)
+                finally:
+                    self._discard_finished_checkpoints(config)
+        state = self._initial_state(student_id, student_name, session_id)
+        config = self._thread_config(state["session_id"])
+        try:
+            return self.graph.invoke(state, config)
+        finally:
+            self._discard_finished_checkpoints(config)
+    
+    async def arun_assessments(self, students: List[Tuple[str, str]],
+                               max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """并发运行多名学生的测评（students 为 (student_id, student_name) 列表），结果顺序与输入一致。"""
+        states = [self._initial_state(student_id, student_name) for student_id, student_name in students]
+        concurrency = max(1, max_concurrency or Config.ASSESSMENT_CONCURRENCY)
+        configs = [self._thread_config(state["session_id"], max_concurrency=concurrency) for state in states]
+        try:
+            return await self.graph.abatch(states, config=configs)
+        finally:
+            await asyncio.gather(*(self._adiscard_finished_checkpoints(config) for config in configs))
+    
+    def run_assessments(self, students: List[Tuple[str, str]],
+                        max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """arun_assessments 的同步包装（运行于共享事件循环）。"""
+        return run_sync(self.arun_assessments(students, max_concurrency))
+
+    def create_questions(self, num_questions: int, student_id: Optional[str] = None) -> List[Question]:
+        """对外暴露：从题库抽取指定数量的题目；给出 student_id 时避开该学生做过的题目"""
         ensure_question_files()
-        sampled = sample_questions_per_type(num_questions)
-        questions: List[Question] = []
-        for idx, q in enumerate(sampled):
-            questions.append(Question(
-                id=q.get("id", f"q_{idx}"),
-                type=QuestionType(q["type"]),
-                title=q["title"],
-                content=q["content"],
-                time_limit=int(q.get("time_limit", 300)),
-                dimensions=[CreativityDimension(d) for d in q.get("dimensions", [])],
-                scoring_criteria=q.get("scoring_criteria", {})
-            ))
-        return questions
+        seen = self.db.get_seen_questions(student_id) if student_id else None
+        return sample_questions(num_questions, seen=seen)
 
     def _build_evaluation_prompt(self, role_hint: str, question_content: str, answer_text: str) -> str:
         prompt = (
             f"你是{role_hint}。请评估以下学生答案的创造力水平，从四个维度进行评分（0-10分）：\n\n"
             f"题目: {question_content}\n"
             f"学生答案: {answer_text}\n\n"
-            "请从以下维度评分：\n"
-            "1. 流畅性 (Fluency): 答案的数量和丰富程度\n"
-            "2. 灵活性 (Flexibility): 答案的多样性和变化性\n"
-            "3. 独创性 (Originality): 答案的独特性和创新性\n"
-            "4. 精细性 (Elaboration): 答案的详细程度和深度\n\n"
+            f"{_EVALUATION_RUBRIC}"
             "请以JSON格式返回评分结果：\n"
             "{\n"
             "    \"fluency\": 分数,\n"
@@ -399,70 +447,654 @@ class CreativityAssessmentGraph:
         )
         return prompt
 
-    def _parse_evaluation_text(self, raw: str) -> Dict[str, Any]:
+    def _build_batch_evaluation_prompt(self, role_hint: str, items: List[Tuple[str, str]]) -> str:
+        """将多组（题目, 答案）打包进同一个提示词，要求返回按 index 对应的JSON数组。"""
+        blocks = []
+        for idx, (question_content, answer_text) in enumerate(items, 1):
+            blocks.append(f"【第{idx}项】\n题目: {question_content}\n学生答案: {answer_text}\n")
+        prompt = (
+            f"你是{role_hint}。请分别评估以下{len(items)}份学生答案的创造力水平，"
+            "每份答案独立评分，从四个维度进行评分（0-10分）：\n\n"
+            + "\n".join(blocks) + "\n"
+            f"{_EVALUATION_RUBRIC}"
+            f"请以JSON数组格式返回评分结果，数组共{len(items)}个元素，index 与上面的项目编号一一对应：\n"
+            "[\n"
+            "    {\"index\": 1, \"fluency\": 分数, \"flexibility\": 分数, \"originality\": 分数, "
+            "\"elaboration\": 分数, \"comments\": \"评价意见\"}\n"
+            "]\n"
+            "重要要求：仅输出上述JSON数组本身，不要包含任何多余文字、解释或代码块标记。\n"
+        )
+        return prompt
+
+    def _strip_code_fence(self, raw: str) -> str:
         text = (raw or "").strip()
         if text.startswith("```"):
             text = text.strip("`")
             if text.lower().startswith("json\n"):
                 text = text[5:]
+        return text
+
+    def _parse_evaluation_text(self, raw: str) -> Dict[str, Any]:
+        text = self._strip_code_fence(raw)
         import re, json as _json
         match = re.search(r"\{[\s\S]*\}", text)
         json_str = match.group(0) if match else text
         data = _json.loads(json_str)
         return data
 
-    def score_answer(self, question_content: str, answer_text: str) -> Dict[str, Any]:
-        """对给定题目与用户答案进行并行双Agent评分并取平均。"""
-        prompt_a = self._build_evaluation_prompt("严谨的评分者，偏保守且注重细节", question_content, answer_text)
-        prompt_b = self._build_evaluation_prompt("发散的评分者，鼓励创造性表达与多样性", question_content, answer_text)
-        self.llm_log.info("Prompt A:\n%s", prompt_a)
-        self.llm_log.info("Prompt B:\n%s", prompt_b)
+    def _parse_batch_evaluation_text(self, raw: str, count: int) -> List[Optional[Dict[str, Any]]]:
+        """解析批量评分返回的JSON数组；无法解析或缺少维度的条目记为 None。"""
+        text = self._strip_code_fence(raw)
+        import re, json as _json
+        entries: List[Any] = []
+        match = re.search(r"\[[\s\S]*\]", text)
+        try:
+            data = _json.loads(match.group(0) if match else text)
+            entries = data if isinstance(data, list) else [data]
+        except Exception:
+            # 数组整体损坏（如被截断）时，逐个抢救完整的对象
+            for obj_str in re.findall(r"\{[^{}]*\}", text):
+                try:
+                    entries.append(_json.loads(obj_str))
+                except Exception:
+                    continue
 
-        def call(tag: str, llm_client, prompt):
+        results: List[Optional[Dict[str, Any]]] = [None] * count
+        for pos, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
             try:
-                resp = llm_client.invoke([HumanMessage(content=prompt)])
-                raw = getattr(resp, "content", "") or ""
-                self.llm_log.info("%s Raw:\n%s", tag, raw)
-                parsed = self._parse_evaluation_text(raw)
-                self.llm_log.info("%s Parsed: %s", tag, parsed)
+                idx = int(entry.get("index", pos + 1)) - 1
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= idx < count or results[idx] is not None:
+                continue
+            try:
+                scores = {k: float(entry[k]) for k in SCORE_DIMENSIONS}
+            except (KeyError, TypeError, ValueError):
+                continue
+            scores["comments"] = entry.get("comments", "")
+            results[idx] = scores
+        return results
+
+    def _cache_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if self.score_cache is None:
+            return None
+        return self.score_cache.get(cache_key)
+
+    def _cache_put(self, cache_key: str, scores: Dict[str, Any]) -> None:
+        if self.score_cache is not None:
+            self.score_cache.put(cache_key, scores)
+
+    def _scoring_models(self) -> List[str]:
+        if self.ensemble is not None:
+            return self.ensemble.cache_identity()
+        return [Config.model_name_a, Config.model_name_b]
+
+    def _score_version(self) -> str:
+        """缓存键中的评分版本：自适应模式下的评分可能只来自Agent A，与双Agent评分分开缓存。"""
+        if Config.SCORING_ADAPTIVE and self.ensemble is None:
+            return f"{EVALUATION_PROMPT_VERSION}+adaptive"
+        return EVALUATION_PROMPT_VERSION
+
+    def _score_cache_key(self, question_content: str, answer_text: str) -> str:
+        return make_score_key(question_content, answer_text, self._scoring_models(), self._score_version())
+
+    async def _ainvoke_llm(self, llm_client, prompt: str, metric: Optional[str] = None,
+                           parser: Optional[IncrementalScoreParser] = None):
+        """经进程级限流器调用LLM并返回原始响应；耗时（不含排队）计入 metric。
+
+        传入 parser 时以流式方式读取，见 _astream_scores。
+        限流（429）与客户端 4xx 错误说明端点可达，不计入熔断失败。
+        """
+        breaker = self._breaker_for(llm_client)
+        breaker.before_call()
+        limiter = get_rate_limiter(getattr(llm_client, "model_name", None))
+        try:
+            async with limiter.slot(prompt) as lease:
+                started = time.perf_counter()
+                if parser is None:
+                    resp = await llm_client.ainvoke([HumanMessage(content=prompt)])
+                else:
+                    resp = await self._astream_scores(llm_client, prompt, parser, metric, started)
+                if metric:
+                    self.latency.record(metric, time.perf_counter() - started)
+                lease.record_usage(resp)
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        except Exception as e:
+            if _counts_as_outage(e):
+                breaker.record_failure(timeout=isinstance(e, TimeoutError) or "Timeout" in type(e).__name__)
+            else:
+                breaker.record_cancelled()
+            raise
+        breaker.record_success()
+        return resp
+
+    async def _astream_scores(self, llm_client, prompt: str, parser: IncrementalScoreParser,
+                              metric: Optional[str], started: float) -> AIMessage:
+        """流式读取评分输出：四个维度齐全时记录首分延迟（metric.first_score），满足提前结束条件即关闭流。"""
+        resp = None
+        first_score = False
+        stream = llm_client.astream([HumanMessage(content=prompt)])
+        try:
+            async for chunk in stream:
+                resp = chunk if resp is None else resp + chunk
+                parser.feed(chunk.content if isinstance(chunk.content, str) else "")
+                if parser.scores_ready and not first_score:
+                    first_score = True
+                    if metric:
+                        self.latency.record(f"{metric}.first_score", time.perf_counter() - started)
+                if Config.SCORING_STREAM_EARLY_STOP and parser.should_stop(Config.SCORING_STREAM_COMMENT_CHARS):
+                    if not parser.done:
+                        self._count_stream("early_stops")
+                    break
+        finally:
+            await stream.aclose()
+        self._count_stream("streams")
+        return resp if resp is not None else AIMessage(content="")
+
+    def _count_stream(self, key: str) -> None:
+        with self._stream_lock:
+            self._stream_counts[key] += 1
+
+    def stream_stats(self) -> Dict[str, Any]:
+        """流式评分计数与各Agent首分延迟分位数（秒）。"""
+        with self._stream_lock:
+            counts = dict(self._stream_counts)
+        first_score = {name: stats for name, stats in self.latency.snapshot().items() if name.endswith(".first_score")}
+        return {**counts, "first_score": first_score}
+
+    def _breaker_for(self, llm_client) -> CircuitBreaker:
+        return get_circuit_breaker(getattr(llm_client, "openai_api_base", None) or Config.base_url,
+                                   getattr(llm_client, "model_name", None))
+
+    def _endpoint_available(self) -> bool:
+        """任一评分Agent的熔断器允许调用即视为可用。"""
+        clients = self.ensemble.clients if self.ensemble is not None else (self.llm_a, self.llm_b)
+        return any(self._breaker_for(c).allows_request() for c in clients)
+
+    async def _adefer_scoring(self, question_content: str, answer_text: str, reason: str,
+                              session_id: Optional[str] = None, question_id: Optional[str] = None) -> Dict[str, Any]:
+        """LLM服务不可用时记录答案待重新评分，不使用默认分。"""
+        self.app_log.warning("Scoring deferred (%s): session=%s qid=%s", reason, session_id, question_id)
+        await asyncio.to_thread(self.db.add_deferred_score, question_content, answer_text, reason,
+                                session_id, question_id)
+        return {
+            "deferred": True,
+            "provisional": self.lexical.score(answer_text),
+            "comments": "LLM服务暂不可用，答案已记录，待服务恢复后重新评分",
+        }
+
+    def defer_scoring(self, question_content: str, answer_text: str, reason: str,
+                      session_id: Optional[str] = None, question_id: Optional[str] = None) -> Dict[str, Any]:
+        """登记答案待重新评分并返回延后评分结果（_adefer_scoring 的同步包装）。"""
+        return run_sync(self._adefer_scoring(question_content, answer_text, reason, session_id, question_id))
+
+    async def _acall_agent(self, tag: str, llm_client, prompt: str,
+                           metric: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """异步调用单个评分Agent，按 retry_policy 重试，最终失败时返回 None；成功调用的耗时计入 metric（默认为 tag）。"""
+        attempt = parse_failures = 0
+        ask = prompt
+        while True:
+            attempt += 1
+            try:
+                parsed = await self._acall_agent_once(tag, llm_client, ask, metric or tag)
+                self.retry_policy.count("success" if attempt == 1 else "success_after_retry")
                 return parsed
             except Exception as e:
-                self.llm_log.exception("%s Error: %s", tag, e)
-                return None
-
-        with ThreadPoolExecutor(max_workers=2) as ex:
-            f1 = ex.submit(call, "AgentA", self.llm_a, prompt_a)
-            f2 = ex.submit(call, "AgentB", self.llm_b, prompt_b)
-            r1 = f1.result()
-            r2 = f2.result()
-
-        # 回退策略
-        defaults = {"fluency": 7.0, "flexibility": 7.0, "originality": 7.0, "elaboration": 7.0}
-        if r1 is None and r2 is None:
-            self.app_log.warning("Both agents failed, using defaults")
-            return {**defaults, "comments": "自动评分（双Agent均失败）"}
+                kind = classify_error(e)
+                if kind == PARSE:
+                    parse_failures += 1
+                delay = self.retry_policy.next_delay(kind, attempt, e, parse_failures)
+                if delay is None:
+                    self.retry_policy.count(f"gave_up_{kind}")
+                    if kind == CIRCUIT_OPEN:
+                        # 熔断期间每次调用都会快速失败，不记录堆栈
+                        self.llm_log.warning("%s skipped: %s", tag, e)
+                    else:
+                        self.llm_log.exception("%s Error: %s", tag, e)
+                    return None
+                self.retry_policy.count(f"retry_{kind}")
+                self.llm_log.warning("%s %s error on attempt %d, retrying in %.2fs: %s", tag, kind, attempt, delay, e)
+                if kind == PARSE:
+                    ask = prompt + _REASK_SUFFIX
+                await asyncio.sleep(delay)
+
+    async def _acall_agent_once(self, tag: str, llm_client, prompt: str, metric: str) -> Dict[str, Any]:
+        """单次调用并解析；剩余时间不足时抛出 TimeoutError，输出不完整时抛出 ScoreParseError。"""
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError("scoring deadline exceeded")
+        parser = IncrementalScoreParser() if Config.SCORING_STREAM_ENABLED else None
+        call = self._ainvoke_llm(llm_client, prompt, metric=metric, parser=parser)
+        resp = await (asyncio.wait_for(call, remaining) if remaining is not None else call)
+        raw = getattr(resp, "content", "") or ""
+        self.llm_log.info("%s Raw:\n%s", tag, raw)
+        if parser is not None and parser.scores_ready:
+            parsed = parser.result(Config.SCORING_STREAM_COMMENT_CHARS)
+        else:
+            if parser is not None:
+                self._count_stream("fallbacks")
+            try:
+                parsed = self._parse_evaluation_text(raw)
+            except ValueError as e:
+                raise ScoreParseError(f"invalid JSON: {e}") from e
+        if not isinstance(parsed, dict):
+            raise ScoreParseError("evaluation is not a JSON object")
+        try:
+            for k in SCORE_DIMENSIONS:
+                float(parsed[k])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ScoreParseError(f"missing or invalid dimension {e}") from e
+        self.llm_log.info("%s Parsed: %s", tag, parsed)
+        return parsed
+
+    async def _ahedged_call(self, tag: str, llm_client, prompt: str) -> Optional[Dict[str, Any]]:
+        """超过该Agent历史 p95 仍未返回时，向同一模型发出一次对冲请求，取先成功者。"""
+        primary = asyncio.ensure_future(self._acall_agent(tag, llm_client, prompt))
+        threshold = None
+        if Config.SCORING_HEDGE_ENABLED and self.latency.count(tag) >= Config.SCORING_HEDGE_MIN_SAMPLES:
+            threshold = self.latency.percentile(tag, Config.SCORING_HEDGE_PERCENTILE)
+        if threshold is None:
+            return await primary
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done:
+                return primary.result()
+            self.llm_log.info("%s exceeded p%.0f=%.2fs, sending hedge request", tag,
+                              Config.SCORING_HEDGE_PERCENTILE, threshold)
+            hedge = asyncio.ensure_future(self._acall_agent(f"{tag}(hedge)", llm_client, prompt, metric=tag))
+            pending = {primary, hedge}
+            result = None
+            while pending and result is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        result = task.result()
+                        break
+            for task in pending:
+                task.cancel()
+            return result
+        except asyncio.CancelledError:
+            # 外层被取消（延迟预算、集成评分达到法定数、评分队列替换）时，对冲请求也不再需要
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+            raise
+
+    async def _await_agents(self, tasks: Dict[str, "asyncio.Future"]) -> Tuple[Dict[str, Optional[Dict[str, Any]]], bool]:
+        """等待各Agent结果；超出延迟预算且已有成功结果时，取消其余Agent并标记为单Agent评分。"""
+        budget = Config.SCORING_LATENCY_BUDGET
+        if budget <= 0:
+            values = await asyncio.gather(*tasks.values())
+            return dict(zip(tasks.keys(), values)), False
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=budget)
+        while pending and not any(t.result() is not None for t in done):
+            # 预算内尚无成功结果：继续等待下一个完成的Agent（各自仍受客户端超时约束）
+            more, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            done |= more
+        for task in pending:
+            task.cancel()
+        results = {tag: (t.result() if t in done else None) for tag, t in tasks.items()}
+        if pending:
+            self.app_log.info("Latency budget %.1fs exceeded, returning single-agent result", budget)
+        return results, bool(pending)
+
+    def _merge_agent_results(self, results: Dict[str, Optional[Dict[str, Any]]],
+                             answer_text: Optional[str] = None) -> Dict[str, Any]:
+        """合并各Agent评分：成功者取平均；全部失败时流畅性/精细性用本地估算，其余用默认分（带 fallback 标记）。"""
+        succeeded = [(tag, r) for tag, r in results.items() if r is not None]
+        if not succeeded:
+            self.app_log.warning("All agents failed, using defaults")
+            merged = {k: DEFAULT_SCORE for k in SCORE_DIMENSIONS}
+            merged["fallback"] = True
+            merged["comments"] = "自动评分（双Agent均失败）"
+            if answer_text is not None:
+                merged.update(self.lexical.score(answer_text))
+                merged["comments"] = "自动评分（双Agent均失败，流畅性/精细性为本地估算）"
+            return merged
+        merged = {}
+        for k in SCORE_DIMENSIONS:
+            merged[k] = sum(float(r.get(k, DEFAULT_SCORE)) for _, r in succeeded) / len(succeeded)
+        merged["comments"] = " | ".join(f"{tag}: {r.get('comments', '')}" for tag, r in succeeded)
+        return merged
+
+    async def ascore_answer(self, question_content: str, answer_text: str,
+                            session_id: Optional[str] = None, question_id: Optional[str] = None) -> Dict[str, Any]:
+        """异步并行双Agent评分并取平均（基于 ainvoke，不占用额外线程）；相同内容优先读缓存。
+
+        LLM端点熔断时不等待超时，直接记录为待重新评分（结果带 deferred 标记，不含分数）。
+        同题历史语料充足时附带基于答案稀有度的统计独创性 originality_stat。
+        相同内容的并发请求共享同一次评分（结果带 coalesced 标记）。
+        """
+        if self.singleflight is None:
+            return await self._ascore_with_stat(question_content, answer_text, session_id, question_id)
+        (owner, scores), shared = await self.singleflight.do(
+            self._score_cache_key(question_content, answer_text),
+            lambda: self._ascore_shared(question_content, answer_text, session_id, question_id),
+        )
+        scores = dict(scores)
+        if shared:
+            scores["coalesced"] = True
+            if scores.get("deferred") and owner != (session_id, question_id):
+                # 延后评分按会话记录，合并进来的其他会话也需各自登记
+                await asyncio.to_thread(self.db.add_deferred_score, question_content, answer_text,
+                                        "circuit_open", session_id, question_id)
+        return scores
+
+    async def _ascore_shared(self, question_content: str, answer_text: str, session_id: Optional[str],
+                             question_id: Optional[str]) -> Tuple[Tuple[Optional[str], Optional[str]], Dict[str, Any]]:
+        scores = await self._ascore_with_stat(question_content, answer_text, session_id, question_id)
+        return (session_id, question_id), scores
+
+    async def _ascore_with_stat(self, question_content: str, answer_text: str,
+                                session_id: Optional[str], question_id: Optional[str]) -> Dict[str, Any]:
+        token = set_deadline(Config.SCORING_DEADLINE_SECONDS)
+        try:
+            scores = await self._ascore_answer(question_content, answer_text, session_id, question_id)
+        finally:
+            reset_deadline(token)
+        if not scores.get("deferred"):
+            stat = await asyncio.to_thread(self.originality.score, question_content, answer_text)
+            if stat is not None:
+                scores["originality_stat"] = stat
+        return scores
+
+    async def _ascore_answer(self, question_content: str, answer_text: str,
+                             session_id: Optional[str], question_id: Optional[str]) -> Dict[str, Any]:
+        cache_key = self._score_cache_key(question_content, answer_text)
+        cached = await asyncio.to_thread(self._cache_get, cache_key)
+        if cached is not None:
+            self.llm_log.info("Score cache hit: %s", cache_key)
+            return {**cached, "cached": True}
+        if self.near_duplicates is not None:
+            duplicate = await asyncio.to_thread(self.near_duplicates.lookup, question_content, answer_text)
+            if duplicate is not None:
+                self.app_log.info("Near-duplicate answer (similarity=%.2f), reusing evaluation", duplicate["similarity"])
+                return {**duplicate["evaluation"], "near_duplicate": True, "similarity": duplicate["similarity"]}
+        if not self._endpoint_available():
+            return await self._adefer_scoring(question_content, answer_text, "circuit_open", session_id, question_id)
+        if self.ensemble is not None:
+            return await self._aensemble_score(question_content, answer_text, session_id, question_id, cache_key)
+
+        prompt_a = self._build_evaluation_prompt(AGENT_A_ROLE, question_content, answer_text)
+        prompt_b = self._build_evaluation_prompt(AGENT_B_ROLE, question_content, answer_text)
+        self.llm_log.info("Prompt A:\n%s", prompt_a)
+        self.llm_log.info("Prompt B:\n%s", prompt_b)
+
+        if Config.SCORING_ADAPTIVE:
+            results, reason, single_agent = await self._adaptive_agents(answer_text, prompt_a, prompt_b)
+        else:
+            results, single_agent = await self._await_agents({
+                "A": asyncio.ensure_future(self._ahedged_call("AgentA", self.llm_a, prompt_a)),
+                "B": asyncio.ensure_future(self._ahedged_call("AgentB", self.llm_b, prompt_b)),
+            })
+            reason = None
+        r1, r2 = results.get("A"), results.get("B")
+        if r1 is None and r2 is None and not self._endpoint_available():
+            return await self._adefer_scoring(question_content, answer_text, "circuit_open", session_id, question_id)
+        if r1 is not None and r2 is not None:
+            self._record_agreement(r1, r2, sampled=(reason == "sampled"))
+        merged = self._merge_agent_results(results, answer_text)
+        if single_agent:
+            merged["single_agent"] = True
+        if Config.SCORING_ADAPTIVE:
+            merged["second_opinion"] = reason or "skipped"
+        # 仅缓存双Agent均成功（或自适应模式下有意只用Agent A）的评分，避免固化回退结果
+        if (r1 is not None and r2 is not None) or (r1 is not None and "B" not in results):
+            await asyncio.to_thread(self._cache_put, cache_key, merged)
+            if self.near_duplicates is not None:
+                await asyncio.to_thread(self.near_duplicates.add, question_content, answer_text, merged)
+        return merged
+
+    async def _aensemble_score(self, question_content: str, answer_text: str, session_id: Optional[str],
+                               question_id: Optional[str], cache_key: str) -> Dict[str, Any]:
+        """N评分者集成评分；全部失败时与双Agent路径相同地延后评分或回退本地估算。"""
+        succeeded, merged = await self.ensemble.ascore(question_content, answer_text)
+        if not succeeded:
+            if not self._endpoint_available():
+                return await self._adefer_scoring(question_content, answer_text, "circuit_open",
+                                                  session_id, question_id)
+            return self._merge_agent_results({}, answer_text)
+        await asyncio.to_thread(self._cache_put, cache_key, merged)
+        if self.near_duplicates is not None:
+            await asyncio.to_thread(self.near_duplicates.add, question_content, answer_text, merged)
+        return merged
+
+    def _second_opinion_reason(self, r1: Optional[Dict[str, Any]], answer_text: str) -> Optional[str]:
+        """判断是否需要Agent B复评，返回原因；无需复评时返回 None。"""
         if r1 is None:
-            return {
-                "fluency": float(r2.get("fluency", 7.0)),
-                "flexibility": float(r2.get("flexibility", 7.0)),
-                "originality": float(r2.get("originality", 7.0)),
-                "elaboration": float(r2.get("elaboration", 7.0)),
-                "comments": f"B: {r2.get('comments', '')}"
-            }
-        if r2 is None:
-            return {
-                "fluency": float(r1.get("fluency", 7.0)),
-                "flexibility": float(r1.get("flexibility", 7.0)),
-                "originality": float(r1.get("originality", 7.0)),
-                "elaboration": float(r1.get("elaboration", 7.0)),
-                "comments": f"A: {r1.get('comments', '')}"
-            }
+            return "agent_a_failed"
+        if len(normalize_text(answer_text)) < Config.SCORING_TRIVIAL_ANSWER_CHARS:
+            return None
+        try:
+            mean_score = sum(float(r1.get(k, DEFAULT_SCORE)) for k in SCORE_DIMENSIONS) / len(SCORE_DIMENSIONS)
+        except (TypeError, ValueError):
+            return "agent_a_failed"
+        low, high = Config.SCORING_UNCERTAINTY_BAND
+        if low <= mean_score <= high:
+            return "uncertain"
+        if random.random() < Config.SCORING_SECOND_OPINION_RATE:
+            return "sampled"
+        return None
+
+    async def _adaptive_agents(self, answer_text: str, prompt_a: str, prompt_b: str
+                               ) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Optional[str], bool]:
+        """自适应模式：先由Agent A评分，仅在不确定、失败或抽样命中时调用Agent B。
+
+        Agent B 同样受延迟预算约束：Agent A 已成功且总耗时超出预算时取消 B，按单Agent评分返回。
+        """
+        started = time.monotonic()
+        r1 = await self._ahedged_call("AgentA", self.llm_a, prompt_a)
+        reason = self._second_opinion_reason(r1, answer_text)
+        if reason is None:
+            self.llm_log.info("Adaptive scoring: Agent B skipped")
+            return {"A": r1}, None, False
+        self.llm_log.info("Adaptive scoring: Agent B requested (%s)", reason)
+        second = asyncio.ensure_future(self._ahedged_call("AgentB", self.llm_b, prompt_b))
+        budget = Config.SCORING_LATENCY_BUDGET
+        try:
+            if budget <= 0 or r1 is None:
+                return {"A": r1, "B": await second}, reason, False
+            done, _ = await asyncio.wait({second}, timeout=max(0.0, budget - (time.monotonic() - started)))
+        except asyncio.CancelledError:
+            second.cancel()
+            raise
+        if not done:
+            second.cancel()
+            self.app_log.info("Latency budget %.1fs exceeded, returning Agent A result", budget)
+            return {"A": r1, "B": None}, reason, True
+        return {"A": r1, "B": second.result()}, reason, False
+
+    def _record_agreement(self, r1: Dict[str, Any], r2: Dict[str, Any], sampled: bool) -> None:
+        """累计双Agent评分差异，用于评分者一致性统计。"""
+        try:
+            diffs = {k: abs(float(r1.get(k, DEFAULT_SCORE)) - float(r2.get(k, DEFAULT_SCORE))) for k in SCORE_DIMENSIONS}
+        except (TypeError, ValueError):
+            return
+        with self._agreement_lock:
+            for bucket in (("all", "sampled") if sampled else ("all",)):
+                stats = self._agreement.setdefault(bucket, {"pairs": 0, **{k: 0.0 for k in SCORE_DIMENSIONS}})
+                stats["pairs"] += 1
+                for k, v in diffs.items():
+                    stats[k] += v
+
+    def rater_agreement_stats(self) -> Dict[str, Dict[str, float]]:
+        """双Agent各维度平均绝对分差；"sampled" 为随机抽样复评的无偏估计。"""
+        with self._agreement_lock:
+            result = {}
+            for bucket, stats in self._agreement.items():
+                pairs = stats["pairs"]
+                result[bucket] = {"pairs": pairs, **{k: stats[k] / pairs for k in SCORE_DIMENSIONS}}
+            return result
+
+    def provisional_score(self, answer_text: str) -> Dict[str, float]:
+        """本地即时预估（流畅性、精细性），不调用LLM。"""
+        return self.lexical.score(answer_text)
+
+    def retry_stats(self) -> Dict[str, int]:
+        """评分调用各结果计数：success / success_after_retry / retry_<类型> / gave_up_<类型> / deadline_exceeded。"""
+        return self.retry_policy.stats()
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """各Agent的调用延迟分位数（秒）。"""
+        return self.latency.snapshot()
+
+    def score_answer(self, question_content: str, answer_text: str,
+                     session_id: Optional[str] = None, question_id: Optional[str] = None) -> Dict[str, Any]:
+        """对给定题目与用户答案进行并行双Agent评分并取平均（同步包装，运行于共享事件循环）。"""
+        return run_sync(self.ascore_answer(question_content, answer_text, session_id, question_id))
+
+    async def arescore_deferred(self, limit: int = 100) -> int:
+        """对熔断期间记录的答案重新评分（结果写入评分缓存），并重建受影响会话的测评结果，返回完成条数。
+
+        没有任何Agent给出有效评分（回退为默认分）的答案保持待评分，留待下次重试。
+        """
+        pending = await asyncio.to_thread(self.db.get_pending_deferred_scores, limit)
+        done_ids: List[int] = []
+        rescored: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for item in pending:
+            if not self._endpoint_available():
+                break
+            scores = await self.ascore_answer(item["question_content"], item["answer_text"],
+                                              item["session_id"], item["question_id"])
+            if scores.get("deferred"):
+                break
+            if scores.get("fallback"):
+                continue
+            done_ids.append(item["id"])
+            if item["session_id"]:
+                rescored.setdefault(item["session_id"], {})[item["question_id"]] = scores
+        await asyncio.to_thread(self.db.mark_deferred_scores_done, done_ids)
+        await self._arebuild_session_results(rescored)
+        return len(done_ids)
+
+    async def _arebuild_session_results(self, rescored: Dict[str, Dict[str, Dict[str, Any]]]) -> int:
+        """重新汇总会话的测评结果并覆盖已保存的（待评分）结果；仍有题目无法评分的会话保持不变。
+
+        rescored 为 {session_id: {question_id: 本次重新评分的结果}}；其余题目沿用会话中保存的评分，
+        未保存评分（或仍为延后评分）的题目并发重新评分。
+        """
+        results, sessions = [], []
+        for session_id, fresh in rescored.items():
+            session = await asyncio.to_thread(self.db.get_assessment_session, session_id)
+            if session is None:
+                continue
+            contents = {q.id: q.content for q in session.questions}
+            answers = [a for a in session.answers if a.question_id in contents]
+            for a in answers:
+                if a.question_id in fresh:
+                    a.scores = fresh[a.question_id]
+            missing = [a for a in answers if not a.scores or a.scores.get("deferred")]
+            filled = await asyncio.gather(*(
+                self.ascore_answer(contents[a.question_id], a.content, session_id, a.question_id) for a in missing))
+            if any(s.get("deferred") or s.get("fallback") for s in filled):
+                continue
+            for a, s in zip(missing, filled):
+                a.scores = s
+            if not answers:
+                continue
+            sessions.append(session)
+            results.append(build_assessment_result(session_id, session.student_id, session.student_name,
+                                                   [a.scores for a in answers], session.end_time))
+        if results and not await asyncio.to_thread(self.db.replace_assessment_results, results, sessions):
+            return 0
+        if results:
+            self.app_log.info("Rebuilt %d assessment results after deferred rescoring", len(results))
+        return len(results)
+
+    def rescore_deferred(self, limit: int = 100) -> int:
+        """arescore_deferred 的同步包装。"""
+        return run_sync(self.arescore_deferred(limit))
+
+    async def _acall_agent_batch(self, tag: str, llm_client, items: List[Tuple[str, str]],
+                                 role_hint: str) -> List[Optional[Dict[str, Any]]]:
+        """一次调用为多组答案评分，整体失败时全部记为 None。"""
+        prompt = self._build_batch_evaluation_prompt(role_hint, items)
+        self.llm_log.info("%s Batch Prompt (%d items):\n%s", tag, len(items), prompt)
+        try:
+            resp = await self._ainvoke_llm(llm_client, prompt)
+            raw = getattr(resp, "content", "") or ""
+            self.llm_log.info("%s Batch Raw:\n%s", tag, raw)
+            parsed = self._parse_batch_evaluation_text(raw, len(items))
+            self.llm_log.info("%s Batch Parsed: %s", tag, parsed)
+            return parsed
+        except Exception as e:
+            if classify_error(e) == CIRCUIT_OPEN:
+                self.llm_log.warning("%s Batch skipped: %s", tag, e)
+            else:
+                self.llm_log.exception("%s Batch Error: %s", tag, e)
+            return [None] * len(items)
+
+    async def _ascore_chunk(self, chunk: List[Tuple[str, str]],
+                            ids: List[Tuple[Optional[str], Optional[str]]]) -> List[Dict[str, Any]]:
+        results_a, results_b = await asyncio.gather(
+            self._acall_agent_batch("AgentA", self.llm_a, chunk, AGENT_A_ROLE),
+            self._acall_agent_batch("AgentB", self.llm_b, chunk, AGENT_B_ROLE),
+        )
+
+        async def finish(idx: int) -> Dict[str, Any]:
+            question_content, answer_text = chunk[idx]
+            session_id, question_id = ids[idx]
+            r1, r2 = results_a[idx], results_b[idx]
+            # 批量结果缺失的条目回退为单条评分（仅重新调用失败的Agent）
+            if r1 is None:
+                r1 = await self._acall_agent("AgentA", self.llm_a, self._build_evaluation_prompt(
+                    AGENT_A_ROLE, question_content, answer_text))
+            if r2 is None:
+                r2 = await self._acall_agent("AgentB", self.llm_b, self._build_evaluation_prompt(
+                    AGENT_B_ROLE, question_content, answer_text))
+            if r1 is None and r2 is None and not self._endpoint_available():
+                return await self._adefer_scoring(question_content, answer_text, "circuit_open",
+                                                  session_id, question_id)
+            merged = self._merge_agent_results({"A": r1, "B": r2}, answer_text)
+            if r1 is not None and r2 is not None:
+                await asyncio.to_thread(self._cache_put, self._score_cache_key(question_content, answer_text), merged)
+            return merged
+
+        return list(await asyncio.gather(*(finish(i) for i in range(len(chunk)))))
+
+    async def ascore_answers_batch(self, items: List[Tuple[str, str]], batch_size: Optional[int] = None,
+                                   ids: Optional[List[Tuple[Optional[str], Optional[str]]]] = None) -> List[Dict[str, Any]]:
+        """批量评分：每 batch_size 组（题目, 答案）每个Agent只调用一次LLM，结果顺序与输入一致。
+
+        ids 为与 items 一一对应的 (session_id, question_id)，熔断时据此登记延后评分，便于重新评分后重建会话结果。
+        """
+        batch_size = max(1, batch_size or Config.SCORING_BATCH_SIZE)
+        if ids is None:
+            ids = [(None, None)] * len(items)
+        elif len(ids) != len(items):
+            raise ValueError("ids 与 items 数量不一致")
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending: List[int] = []
+        for i, (question_content, answer_text) in enumerate(items):
+            cached = await asyncio.to_thread(self._cache_get, self._score_cache_key(question_content, answer_text))
+            if cached is not None:
+                results[i] = {**cached, "cached": True}
+            else:
+                pending.append(i)
+
+        chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        chunk_results = await asyncio.gather(*(
+            self._ascore_chunk([items[i] for i in c], [ids[i] for i in c]) for c in chunks))
+        for chunk, scored in zip(chunks, chunk_results):
+            for i, merged in zip(chunk, scored):
+                results[i] = merged
+        return results
+
+    def score_answers_batch(self, items: List[Tuple[str, str]], batch_size: Optional[int] = None,
+                            ids: Optional[List[Tuple[Optional[str], Optional[str]]]] = None) -> List[Dict[str, Any]]:
+        """批量评分的同步包装。"""
+        return run_sync(self.ascore_answers_batch(items, batch_size, ids))
+
+    async def aingest_jsonl(self, path: str, concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """导入纸笔测评誊录（JSONL，格式见 src/core/ingestion.py）：并行评分并写入档案、会话与结果。"""
+        return await aingest_transcripts(self, path, concurrency)
 
-        # 平均两者分数
-        avg = {}
-        for k in ("fluency", "flexibility", "originality", "elaboration"):
-            v1 = float(r1.get(k, 7.0))
-            v2 = float(r2.get(k, 7.0))
-            avg[k] = (v1 + v2) / 2.0
-        avg["comments"] = f"A: {r1.get('comments', '')} | B: {r2.get('comments', '')}"
-        return avg
+    def ingest_jsonl(self, path: str, concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """aingest_jsonl 的同步包装，返回吞吐（answers_per_second）与失败明细。"""
+        return run_sync(self.aingest_jsonl(path, concurrency))
@@ -0,0 +1,182 @@
+"""
+多评分者集成：N 个评分者并发评分，法定人数意见一致即提前返回并取消其余调用
+"""
+import asyncio
+import json
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from src.core.config import Config
+from src.core.http_transport import chat_client_kwargs
+from src.core.logging_utils import get_app_logger
+from src.data.models import SCORE_DIMENSIONS
+
+_log = get_app_logger("ensemble")
+
+AGGREGATIONS = ("median", "trimmed_mean", "mean")
+
+
+class RaterConfig(BaseModel):
+    """单个评分者配置"""
+    name: Optional[str] = None
+    model: Optional[str] = None
+    temperature: float = 0.0
+    role_hint: str = "客观公正的评分者"
+    base_url: Optional[str] = None
+
+
+def parse_rater_configs(raw: str) -> List[RaterConfig]:
+    """解析 SCORING_RATERS（JSON列表）；为空时返回空列表。"""
+    if not raw or not raw.strip():
+        return []
+    raters = [RaterConfig(**item) for item in json.loads(raw)]
+    for i, rater in enumerate(raters):
+        if not rater.name:
+            rater.name = f"Rater{i + 1}"
+    return raters
+
+
+def build_rater_client(rater: RaterConfig) -> ChatOpenAI:
+    return ChatOpenAI(
+        openai_api_key=Config.api_key,
+        model=rater.model or Config.model_name_a,
+        base_url=rater.base_url or Config.base_url,
+        temperature=rater.temperature,
+        timeout=15,
+        max_retries=0,
+        **chat_client_kwargs(),
+    )
+
+
+def _score_matrix(results: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """每行一个评分者，列依次为四个维度；缺失或非数值的维度记为 NaN。"""
+    rows = []
+    for r in results:
+        row = []
+        for k in SCORE_DIMENSIONS:
+            try:
+                row.append(float(r.get(k)))
+            except (TypeError, ValueError):
+                row.append(np.nan)
+        rows.append(row)
+    return np.asarray(rows, dtype=float)
+
+
+def aggregate_scores(results: Sequence[Dict[str, Any]], method: str = "median",
+                     trim_fraction: float = 0.2, default: float = 7.0) -> Dict[str, float]:
+    """按维度聚合多个评分者的分数（忽略缺失值）。"""
+    matrix = _score_matrix(results)
+    merged = {}
+    for j, k in enumerate(SCORE_DIMENSIONS):
+        values = np.sort(matrix[:, j][~np.isnan(matrix[:, j])])
+        if values.size == 0:
+            merged[k] = default
+        elif method == "median":
+            merged[k] = float(np.median(values))
+        elif method == "trimmed_mean":
+            cut = int(values.size * trim_fraction)
+            if values.size - 2 * cut < 1:
+                cut = (values.size - 1) // 2
+            merged[k] = float(values[cut:values.size - cut].mean())
+        else:
+            merged[k] = float(values.mean())
+    return merged
+
+
+def find_agreeing_group(results: Sequence[Dict[str, Any]], quorum: int, tolerance: float) -> Optional[List[int]]:
+    """找出 quorum 个各维度极差均不超过 tolerance 的评分者，返回其下标；不存在时返回 None。"""
+    if quorum <= 0 or len(results) < quorum:
+        return None
+    matrix = _score_matrix(results)
+    for group in combinations(range(len(results)), quorum):
+        sub = matrix[list(group)]
+        if np.isnan(sub).any():
+            continue
+        if float((sub.max(axis=0) - sub.min(axis=0)).max()) <= tolerance:
+            return list(group)
+    return None
+
+
+class EnsembleScorer:
+    """并发调用全部评分者；达到法定人数一致后取消其余调用，否则等全部返回后聚合所有成功结果。"""
+
+    def __init__(self, graph, raters: Sequence[RaterConfig], clients: Optional[Sequence[Any]] = None,
+                 quorum: Optional[int] = None, tolerance: Optional[float] = None,
+                 aggregation: Optional[str] = None, trim_fraction: Optional[float] = None):
+        self.graph = graph
+        self.raters = list(raters)
+        self.clients = list(clients) if clients is not None else [build_rater_client(r) for r in self.raters]
+        self.quorum = min(len(self.raters), Config.SCORING_QUORUM if quorum is None else quorum)
+        self.tolerance = Config.SCORING_AGREEMENT_TOLERANCE if tolerance is None else tolerance
+        self.aggregation = aggregation or Config.SCORING_AGGREGATION
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"未知的聚合方式: {self.aggregation}")
+        self.trim_fraction = Config.SCORING_TRIM_FRACTION if trim_fraction is None else trim_fraction
+        self.early_stops = 0
+        self.cancelled_calls = 0
+
+    def models(self) -> List[str]:
+        return [r.model or Config.model_name_a for r in self.raters]
+
+    def cache_identity(self) -> List[str]:
+        """评分缓存键与近重复命名空间中的集成配置：各评分者的完整配置（名称除外）及聚合参数，
+        任一项变化都会使旧评分失效。"""
+        identity = []
+        for rater in self.raters:
+            config = rater.dict(exclude={"name"})
+            config["model"] = config["model"] or Config.model_name_a
+            config["base_url"] = config["base_url"] or Config.base_url
+            identity.append(json.dumps(config, ensure_ascii=False, sort_keys=True))
+        identity.append(f"quorum={self.quorum};tolerance={self.tolerance};"
+                        f"aggregation={self.aggregation};trim={self.trim_fraction}")
+        return identity
+
+    async def ascore(self, question_content: str, answer_text: str) -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, Any]]:
+        """返回 (参与聚合的 (评分者, 结果) 列表, 聚合结果)；全部失败时聚合结果为空字典。"""
+        tasks = {}
+        for rater, client in zip(self.raters, self.clients):
+            prompt = self.graph._build_evaluation_prompt(rater.role_hint, question_content, answer_text)
+            tasks[asyncio.ensure_future(self.graph._ahedged_call(rater.name, client, prompt))] = rater.name
+
+        succeeded: List[Tuple[str, Dict[str, Any]]] = []
+        pending = set(tasks)
+        group = None
+        try:
+            while pending and group is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        succeeded.append((tasks[task], task.result()))
+                if pending:
+                    group = find_agreeing_group([r for _, r in succeeded], self.quorum, self.tolerance)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if group is not None:
+            self.early_stops += 1
+            self.cancelled_calls += len(pending)
+            succeeded = [succeeded[i] for i in group]
+            _log.info("Quorum of %d reached, cancelled %d outstanding raters", len(group), len(pending))
+        if not succeeded:
+            return [], {}
+        merged: Dict[str, Any] = aggregate_scores([r for _, r in succeeded], self.aggregation, self.trim_fraction)
+        merged["comments"] = " | ".join(f"{name}: {r.get('comments', '')}" for name, r in succeeded)
+        merged["raters"] = len(succeeded)
+        if group is not None:
+            merged["quorum"] = True
+        return succeeded, merged
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "raters": [r.name for r in self.raters],
+            "quorum": self.quorum,
+            "tolerance": self.tolerance,
+            "aggregation": self.aggregation,
+            "early_stops": self.early_stops,
+            "cancelled_calls": self.cancelled_calls,
+        }
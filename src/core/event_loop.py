@@ -0,0 +1,40 @@
+"""
+进程级共享事件循环：所有异步评分协程都在同一个后台线程的事件循环上执行
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def get_shared_loop() -> asyncio.AbstractEventLoop:
+    """获取共享事件循环（首次调用时在守护线程中启动）。"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="shared-event-loop", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def in_shared_loop() -> bool:
+    """当前线程是否就是共享事件循环所在线程。"""
+    return _thread is not None and threading.current_thread() is _thread
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> Future:
+    """将协程提交到共享事件循环，立即返回 concurrent.futures.Future。"""
+    return asyncio.run_coroutine_threadsafe(coro, get_shared_loop())
+
+
+def run_sync(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """在共享事件循环上执行协程并阻塞等待结果。"""
+    if in_shared_loop():
+        coro.close()
+        raise RuntimeError("run_sync 不能在共享事件循环线程内调用，请直接 await 对应协程")
+    return submit(coro).result(timeout)
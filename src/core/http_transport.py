@@ -0,0 +1,161 @@
+"""
+进程级共享HTTP传输：所有 ChatOpenAI 客户端复用同一组长连接池（安装 h2 时启用 HTTP/2）
+"""
+import asyncio
+import importlib.util
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+
+_log = get_app_logger("http_transport")
+
+_lock = threading.Lock()
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_counters = {"requests": 0, "responses": 0, "errors": 0}
+_http2_fallback_logged = False
+
+
+def http2_available() -> bool:
+    """HTTP/2 需要可选依赖 h2。"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _http2_enabled() -> bool:
+    global _http2_fallback_logged
+    if not Config.HTTP2_ENABLED:
+        return False
+    if http2_available():
+        return True
+    if not _http2_fallback_logged:
+        _http2_fallback_logged = True
+        _log.info("h2 not installed, falling back to HTTP/1.1 keep-alive")
+    return False
+
+
+def _transport_options() -> Dict[str, Any]:
+    return {
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    """按事件循环分别建立连接池：异步连接只能在创建它的事件循环上使用，
+    共享事件循环之外的调用（如 asyncio.run）使用各自的连接池。"""
+
+    def __init__(self, **options: Any):
+        self._options = options
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = \
+            weakref.WeakKeyDictionary()
+        self._transports_lock = threading.Lock()
+
+    def _current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._transports_lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._options)
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._transports_lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+    def transports(self) -> List[httpx.AsyncHTTPTransport]:
+        with self._transports_lock:
+            return list(self._transports.values())
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _counters[key] += 1
+
+
+def _on_request(request: httpx.Request) -> None:
+    _count("requests")
+
+
+def _on_response(response: httpx.Response) -> None:
+    _count("errors" if response.status_code >= 400 else "responses")
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    _on_request(request)
+
+
+async def _aon_response(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def get_http_client() -> httpx.Client:
+    """同步调用使用的共享客户端。"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                event_hooks={"request": [_on_request], "response": [_on_response]},
+                transport=httpx.HTTPTransport(**_transport_options()),
+            )
+        return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """异步调用使用的共享客户端；连接池按事件循环区分，可在任意事件循环上使用。"""
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = httpx.AsyncClient(
+                event_hooks={"request": [_aon_request], "response": [_aon_response]},
+                transport=_PerLoopTransport(**_transport_options()),
+            )
+        return _async_client
+
+
+def chat_client_kwargs() -> Dict[str, Any]:
+    """构造 ChatOpenAI 时传入，使其复用共享连接池。"""
+    return {"http_client": get_http_client(), "http_async_client": get_async_http_client()}
+
+
+def _pool_stats(transports: List[Any]) -> Dict[str, Any]:
+    connections = []
+    for transport in transports:
+        pool = getattr(transport, "_pool", None)
+        connections.extend(getattr(pool, "connections", []) or [])
+    return {
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "http2": sum(1 for c in connections if getattr(c, "_connection", None) is not None
+                     and type(c._connection).__name__.startswith("HTTP2")),
+    }
+
+
+def http_pool_stats() -> Dict[str, Any]:
+    """连接池状态与请求计数；async 为所有事件循环连接池的合计，loops 为连接池个数。"""
+    with _lock:
+        counters = dict(_counters)
+        sync_client, async_client = _sync_client, _async_client
+    sync_transports = [getattr(sync_client, "_transport", None)] if sync_client is not None else []
+    async_transport = getattr(async_client, "_transport", None)
+    async_transports = async_transport.transports() if isinstance(async_transport, _PerLoopTransport) else []
+    return {
+        **counters,
+        "http2_enabled": Config.HTTP2_ENABLED and http2_available(),
+        "sync": _pool_stats(sync_transports),
+        "async": {**_pool_stats(async_transports), "loops": len(async_transports)},
+    }
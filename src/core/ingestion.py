@@ -0,0 +1,209 @@
+"""
+离线测评批量导入：读取纸笔测评誊录的 JSONL，并行评分并写入学生档案、测评会话与测评结果
+
+每行一名学生，例如：
+{"student_id": "s001", "name": "张三", "age": 12, "grade": "六年级", "school": "实验小学",
+ "session_id": "可选", "completed_at": "可选，ISO时间",
+ "answers": [{"question_id": "div_1", "answer": "..."},
+             {"question": "请尽可能多地列举出砖头的用途。", "type": "divergent_thinking", "answer": "...", "time_spent": 120}]}
+answers 中的题目可以引用题库ID（question_id），也可以直接给出题目内容（question）。
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+from src.core.question_bank import TEMPLATES, get_question_by_id, to_question
+from src.core.rescoring import PENDING_LEVEL, build_assessment_result
+from src.data.models import Answer, AssessmentSession, Question, QuestionType, StudentProfile
+
+_log = get_app_logger("ingestion")
+
+# 报告中最多保留的失败明细条数
+MAX_REPORTED_FAILURES = 1000
+
+
+def _resolve_question(item: Dict[str, Any], idx: int) -> Question:
+    question_id = item.get("question_id")
+    content = item.get("question")
+    if not content:
+        bank_item = get_question_by_id(question_id) if question_id else None
+        if bank_item is None:
+            raise ValueError(f"第 {idx + 1} 题缺少题目内容，且题库中没有ID {question_id!r}")
+        return to_question(bank_item, idx)
+    qtype = item.get("type") or QuestionType.DIVERGENT_THINKING.value
+    template = TEMPLATES[QuestionType(qtype).value]
+    return to_question({
+        "id": question_id or f"q_{idx}",
+        "type": qtype,
+        "title": item.get("title") or template["title"].format(idx=idx + 1),
+        "content": content,
+        "time_limit": item.get("time_limit", 300),
+        "dimensions": item.get("dimensions") or template["dimensions"],
+        "scoring_criteria": item.get("scoring_criteria", {}),
+    }, idx)
+
+
+def parse_transcript(record: Dict[str, Any]) -> Tuple[StudentProfile, AssessmentSession]:
+    """将一行誊录记录转为学生档案与已完成的测评会话；格式不符时抛出 ValueError。"""
+    student_id = str(record.get("student_id") or "").strip()
+    name = str(record.get("name") or "").strip()
+    if not student_id or not name:
+        raise ValueError("缺少 student_id 或 name")
+    items = record.get("answers") or []
+    if not isinstance(items, list) or not items:
+        raise ValueError("answers 为空")
+    completed_at = datetime.fromisoformat(record["completed_at"]) if record.get("completed_at") else datetime.now()
+    # 未指定会话ID时按记录内容生成，重复导入同一文件不会产生重复会话
+    session_id = record.get("session_id") or "offline_{}".format(
+        hashlib.sha1(json.dumps(record, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16])
+
+    questions: List[Question] = []
+    answers: List[Answer] = []
+    for idx, item in enumerate(items):
+        question = _resolve_question(item, idx)
+        if any(q.id == question.id for q in questions):
+            question = question.copy(update={"id": f"{question.id}_{idx}"})
+        questions.append(question)
+        answers.append(Answer(
+            question_id=question.id,
+            student_id=student_id,
+            content=str(item.get("answer") or ""),
+            timestamp=completed_at,
+            time_spent=int(item.get("time_spent", 0))
+        ))
+
+    profile = StudentProfile(
+        student_id=student_id,
+        name=name,
+        age=int(record.get("age", 0)),
+        grade=str(record.get("grade", "")),
+        school=str(record.get("school", "")),
+        created_at=completed_at,
+        updated_at=completed_at
+    )
+    session = AssessmentSession(
+        session_id=session_id,
+        student_id=student_id,
+        student_name=name,
+        start_time=completed_at,
+        end_time=completed_at,
+        questions=questions,
+        answers=answers,
+        status="completed"
+    )
+    return profile, session
+
+
+class _IngestReport:
+    def __init__(self):
+        self.students = 0
+        self.skipped = 0
+        self.answers = 0
+        self.deferred = 0
+        self.failed = 0
+        self.failures: List[Dict[str, Any]] = []
+
+    def fail(self, line_no: int, student_id: Optional[str], error: str) -> None:
+        self.failed += 1
+        if len(self.failures) < MAX_REPORTED_FAILURES:
+            self.failures.append({"line": line_no, "student_id": student_id, "error": error})
+        _log.warning("ingest line %d (%s) failed: %s", line_no, student_id, error)
+
+
+def _index_answers(graph, session: AssessmentSession) -> None:
+    contents = {q.id: q.content for q in session.questions}
+    for answer in session.answers:
+        graph.originality.add_answer(contents[answer.question_id], answer.content)
+
+
+async def aingest_transcripts(graph, path: str, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """流式读取 JSONL，concurrency 名学生并行评分（每名学生的各题同时评分），返回吞吐与失败统计。"""
+    concurrency = max(1, concurrency or Config.INGEST_CONCURRENCY)
+    db = graph.db
+    report = _IngestReport()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.monotonic()
+
+    async def produce() -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                line_no = 0
+                while True:
+                    lines = await asyncio.to_thread(f.readlines, 1 << 20)
+                    if not lines:
+                        break
+                    for line in lines:
+                        line_no += 1
+                        if line.strip():
+                            await queue.put((line_no, line))
+        finally:
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def ingest_one(line_no: int, line: str) -> None:
+        student_id = None
+        try:
+            record = json.loads(line)
+            student_id = record.get("student_id")
+            profile, session = parse_transcript(record)
+        except Exception as e:
+            report.fail(line_no, student_id, f"格式错误: {e}")
+            return
+        # 已导入的会话跳过；结果仍为待评分（导入时评分服务不可用）的会话重新评分并覆盖结果
+        exists = await asyncio.to_thread(db.assessment_session_exists, session.session_id)
+        if exists and await asyncio.to_thread(db.get_assessment_result_level, session.session_id) != PENDING_LEVEL:
+            report.skipped += 1
+            return
+        contents = {q.id: q.content for q in session.questions}
+        scores = await asyncio.gather(*(
+            graph.ascore_answer(contents[a.question_id], a.content, session.session_id, a.question_id)
+            for a in session.answers
+        ))
+        for answer, answer_scores in zip(session.answers, scores):
+            answer.scores = answer_scores
+        result = build_assessment_result(session.session_id, profile.student_id, profile.name,
+                                         list(scores), session.end_time)
+        if exists:
+            saved = await asyncio.to_thread(db.replace_assessment_results, [result], [session])
+        else:
+            saved = await asyncio.to_thread(db.save_completed_assessment, profile, session, result)
+        if not saved:
+            report.fail(line_no, student_id, "写入数据库失败")
+            return
+        if not exists:
+            # 与在线测评相同：评分完成并保存后再收录进独创性语料（重新导入的会话此前已收录）
+            await asyncio.to_thread(_index_answers, graph, session)
+        report.students += 1
+        report.answers += len(scores)
+        report.deferred += sum(1 for s in scores if s.get("deferred"))
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            try:
+                await ingest_one(*item)
+            except Exception as e:
+                report.fail(item[0], None, str(e))
+
+    await asyncio.gather(produce(), *(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    summary = {
+        "students": report.students,
+        "answers": report.answers,
+        "deferred_answers": report.deferred,
+        "skipped": report.skipped,
+        "failed": report.failed,
+        "failures": report.failures,
+        "elapsed_seconds": elapsed,
+        "answers_per_second": report.answers / elapsed if elapsed > 0 else 0.0,
+    }
+    _log.info("ingest %s: %d students, %d answers, %d skipped, %d failed, %.2f answers/s",
+              path, report.students, report.answers, report.skipped, report.failed, summary["answers_per_second"])
+    return summary
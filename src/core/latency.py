@@ -0,0 +1,49 @@
+"""
+LLM调用延迟统计：按Agent保存最近若干次耗时，计算分位数
+"""
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """内存中的滑动窗口延迟统计（单位：秒）。"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            return len(self._samples.get(name, ()))
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """返回第 pct 百分位延迟；无样本时返回 None。"""
+        with self._lock:
+            data = sorted(self._samples.get(name, ()))
+        if not data:
+            return None
+        rank = min(len(data) - 1, max(0, int(round(pct / 100.0 * (len(data) - 1)))))
+        return data[rank]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各Agent的样本数与 p50/p95/p99。"""
+        with self._lock:
+            names = list(self._samples.keys())
+        result = {}
+        for name in names:
+            result[name] = {
+                "count": self.count(name),
+                "p50": self.percentile(name, 50),
+                "p95": self.percentile(name, 95),
+                "p99": self.percentile(name, 99),
+            }
+        return result
@@ -0,0 +1,98 @@
+"""
+本地确定性预评分：基于答案切分出的想法数量与展开程度估算流畅性、精细性
+"""
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# 序号标记：1. 1、 (1) （1） ① 一、 第一，
+_ENUM_RE = re.compile(
+    r"[①-⑳]|(?:^|(?<=\s))(?:\d{1,2}\s*[\.、\)）:：]|[（(]\s*\d{1,2}\s*[)）]|[一二三四五六七八九十]{1,3}\s*[、\.]|"
+    r"第[一二三四五六七八九十\d]{1,3}[，,、:：]?)"
+)
+_PRIMARY_SPLIT_RE = re.compile(r"[\n\r。；;！!？?、]+")
+_COMMA_SPLIT_RE = re.compile(r"[，,]+")
+_STRIP_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+_LEADING_FILLERS = ("我觉得", "我认为", "可以用来", "可以用作", "可以当作", "可以当", "可以", "用来", "用作", "当作", "作为")
+_CONNECTIVES = (
+    "因为", "所以", "由于", "因此", "例如", "比如", "通过", "从而", "如果", "那么", "并且", "而且",
+    "同时", "然后", "以便", "为了", "首先", "其次", "最后", "具体", "这样", "不仅", "还可以", "甚至",
+)
+
+# 评分曲线参数：想法数 / 平均长度 / 连接词数量达到该尺度时约得 6.3 分
+_FLUENCY_SCALE = 4.0
+_LENGTH_SCALE = 15.0
+_CONNECTIVE_SCALE = 3.0
+
+
+class LexicalScorer:
+    """纯本地的流畅性/精细性估算器，无需LLM调用。"""
+
+    def segment(self, text: str) -> List[str]:
+        """将答案切分为想法片段（按换行、句末标点、顿号、序号；单行列表再按逗号切分）。"""
+        text = _ENUM_RE.sub("\n", text or "")
+        parts = [p.strip() for p in _PRIMARY_SPLIT_RE.split(text) if p.strip()]
+        if len(parts) <= 1:
+            parts = [p.strip() for p in _COMMA_SPLIT_RE.split(text) if p.strip()]
+        return parts
+
+    def _idea_key(self, segment: str) -> str:
+        key = _STRIP_RE.sub("", segment)
+        for filler in _LEADING_FILLERS:
+            if key.startswith(filler) and len(key) > len(filler):
+                key = key[len(filler):]
+                break
+        return key
+
+    def ideas(self, text: str) -> List[str]:
+        """去重后的想法列表（保留首次出现的原文片段）。"""
+        seen = set()
+        result = []
+        for segment in self.segment(text):
+            key = self._idea_key(segment)
+            if key and key not in seen:
+                seen.add(key)
+                result.append(segment)
+        return result
+
+    def idea_keys(self, text: str) -> List[str]:
+        """去重后想法的归一化形式（去标点空白与常见引导语），可作为词项使用。"""
+        return list(dict.fromkeys(k for k in (self._idea_key(s) for s in self.segment(text)) if k))
+
+    def features(self, text: str) -> Dict[str, float]:
+        """计数特征：想法数、平均片段长度、连接词数量、总长度。"""
+        ideas = self.ideas(text)
+        lengths = [len(_STRIP_RE.sub("", s)) for s in ideas]
+        body = text or ""
+        return {
+            "ideas": float(len(ideas)),
+            "mean_length": float(sum(lengths) / len(lengths)) if lengths else 0.0,
+            "connectives": float(sum(body.count(c) for c in _CONNECTIVES)),
+            "total_length": float(len(_STRIP_RE.sub("", body))),
+        }
+
+    def _score_matrix(self, feats: np.ndarray) -> np.ndarray:
+        """feats 列为 [ideas, mean_length, connectives]，返回 [fluency, elaboration] 两列（0-10）。"""
+        ideas, mean_length, connectives = feats[:, 0], feats[:, 1], feats[:, 2]
+        fluency = 10.0 * (1.0 - np.exp(-ideas / _FLUENCY_SCALE))
+        elaboration = 10.0 * (0.6 * (1.0 - np.exp(-mean_length / _LENGTH_SCALE))
+                              + 0.4 * (1.0 - np.exp(-connectives / _CONNECTIVE_SCALE)))
+        elaboration = np.where(ideas > 0, elaboration, 0.0)
+        return np.round(np.stack([fluency, elaboration], axis=1), 2)
+
+    def score(self, text: str) -> Dict[str, float]:
+        """单条答案的流畅性与精细性估算。"""
+        f = self.features(text)
+        fluency, elaboration = self._score_matrix(np.array([[f["ideas"], f["mean_length"], f["connectives"]]]))[0]
+        return {"fluency": float(fluency), "elaboration": float(elaboration)}
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """批量估算，返回形如 (n, 2) 的数组，列依次为 fluency、elaboration。"""
+        if not texts:
+            return np.zeros((0, 2))
+        rows = []
+        for text in texts:
+            f = self.features(text)
+            rows.append((f["ideas"], f["mean_length"], f["connectives"]))
+        return self._score_matrix(np.asarray(rows, dtype=float))
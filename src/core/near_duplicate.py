@@ -0,0 +1,169 @@
+"""
+近重复答案检测：字符 shingle 的 MinHash 签名 + LSH 分桶，命中时复用已有评分
+"""
+import re
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+from src.core.originality_index import question_key
+from src.data.database import DatabaseManager
+
+_log = get_app_logger("near_duplicate")
+_STRIP_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_rng = np.random.RandomState(20240601)
+# multiply-shift 哈希族：h(x) = ((a * x + b) mod 2^64) >> 32，a 取奇数
+_HASH_A = (_rng.randint(1, 2 ** 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64) << np.uint64(32)) | \
+    _rng.randint(0, 2 ** 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_HASH_B = _rng.randint(0, 2 ** 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    body = _STRIP_RE.sub("", unicodedata.normalize("NFKC", text or "").lower())
+    if len(body) <= SHINGLE_SIZE:
+        grams = {body} if body else set()
+    else:
+        grams = {body[i:i + SHINGLE_SIZE] for i in range(len(body) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """计算 MinHash 签名（NUM_PERM 个 uint32）；空文本返回 None。"""
+    shingles = _shingles(text)
+    if shingles.size == 0:
+        return None
+    with np.errstate(over="ignore"):
+        hashed = (np.outer(_HASH_A, shingles) + _HASH_B[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """内存有界（LRU）的 LSH 索引，签名与评分持久化在 answer_signatures 表中。"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None,
+                 threshold: Optional[float] = None,
+                 max_entries: Optional[int] = None,
+                 min_chars: Optional[int] = None,
+                 namespace: str = ""):
+        self.db = db or DatabaseManager()
+        # 评分模型/提示词版本等；不同命名空间的评分互不复用
+        self.namespace = namespace
+        self.threshold = Config.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        self.max_entries = Config.NEAR_DUPLICATE_MAX_ENTRIES if max_entries is None else max_entries
+        self.min_chars = Config.NEAR_DUPLICATE_MIN_CHARS if min_chars is None else min_chars
+        # entry_id -> (question_key, 签名字节)
+        self._entries: "OrderedDict[int, Tuple[str, bytes]]" = OrderedDict()
+        self._buckets: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._adds_since_prune = 0
+        self.lookups = 0
+        self.hits = 0
+
+    def _band_keys(self, qkey: str, signature: np.ndarray) -> List[int]:
+        return [hash((qkey, band, signature[band * ROWS:(band + 1) * ROWS].tobytes())) for band in range(BANDS)]
+
+    def _insert(self, entry_id: int, qkey: str, signature: np.ndarray) -> None:
+        self._entries[entry_id] = (qkey, signature.tobytes())
+        for key in self._band_keys(qkey, signature):
+            self._buckets.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            old_id, (old_qkey, old_sig) = self._entries.popitem(last=False)
+            for key in self._band_keys(old_qkey, np.frombuffer(old_sig, dtype=np.uint32)):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            count = 0
+            for entry_id, qkey, sig_bytes in self.db.iter_answer_signatures(self.max_entries):
+                self._insert(entry_id, qkey, np.frombuffer(sig_bytes, dtype=np.uint32))
+                count += 1
+            self._loaded = True
+        _log.info("loaded %d answer signatures", count)
+
+    def _question_key(self, question_content: str) -> str:
+        return question_key(f"{self.namespace}\n{question_content}" if self.namespace else question_content)
+
+    def _eligible(self, answer_text: str) -> bool:
+        return len(_STRIP_RE.sub("", answer_text or "")) >= self.min_chars
+
+    def lookup(self, question_content: str, answer_text: str) -> Optional[Dict[str, Any]]:
+        """查找同题近重复答案，命中时返回 {"evaluation", "similarity", "entry_id"}。"""
+        if not self._eligible(answer_text):
+            return None
+        signature = minhash_signature(answer_text)
+        if signature is None:
+            return None
+        self._ensure_loaded()
+        qkey = self._question_key(question_content)
+        best_id, best_sim = None, 0.0
+        with self._lock:
+            self.lookups += 1
+            candidates: Set[int] = set()
+            for key in self._band_keys(qkey, signature):
+                candidates |= self._buckets.get(key, set())
+            for entry_id in candidates:
+                sim = float(np.mean(np.frombuffer(self._entries[entry_id][1], dtype=np.uint32) == signature))
+                if sim > best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None or best_sim < self.threshold:
+                return None
+            self._entries.move_to_end(best_id)
+        evaluation = self.db.get_answer_signature_evaluation(best_id)
+        if evaluation is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        return {"evaluation": evaluation, "similarity": round(best_sim, 3), "entry_id": best_id}
+
+    def add(self, question_content: str, answer_text: str, evaluation: Dict[str, Any]) -> bool:
+        """收录一份已评分答案的签名。"""
+        if not self._eligible(answer_text):
+            return False
+        signature = minhash_signature(answer_text)
+        if signature is None:
+            return False
+        self._ensure_loaded()
+        qkey = self._question_key(question_content)
+        entry_id = self.db.add_answer_signature(qkey, signature.tobytes(), evaluation)
+        if entry_id is None:
+            return False
+        with self._lock:
+            self._insert(entry_id, qkey, signature)
+            self._adds_since_prune += 1
+            need_prune = self._adds_since_prune >= 1000
+            if need_prune:
+                self._adds_since_prune = 0
+        if need_prune:
+            # 持久化部分同样只保留内存索引可容纳的最新签名
+            self.db.prune_answer_signatures(self.max_entries)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "buckets": len(self._buckets),
+                "lookups": self.lookups,
+                "hits": self.hits,
+            }
@@ -0,0 +1,79 @@
+"""
+基于历史答案语料的统计独创性：每道题维护想法词项 -> 文档频率的倒排索引
+
+词项为各想法归一化文本的字符 bigram：同一想法换种说法仍有大量相同词项，统计的是想法稀有度而非措辞
+"""
+import hashlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from src.core.config import Config
+from src.core.lexical_scorer import LexicalScorer
+from src.core.logging_utils import get_app_logger
+from src.core.score_cache import normalize_text
+from src.data.database import DatabaseManager
+
+_log = get_app_logger("originality_index")
+
+# 词项的字符 n-gram 长度（中文词多为两字）
+_TERM_NGRAM = 2
+
+
+def question_key(question_content: str) -> str:
+    """题目内容的稳定标识（同一题面共享同一份语料统计）。"""
+    return hashlib.sha1(normalize_text(question_content).encode("utf-8")).hexdigest()[:16]
+
+
+class OriginalityIndex:
+    """增量维护的独创性倒排索引，持久化在 idea_terms / idea_corpus 表中。"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, lexical: Optional[LexicalScorer] = None,
+                 min_documents: Optional[int] = None):
+        self.db = db or DatabaseManager()
+        self.lexical = lexical or LexicalScorer()
+        self.min_documents = Config.ORIGINALITY_MIN_DOCUMENTS if min_documents is None else min_documents
+
+    def terms(self, answer_text: str) -> List[str]:
+        """答案中去重后的想法词项：每个想法的字符 bigram（不跨想法拼接），单字想法取其本身。"""
+        terms = []
+        for key in self.lexical.idea_keys(answer_text):
+            if len(key) <= _TERM_NGRAM:
+                terms.append(key)
+            else:
+                terms.extend(key[i:i + _TERM_NGRAM] for i in range(len(key) - _TERM_NGRAM + 1))
+        return list(dict.fromkeys(terms))
+
+    def add_answer(self, question_content: str, answer_text: str) -> bool:
+        """收录一份新答案（测评完成、离线导入保存后调用）。"""
+        terms = self.terms(answer_text)
+        if not terms:
+            return False
+        return self.db.add_idea_document(question_key(question_content), terms)
+
+    def score(self, question_content: str, answer_text: str) -> Optional[float]:
+        """统计独创性（0-10）：各想法在同题历史答案中出现比例越低得分越高；语料不足时返回 None。"""
+        terms = self.terms(answer_text)
+        if not terms:
+            return None
+        doc_count, dfs = self.db.get_idea_term_stats(question_key(question_content), terms)
+        if doc_count < self.min_documents:
+            return None
+        rarity = [1.0 - min(dfs.get(t, 0), doc_count) / doc_count for t in terms]
+        return round(10.0 * sum(rarity) / len(rarity), 2)
+
+    def rebuild(self, chunk_size: int = 500) -> Dict[str, int]:
+        """从 assessment_sessions 中的全部历史答案批量重建索引。"""
+        doc_counts: Counter = Counter()
+        term_dfs: Dict[str, Counter] = defaultdict(Counter)
+        answers = 0
+        for question_content, answer_text in self.db.iter_session_answers(chunk_size):
+            terms = self.terms(answer_text)
+            if not terms:
+                continue
+            key = question_key(question_content)
+            doc_counts[key] += 1
+            term_dfs[key].update(terms)
+            answers += 1
+        self.db.replace_idea_index(dict(doc_counts), {k: dict(v) for k, v in term_dfs.items()})
+        _log.info("rebuild: %d answers, %d questions", answers, len(doc_counts))
+        return {"answers": answers, "questions": len(doc_counts)}
@@ -1,10 +1,17 @@
 import os
 import json
 import random
-from typing import Dict, List
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
 
-from src.data.models import CreativityDimension, QuestionType
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+from src.core.seen_set import SeenSet, question_key
+from src.data.models import CreativityDimension, Question, QuestionType
+
+_log = get_app_logger("question_bank")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 QUESTIONS_DIR = os.path.join(BASE_DIR, "..", "questions")
@@ -51,7 +58,12 @@ PROBLEMS = [
 ]
 SCENES = ["未来学校", "外星球", "海底城市", "天空之城", "微缩世界", "蒸汽朋克城市"]
 
+# 当前题库快照；重新加载时整体替换引用，正在使用旧快照的调用不受影响
 _cache: Dict[str, List[Dict]] = {}
+_index: Optional["QuestionIndex"] = None
+_signature: Optional[Tuple] = None
+_index_lock = threading.Lock()
+_reloader: Optional["QuestionBankReloader"] = None
 
 
 def _ensure_dir() -> None:
@@ -95,11 +107,8 @@ def ensure_question_files(count_per_type: int = 100) -> None:
                 json.dump(data, f, ensure_ascii=False, indent=2)
 
 
-def load_questions() -> Dict[str, List[Dict]]:
-    """加载题库到内存（带缓存）。返回 dict: qtype -> list[question dict]"""
-    if _cache:
-        return _cache
-    ensure_question_files()
+def _read_json_bank(strict: bool = False) -> Dict[str, List[Dict]]:
+    """读取各类型JSON题库文件；strict 为 True 时文件无法解析直接抛出异常（而非记为空）。"""
     result: Dict[str, List[Dict]] = {}
     for qtype, fname in FILE_MAP.items():
         fpath = os.path.join(QUESTIONS_DIR, fname)
@@ -107,30 +116,340 @@ def load_questions() -> Dict[str, List[Dict]]:
             with open(fpath, "r", encoding="utf-8") as f:
                 result[qtype] = json.load(f)
         except Exception:
+            if strict:
+                raise
             result[qtype] = []
-    _cache.update(result)
+    return result
+
+
+def load_questions() -> Dict[str, List[Dict]]:
+    """加载题库到内存（带缓存，题库文件变化后由 reload_question_bank 刷新）。返回 dict: qtype -> list[question dict]"""
+    global _cache
+    if _cache:
+        return _cache
+    ensure_question_files()
+    _cache = _read_json_bank()
     return _cache
 
 
+def _sample_distinct(pool: Sequence[int], k: int, exclude: set, rng: random.Random,
+                     reject: Optional[Callable[[int], bool]] = None) -> List[int]:
+    """从 pool 中抽取 k 个不在 exclude 中、且不被 reject 排除的不同元素。
+
+    k 远小于 pool 时按拒绝采样，代价与 pool 大小无关；被 reject 排除的元素过多（抽取次数超限）时退回逐个筛选。
+    """
+    if k <= 0 or not pool:
+        return []
+    if k * 4 < len(pool) and len(exclude) * 4 < len(pool):
+        picked: List[int] = []
+        seen = set(exclude)
+        attempts = 8 * k + 32
+        while len(picked) < k and attempts > 0:
+            attempts -= 1
+            item = pool[rng.randrange(len(pool))]
+            if item in seen:
+                continue
+            seen.add(item)
+            if reject is None or not reject(item):
+                picked.append(item)
+        if len(picked) == k:
+            return picked
+    candidates = [i for i in pool if i not in exclude and (reject is None or not reject(i))]
+    return rng.sample(candidates, min(k, len(candidates)))
+
+
+class QuestionIndex:
+    """题库内存索引：题目一次性校验为 Question，按类型、维度分桶（桶内保存题目下标），按ID查找。"""
+
+    def __init__(self, bank: Dict[str, List[Dict]]):
+        self.items: List[Dict] = []
+        self.questions: List[Question] = []
+        self.by_type: Dict[QuestionType, List[int]] = {}
+        self.by_dimension: Dict[CreativityDimension, List[int]] = {d: [] for d in CreativityDimension}
+        self.by_id: Dict[str, int] = {}
+        for items in bank.values():
+            for item in items:
+                try:
+                    question = to_question(item, len(self.questions))
+                except Exception:
+                    continue
+                pos = len(self.questions)
+                self.items.append(item)
+                self.questions.append(question)
+                self.by_type.setdefault(question.type, []).append(pos)
+                for d in set(question.dimensions):
+                    self.by_dimension[d].append(pos)
+                self.by_id.setdefault(question.id, pos)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def question(self, pos: int) -> Question:
+        return self.questions[pos]
+
+    def item(self, pos: int) -> Dict:
+        return self.items[pos]
+
+    def dimensions(self, pos: int) -> set:
+        return set(self.questions[pos].dimensions)
+
+    def key(self, pos: int) -> int:
+        """题目在学生已做集合（SeenSet）中的键。"""
+        return question_key(self.questions[pos].id)
+
+    def position(self, question_id: str) -> Optional[int]:
+        return self.by_id.get(question_id)
+
+    def get(self, question_id: str) -> Optional[Question]:
+        pos = self.position(question_id)
+        return None if pos is None else self.question(pos)
+
+    def get_item(self, question_id: str) -> Optional[Dict]:
+        pos = self.position(question_id)
+        return None if pos is None else self.item(pos)
+
+    def _allocate(self, k: int, rng: random.Random) -> Dict[QuestionType, int]:
+        """按类型均分 k 道题，余数随机分配；某类型题目不足时差额转给其余类型。"""
+        types = [t for t, pool in self.by_type.items() if pool]
+        alloc = {t: 0 for t in types}
+        remaining = min(k, len(self))
+        while remaining > 0:
+            open_types = [t for t in types if alloc[t] < len(self.by_type[t])]
+            per, extra = divmod(remaining, len(open_types))
+            lucky = set(rng.sample(open_types, extra))
+            for t in open_types:
+                add = min(per + (1 if t in lucky else 0), len(self.by_type[t]) - alloc[t])
+                alloc[t] += add
+                remaining -= add
+        return alloc
+
+    def _cover_dimensions(self, picked: List[int], rng: random.Random,
+                          reject: Optional[Callable[[int], bool]] = None) -> None:
+        """用包含缺失维度的题目替换一道其维度已被其余题目覆盖的题目，尽量覆盖全部维度。"""
+        counts = Counter(d for pos in picked for d in self.dimensions(pos))
+        for d in CreativityDimension:
+            if counts[d] or not self.by_dimension[d]:
+                continue
+            replaceable = [i for i, pos in enumerate(picked)
+                           if all(counts[x] > 1 for x in self.dimensions(pos))]
+            if not replaceable:
+                continue
+            new = _sample_distinct(self.by_dimension[d], 1, set(picked), rng, reject)
+            if not new:
+                continue
+            slot = rng.choice(replaceable)
+            for x in self.dimensions(picked[slot]):
+                counts[x] -= 1
+            picked[slot] = new[0]
+            for x in self.dimensions(new[0]):
+                counts[x] += 1
+
+    def sample_positions(self, k: int, rng: Optional[random.Random] = None, cover_dimensions: bool = True,
+                         seen: Optional[SeenSet] = None) -> List[int]:
+        rng = rng or random
+        reject = (lambda pos: self.key(pos) in seen) if seen else None
+        picked: List[int] = []
+        for qtype, n in self._allocate(k, rng).items():
+            picked.extend(_sample_distinct(self.by_type[qtype], n, set(), rng, reject))
+        shortfall = min(k, len(self)) - len(picked)
+        if shortfall > 0:
+            # 某类型未做过的题目不足：先从其余类型补未做过的题，仍不足时才允许重复
+            picked.extend(_sample_distinct(range(len(self)), shortfall, set(picked), rng, reject))
+            shortfall = min(k, len(self)) - len(picked)
+            if shortfall > 0:
+                picked.extend(_sample_distinct(range(len(self)), shortfall, set(picked), rng))
+        if cover_dimensions:
+            self._cover_dimensions(picked, rng, reject)
+        rng.shuffle(picked)
+        return picked
+
+    def sample(self, k: int, rng: Optional[random.Random] = None, cover_dimensions: bool = True,
+               seen: Optional[SeenSet] = None) -> List[Question]:
+        """按类型分层抽取 k 道不重复的题目，题量允许时保证覆盖全部创造力维度；代价为 O(k)，与题库规模无关。
+
+        给出 seen（学生已做过的题目）时抽样中直接跳过已做题目，未做题目不足时才用已做题目补足。
+        """
+        return [self.question(pos) for pos in self.sample_positions(k, rng, cover_dimensions, seen)]
+
+
+def _json_bank_paths() -> List[str]:
+    return [os.path.join(QUESTIONS_DIR, fname) for fname in FILE_MAP.values()]
+
+
+def _bank_signature() -> Tuple:
+    """实际加载的题库文件的 (路径, mtime, 大小)，用于检测变化：存在 JSONL 题库时为其本身及索引，否则为JSON题库。"""
+    from src.core.question_store import JSONL_BANK_PATH, index_paths, jsonl_bank_exists
+
+    if jsonl_bank_exists(JSONL_BANK_PATH):
+        return _file_signature([JSONL_BANK_PATH, *index_paths(JSONL_BANK_PATH)])
+    return _file_signature(_json_bank_paths())
+
+
+def _file_signature(paths: Sequence[str]) -> Tuple:
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def get_question_index() -> QuestionIndex:
+    """题库索引（首次调用时构建）；存在 questions/bank.jsonl 及其索引时以 mmap 方式打开（打开失败时回退），否则加载JSON题库。
+
+    QUESTION_BANK_RELOAD_SECONDS > 0 时同时启动后台线程，题库文件变化后自动重新加载。
+    """
+    global _index, _signature
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from src.core.question_store import JSONL_BANK_PATH, MmapQuestionIndex, jsonl_bank_exists
+                ensure_question_files()
+                _signature = _bank_signature()
+                index = None
+                if jsonl_bank_exists(JSONL_BANK_PATH):
+                    try:
+                        index = MmapQuestionIndex(JSONL_BANK_PATH)
+                        if not len(index):
+                            index.close()
+                            raise ValueError("question bank is empty")
+                    except Exception as e:
+                        # 索引与题库不匹配（写入中途、代次过期）、文件损坏或为空时回退JSON题库，待重新加载时再切换
+                        _log.warning("Cannot open %s, falling back to JSON question bank: %s", JSONL_BANK_PATH, e)
+                        index = None
+                _index = index if index is not None else QuestionIndex(load_questions())
+        if Config.QUESTION_BANK_RELOAD_SECONDS > 0:
+            start_question_bank_reloader()
+    return _index
+
+
+def reload_question_bank(force: bool = False) -> bool:
+    """题库文件有变化（或 force）时在当前线程解析并构建新索引，再原子替换当前快照；返回是否替换。
+
+    解析失败（如文件正在写入）时保留旧快照，待文件再次变化后重试。
+    """
+    global _index, _cache, _signature
+    from src.core.question_store import JSONL_BANK_PATH, MmapQuestionIndex, jsonl_bank_exists
+
+    signature = _bank_signature()
+    if not force and signature == _signature:
+        return False
+    try:
+        if jsonl_bank_exists(JSONL_BANK_PATH):
+            bank: Dict[str, List[Dict]] = {}
+            index = MmapQuestionIndex(JSONL_BANK_PATH)
+        else:
+            bank = _read_json_bank(strict=True)
+            index = QuestionIndex(bank)
+    except Exception as e:
+        _log.warning("Question bank reload failed, keeping previous snapshot: %s", e)
+        _signature = signature
+        return False
+    with _index_lock:
+        old = _index
+        _index, _cache, _signature = index, bank, signature
+    _log.info("Question bank reloaded: %d questions", len(index))
+    _close_later(old)
+    return True
+
+
+def _close_later(index: Optional[QuestionIndex]) -> None:
+    """旧的 mmap 快照在宽限期后关闭（已取得旧快照的抽题请求可继续完成），释放映射与文件描述符。"""
+    close = getattr(index, "close", None)
+    if close is None:
+        return
+    timer = threading.Timer(max(0.0, Config.QUESTION_BANK_CLOSE_GRACE_SECONDS), close)
+    timer.daemon = True
+    timer.start()
+
+
+class QuestionBankReloader:
+    """后台轮询题库文件的 mtime/大小；连续两次轮询结果一致（文件已写完）后重新加载。"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = Config.QUESTION_BANK_RELOAD_SECONDS if interval is None else interval
+        self.reloads = 0
+        self._last_seen: Optional[Tuple] = None
+        self._json_seen: Optional[Tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _warn_ignored_json_edits(self) -> None:
+        """JSONL 题库存在时JSON题库不再被加载；其被修改时提示重新转换，而不是静默忽略。"""
+        from src.core.question_store import JSONL_BANK_PATH, jsonl_bank_exists
+
+        json_signature = _file_signature(_json_bank_paths())
+        if self._json_seen is not None and json_signature != self._json_seen and jsonl_bank_exists(JSONL_BANK_PATH):
+            _log.warning("JSON question files changed but %s is being served; run scripts/convert_question_bank.py "
+                         "to apply the edits", JSONL_BANK_PATH)
+        self._json_seen = json_signature
+
+    def poll(self) -> bool:
+        self._warn_ignored_json_edits()
+        signature = _bank_signature()
+        if signature == _signature or signature != self._last_seen:
+            self._last_seen = signature
+            return False
+        if reload_question_bank():
+            self.reloads += 1
+            return True
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                _log.warning("Question bank poll failed: %s", e)
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="question-bank-reloader", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+
+def start_question_bank_reloader() -> QuestionBankReloader:
+    """启动（或返回已启动的）进程级题库重新加载线程。"""
+    global _reloader
+    with _index_lock:
+        if _reloader is None:
+            _reloader = QuestionBankReloader()
+            _reloader.start()
+        return _reloader
+
+
+def sample_questions(num_total: int, seen: Optional[SeenSet] = None) -> List[Question]:
+    """分层抽样合计 num_total 道题（尽量避开 seen 中的已做题目），返回已校验的 Question。"""
+    return get_question_index().sample(num_total, seen=seen)
+
+
 def sample_questions_per_type(num_total: int) -> List[Dict]:
-    """按各类型均衡或随机抽样合计 num_total 道题。"""
-    bank = load_questions()
-    # 简单均匀分配
-    types = list(bank.keys())
-    per = max(1, num_total // max(1, len(types)))
-    sampled: List[Dict] = []
-    for t in types:
-        pool = bank.get(t, [])
-        if not pool:
-            continue
-        k = min(per, len(pool))
-        sampled.extend(random.sample(pool, k))
-    # 若不足，继续从所有池中补齐
-    if len(sampled) < num_total:
-        all_pool = [q for lst in bank.values() for q in lst]
-        remaining = num_total - len(sampled)
-        if all_pool:
-            sampled.extend(random.sample(all_pool, min(remaining, len(all_pool))))
-    # 打乱
-    random.shuffle(sampled)
-    return sampled[:num_total]
+    """按各类型均衡抽样合计 num_total 道题（返回题库原始条目）。"""
+    index = get_question_index()
+    return [index.item(pos) for pos in index.sample_positions(num_total)]
+
+
+def get_question_by_id(question_id: str) -> Optional[Dict]:
+    """按题目ID查找题库中的题目。"""
+    return get_question_index().get_item(question_id)
+
+
+def to_question(item: Dict, idx: int = 0) -> Question:
+    """题库条目（dict）转为 Question 模型。"""
+    return Question(
+        id=item.get("id", f"q_{idx}"),
+        type=QuestionType(item["type"]),
+        title=item["title"],
+        content=item["content"],
+        time_limit=int(item.get("time_limit", 300)),
+        dimensions=[CreativityDimension(d) for d in item.get("dimensions", [])],
+        scoring_criteria=item.get("scoring_criteria", {})
+    )
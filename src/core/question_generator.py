@@ -0,0 +1,283 @@
+"""
+大规模题库生成：枚举 模板变体 × 填充项 × 数量要求 × 附加要求 的笛卡尔空间，按内容哈希去重，
+多进程分片流式写出后合并为 JSONL 题库（格式见 src/core/question_store.py）；可选由LLM扩充填充项
+"""
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+from src.core.question_bank import ITEM_LISTS, PROBLEMS, SCENES, TEMPLATES, THEMES, _read_json_bank
+from src.core.question_store import JSONL_BANK_PATH, write_jsonl_bank
+from src.core.score_cache import normalize_text
+from src.data.models import QuestionType
+
+_log = get_app_logger("question_generator")
+
+# 各题型的题干变体、填充槽位与可选的数量要求
+CONTENT_VARIANTS = {
+    QuestionType.DIVERGENT_THINKING.value: [
+        "请尽可能多地列举出{主题}的用途。至少写出{n}个不同的用途。",
+        "除了常见用途之外，{主题}还可以用来做什么？请写出至少{n}种不寻常的用法。",
+        "如果手边只有{主题}这一种工具，你能用它完成哪些事情？请至少列举{n}个。",
+        "请想一想{主题}在家里、学校和户外分别能发挥什么作用，合计至少写出{n}个。",
+    ],
+    QuestionType.CONVERGENT_THINKING.value: [
+        "请找出以下物品的共同点：{物品列表}。至少找出{n}个共同特征。",
+        "{物品列表}之间有什么相似之处？请从形状、用途、材料等角度至少说出{n}点。",
+        "请为{物品列表}归纳一个共同的类别，并给出至少{n}条理由。",
+    ],
+    QuestionType.CREATIVE_PROBLEM_SOLVING.value: [
+        "请设计一个创新的解决方案来解决以下问题：{问题描述}。",
+        "针对“{问题描述}”，请提出{n}个不同的创新方案，并选出你认为最好的一个加以说明。",
+        "请从科技、制度、个人习惯三个角度思考：{问题描述}？每个角度至少给出{n}条建议。",
+    ],
+    QuestionType.IMAGINATION.value: [
+        "请描述一个想象中的{场景}，要求具有创新性和独特性。",
+        "假如你明天醒来身处{场景}，请描述你这一天的经历，至少包含{n}个新奇的细节。",
+        "请为{场景}设计{n}项独特的规则或发明，并说明它们如何运作。",
+    ],
+}
+SLOTS = {
+    QuestionType.DIVERGENT_THINKING.value: "主题",
+    QuestionType.CONVERGENT_THINKING.value: "物品列表",
+    QuestionType.CREATIVE_PROBLEM_SOLVING.value: "问题描述",
+    QuestionType.IMAGINATION.value: "场景",
+}
+COUNT_OPTIONS = {
+    QuestionType.DIVERGENT_THINKING.value: [5, 8, 10, 15],
+    QuestionType.CONVERGENT_THINKING.value: [3, 5, 8],
+    QuestionType.CREATIVE_PROBLEM_SOLVING.value: [2, 3, 5],
+    QuestionType.IMAGINATION.value: [3, 5],
+}
+CONSTRAINTS = ["", "请尽量写出别人想不到的答案。", "请在回答中说明你的思考过程。", "请先写出最先想到的点子，再补充更独特的想法。"]
+DEFAULT_SLOT_VALUES = {"主题": THEMES, "物品列表": ITEM_LISTS, "问题描述": PROBLEMS, "场景": SCENES}
+SLOT_DESCRIPTIONS = {
+    "主题": "日常物品（如砖头、回形针）",
+    "物品列表": "由三个相关物品组成、用顿号分隔的列表（如“苹果、橙子、香蕉”）",
+    "问题描述": "以“如何”开头、适合中小学生思考的生活或社会问题（如“如何节约用水”）",
+    "场景": "富有想象力的场景（如海底城市、天空之城）",
+}
+SCORING_CRITERIA = {
+    "fluency_weight": 0.3,
+    "flexibility_weight": 0.3,
+    "originality_weight": 0.2,
+    "elaboration_weight": 0.2,
+}
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(normalize_text(content).encode("utf-8")).hexdigest()
+
+
+def space_size(qtype: str, slot_values: Dict[str, Sequence[str]]) -> int:
+    """该题型模板空间的组合数。"""
+    return (len(CONTENT_VARIANTS[qtype]) * len(slot_values[SLOTS[qtype]])
+            * len(COUNT_OPTIONS[qtype]) * len(CONSTRAINTS))
+
+
+def _stride(total: int) -> int:
+    """与 total 互素的步长，使 i -> i*stride % total 成为一个打散的排列（截取前 N 个时各维度分布均匀）。"""
+    stride = max(1, int(total * 0.618))
+    while math.gcd(stride, total) != 1:
+        stride += 1
+    return stride
+
+
+def build_candidate(qtype: str, slot_values: Dict[str, Sequence[str]], flat: int) -> Dict[str, Any]:
+    """按混合进制解码组合下标并生成题目；题目ID由内容哈希得到，重复生成时保持不变。"""
+    values = slot_values[SLOTS[qtype]]
+    rest, constraint = divmod(flat, len(CONSTRAINTS))
+    rest, count = divmod(rest, len(COUNT_OPTIONS[qtype]))
+    variant, value = divmod(rest, len(values))
+    content = CONTENT_VARIANTS[qtype][variant].format(**{SLOTS[qtype]: values[value], "n": COUNT_OPTIONS[qtype][count]})
+    if CONSTRAINTS[constraint]:
+        content = f"{content}{CONSTRAINTS[constraint]}"
+    digest = content_hash(content)
+    return {
+        "id": f"{qtype[:3]}_{digest[:12]}",
+        "type": qtype,
+        "title": TEMPLATES[qtype]["title"].format(idx=flat + 1),
+        "content": content,
+        "time_limit": 300,
+        "dimensions": TEMPLATES[qtype]["dimensions"],
+        "scoring_criteria": dict(SCORING_CRITERIA),
+        "generated_at": datetime.now().isoformat(),
+    }
+
+
+def _generate_shard(task: Tuple[str, Dict[str, List[str]], int, int, int, str]) -> Tuple[str, int, int]:
+    """子进程：生成排列中 [start, stop) 段的题目，分片内去重后逐行写入 shard_path。返回 (路径, 候选数, 写入数)。"""
+    qtype, slot_values, start, stop, total, shard_path = task
+    stride = _stride(total)
+    seen = set()
+    written = 0
+    with open(shard_path, "w", encoding="utf-8") as f:
+        for i in range(start, stop):
+            item = build_candidate(qtype, slot_values, (i * stride) % total)
+            digest = item["id"]
+            if digest in seen:
+                continue
+            seen.add(digest)
+            f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+            written += 1
+    return shard_path, stop - start, written
+
+
+def _strip_list_marker(line: str) -> str:
+    return re.sub(r"^\s*(?:[-*•·]|\d+[.、)）]|[（(]\d+[)）])\s*", "", line).strip().strip("“”\"'")
+
+
+async def aexpand_slot_values(llm_client, slot_values: Dict[str, Sequence[str]], per_slot: int,
+                              concurrency: Optional[int] = None, batch: int = 20) -> Dict[str, List[str]]:
+    """请LLM为每个填充槽位补充约 per_slot 个新值（并发受 concurrency 与模型限流器约束），失败的请求跳过。
+
+    不同槽位并发请求；同一槽位按批依次请求，已收集的值写入后续提示词，避免各批返回相同内容。
+    """
+    from langchain.schema import HumanMessage
+    from src.core.rate_limit import get_rate_limiter
+
+    semaphore = asyncio.Semaphore(max(1, concurrency or Config.GENERATOR_LLM_CONCURRENCY))
+    limiter = get_rate_limiter(getattr(llm_client, "model_name", None))
+
+    async def ask(slot: str, seeds: Sequence[str], n: int) -> List[str]:
+        prompt = (
+            f"请列出{n}个{SLOT_DESCRIPTIONS[slot]}，用于中小学生创造力测评题目。"
+            f"不要与以下已有内容重复：{'、'.join(seeds[-30:])}。\n"
+            "每行一个，只输出内容本身，不要编号和解释。"
+        )
+        async with semaphore:
+            async with limiter.slot(prompt) as lease:
+                resp = await llm_client.ainvoke([HumanMessage(content=prompt)])
+                lease.record_usage(resp)
+        return [v for v in (_strip_list_marker(line) for line in (resp.content or "").splitlines()) if v]
+
+    async def expand(slot: str, values: Sequence[str]) -> List[str]:
+        collected = list(dict.fromkeys(values))
+        target = len(collected) + per_slot
+        for _ in range(math.ceil(per_slot / batch)):
+            if len(collected) >= target:
+                break
+            try:
+                result = await ask(slot, collected, min(batch, target - len(collected)))
+            except Exception as e:
+                _log.warning("slot expansion for %s failed: %s", slot, e)
+                continue
+            collected = list(dict.fromkeys(collected + result))
+        return collected
+
+    slots = list(slot_values)
+    results = await asyncio.gather(*(expand(slot, slot_values[slot]) for slot in slots))
+    return dict(zip(slots, results))
+
+
+def _iter_existing(output: str) -> Iterator[Dict[str, Any]]:
+    """现有题目：questions/ 下的JSON题库，以及 output 处已有的 JSONL 题库（写入先落到临时文件，可边读边写）。"""
+    for items in _read_json_bank().values():
+        yield from items
+    if os.path.exists(output):
+        with open(output, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def generate_question_bank(per_type: Optional[int] = None, output: str = JSONL_BANK_PATH,
+                           slot_values: Optional[Dict[str, Sequence[str]]] = None,
+                           workers: Optional[int] = None, include_existing: bool = True,
+                           shard_dir: Optional[str] = None, keep_shards: bool = False) -> Dict[str, Any]:
+    """多进程生成题库并合并写出 JSONL 题库，返回各题型的候选数、去重后数量与产出率。
+
+    per_type 为每个题型最多枚举的组合数（默认枚举全部）；include_existing 时先合并现有JSON题库及
+    output 处已有的 JSONL 题库（含以 convert_question_bank.py --input 导入的题目），与其内容重复的生成题目被丢弃。
+    """
+    started = time.monotonic()
+    slot_values = {k: list(v) for k, v in (slot_values or DEFAULT_SLOT_VALUES).items()}
+    workers = max(1, workers or Config.GENERATOR_WORKERS)
+    own_dir = shard_dir is None
+    shard_dir = shard_dir or tempfile.mkdtemp(prefix="question_shards_")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    tasks = []
+    report: Dict[str, Dict[str, Any]] = {}
+    for qtype in CONTENT_VARIANTS:
+        total = space_size(qtype, slot_values)
+        count = total if per_type is None else min(per_type, total)
+        report[qtype] = {"space": total, "candidates": count, "unique": 0}
+        chunks = max(1, min(workers * 2, count // 1000 + 1))
+        bounds = [count * i // chunks for i in range(chunks + 1)]
+        for n, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+            if stop > start:
+                tasks.append((qtype, slot_values, start, stop, total,
+                              os.path.join(shard_dir, f"{qtype}-{n:04d}.jsonl")))
+
+    if workers == 1:
+        shards = [_generate_shard(task) for task in tasks]
+    else:
+        # 使用 spawn：父进程中可能已有后台线程（事件循环、题库重新加载），fork 不安全
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            shards = list(pool.map(_generate_shard, tasks))
+
+    seen = set()
+    existing = 0
+
+    def iter_items() -> Iterator[Dict[str, Any]]:
+        nonlocal existing
+        if include_existing:
+            for item in _iter_existing(output):
+                digest = content_hash(item.get("content", ""))
+                if digest not in seen:
+                    seen.add(digest)
+                    existing += 1
+                    yield item
+        for (shard_path, _, _), (qtype, *_rest) in zip(shards, tasks):
+            with open(shard_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    item = json.loads(line)
+                    digest = content_hash(item["content"])
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    report[qtype]["unique"] += 1
+                    item["title"] = TEMPLATES[qtype]["title"].format(idx=report[qtype]["unique"])
+                    yield item
+
+    try:
+        written = write_jsonl_bank(iter_items(), output)
+    finally:
+        if not keep_shards:
+            for shard_path, _, _ in shards:
+                if os.path.exists(shard_path):
+                    os.remove(shard_path)
+            if own_dir:
+                os.rmdir(shard_dir)
+
+    candidates = sum(r["candidates"] for r in report.values())
+    unique = sum(r["unique"] for r in report.values())
+    for r in report.values():
+        r["yield"] = r["unique"] / r["candidates"] if r["candidates"] else 0.0
+    elapsed = time.monotonic() - started
+    summary = {
+        "output": output,
+        "types": report,
+        "candidates": candidates,
+        "unique": unique,
+        "existing": existing,
+        "written": written["written"],
+        "yield": unique / candidates if candidates else 0.0,
+        "elapsed_seconds": elapsed,
+        "items_per_second": candidates / elapsed if elapsed > 0 else 0.0,
+    }
+    _log.info("generated %d unique of %d candidates (%.1f%%) into %s in %.1fs",
+              unique, candidates, summary["yield"] * 100, output, elapsed)
+    return summary
@@ -0,0 +1,211 @@
+"""
+JSONL 题库存储：每行一道题，配套 numpy 偏移索引（<路径>.idx.npy 按类型、维度排序；<路径>.ids.npy 按ID哈希排序），
+通过 mmap 读取，抽样时只解析被抽中的题目，启动内存与耗时不随题库规模增长。
+两个索引文件末尾各有一条代次记录（题目数、题库哈希，.idx.npy 中另含题库 mtime），打开时据此校验三个文件属于同一次写入
+"""
+import bisect
+import hashlib
+import json
+import mmap
+import os
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.question_bank import FILE_MAP, QUESTIONS_DIR, QuestionIndex, to_question
+from src.core.seen_set import id_hash
+from src.data.models import CreativityDimension, Question, QuestionType
+
+JSONL_BANK_PATH = os.path.join(QUESTIONS_DIR, "bank.jsonl")
+
+RECORD_DTYPE = np.dtype([("type", "u1"), ("dims", "u1"), ("offset", "<u8"), ("length", "<u4"), ("id_hash", "<u8")])
+ID_DTYPE = np.dtype([("id_hash", "<u8"), ("pos", "<u4")])
+
+_GENERATION_TYPE = 0xFF  # .idx.npy 末尾代次记录的 type 取值
+_TYPES = list(QuestionType)
+_DIMENSIONS = list(CreativityDimension)
+
+
+def index_paths(path: str) -> Tuple[str, str]:
+    return f"{path}.idx.npy", f"{path}.ids.npy"
+
+
+def jsonl_bank_exists(path: str = JSONL_BANK_PATH) -> bool:
+    return os.path.exists(path) and all(os.path.exists(p) for p in index_paths(path))
+
+
+def _dims_mask(dimensions: Iterable[CreativityDimension]) -> int:
+    mask = 0
+    for d in dimensions:
+        mask |= 1 << _DIMENSIONS.index(d)
+    return mask
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def write_jsonl_bank(items: Iterable[Dict[str, Any]], path: str = JSONL_BANK_PATH) -> Dict[str, int]:
+    """流式写入 JSONL 题库并生成偏移索引；无法校验为 Question 的条目跳过。文件先写临时文件再原子替换。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows: List[Tuple[int, int, int, int, int]] = []
+    skipped = 0
+    digest = hashlib.blake2b(digest_size=8)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        offset = 0
+        for item in items:
+            try:
+                question = to_question(item, len(rows))
+            except Exception:
+                skipped += 1
+                continue
+            line = json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            f.write(line)
+            digest.update(line)
+            rows.append((_TYPES.index(question.type), _dims_mask(question.dimensions), offset, len(line) - 1,
+                         id_hash(question.id)))
+            offset += len(line)
+
+    records = np.array(rows, dtype=RECORD_DTYPE)
+    records = records[np.lexsort((records["dims"], records["type"]))]
+    order = np.argsort(records["id_hash"], kind="stable")
+    ids = np.empty(len(records), dtype=ID_DTYPE)
+    ids["id_hash"] = records["id_hash"][order]
+    ids["pos"] = order
+    # 代次记录：三个文件依次替换，读取方据此识别新旧文件混用
+    bank_hash = int.from_bytes(digest.digest(), "little")
+    generation = np.array([(_GENERATION_TYPE, 0, os.stat(tmp).st_mtime_ns, len(records), bank_hash)],
+                          dtype=RECORD_DTYPE)
+    idx_path, ids_path = index_paths(path)
+    os.replace(tmp, path)
+    _save_npy(ids_path, np.concatenate([ids, np.array([(bank_hash, len(records))], dtype=ID_DTYPE)]))
+    _save_npy(idx_path, np.concatenate([records, generation]))
+    return {"written": len(records), "skipped": skipped}
+
+
+def convert_json_bank(questions_dir: str = QUESTIONS_DIR, path: str = JSONL_BANK_PATH) -> Dict[str, int]:
+    """将 questions/ 下按类型划分的 JSON 题库转换为 JSONL 题库。"""
+    def iter_items():
+        for fname in FILE_MAP.values():
+            fpath = os.path.join(questions_dir, fname)
+            if not os.path.exists(fpath):
+                continue
+            with open(fpath, "r", encoding="utf-8") as f:
+                yield from json.load(f)
+    return write_jsonl_bank(iter_items(), path)
+
+
+class _RangeUnion(SequenceABC):
+    """若干不相交 range 拼接成的只读序列，用于表示某一维度的题目下标集合。"""
+
+    def __init__(self, ranges: List[range]):
+        self.ranges = [r for r in ranges if len(r)]
+        self._ends: List[int] = []
+        total = 0
+        for r in self.ranges:
+            total += len(r)
+            self._ends.append(total)
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        block = bisect.bisect_right(self._ends, i)
+        start = self._ends[block - 1] if block else 0
+        return self.ranges[block][i - start]
+
+
+class MmapQuestionIndex(QuestionIndex):
+    """基于 mmap 的题库索引：类型与维度的题目集合均为索引中的连续区间，打开时只做少量二分查找。"""
+
+    def __init__(self, path: str = JSONL_BANK_PATH):
+        self.path = path
+        idx_path, ids_path = index_paths(path)
+        records = np.load(idx_path, mmap_mode="r")
+        ids = np.load(ids_path, mmap_mode="r")
+        self.records, self.ids = records[:-1], ids[:-1]
+        self._file = open(path, "rb")
+        st = os.fstat(self._file.fileno())
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else None
+        if not self._same_generation(records[-1:], ids[-1:], st):
+            self.close()
+            raise ValueError(f"question bank index does not match {path}")
+
+        self.by_type: Dict[QuestionType, Sequence[int]] = {}
+        dim_ranges: Dict[CreativityDimension, List[range]] = {d: [] for d in _DIMENSIONS}
+        types = self.records["type"]
+        for code, qtype in enumerate(_TYPES):
+            start, end = (int(x) for x in np.searchsorted(types, [code, code + 1]))
+            if start == end:
+                continue
+            self.by_type[qtype] = range(start, end)
+            dims = self.records["dims"][start:end]
+            bounds = np.searchsorted(dims, np.arange((1 << len(_DIMENSIONS)) + 1))
+            for mask in range(1 << len(_DIMENSIONS)):
+                lo, hi = start + int(bounds[mask]), start + int(bounds[mask + 1])
+                for bit, d in enumerate(_DIMENSIONS):
+                    if lo < hi and mask & (1 << bit):
+                        dim_ranges[d].append(range(lo, hi))
+        self.by_dimension = {d: _RangeUnion(r) for d, r in dim_ranges.items()}
+
+    def _same_generation(self, generation: np.ndarray, id_generation: np.ndarray, st: os.stat_result) -> bool:
+        """三个文件分别替换，写入过程中可能短暂混用新旧文件：两个索引的代次记录须一致且与题库文件相符。
+        mtime 不同（如题库被复制过）时重新计算题库哈希比对。"""
+        if not len(generation) or int(generation[0]["type"]) != _GENERATION_TYPE or not len(id_generation):
+            return False
+        count, bank_hash = int(generation[0]["length"]), int(generation[0]["id_hash"])
+        if (count, bank_hash) != (len(self.records), int(id_generation[0]["id_hash"])) \
+                or int(id_generation[0]["pos"]) != count or len(self.ids) != count:
+            return False
+        end = int((self.records["offset"] + self.records["length"]).max()) + 1 if count else 0
+        if end != st.st_size:
+            return False
+        if int(generation[0]["offset"]) == st.st_mtime_ns:
+            return True
+        digest = hashlib.blake2b(self._mm if self._mm is not None else b"", digest_size=8).digest()
+        return int.from_bytes(digest, "little") == bank_hash
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def item(self, pos: int) -> Dict:
+        record = self.records[pos]
+        offset, length = int(record["offset"]), int(record["length"])
+        return json.loads(self._mm[offset:offset + length])
+
+    def question(self, pos: int) -> Question:
+        return to_question(self.item(pos), pos)
+
+    def dimensions(self, pos: int) -> set:
+        mask = int(self.records[pos]["dims"])
+        return {d for bit, d in enumerate(_DIMENSIONS) if mask & (1 << bit)}
+
+    def key(self, pos: int) -> int:
+        return int(self.records[pos]["id_hash"]) & 0xFFFFFFFF
+
+    def position(self, question_id: str) -> Optional[int]:
+        h = id_hash(question_id)
+        hashes = self.ids["id_hash"]
+        i = int(np.searchsorted(hashes, h))
+        while i < len(hashes) and int(hashes[i]) == h:
+            pos = int(self.ids[i]["pos"])
+            if self.item(pos).get("id") == question_id:
+                return pos
+            i += 1
+        return None
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
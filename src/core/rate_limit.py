@@ -0,0 +1,170 @@
+"""
+LLM调用限流：全局并发上限 + 按模型的每秒请求数 / 每分钟Token数令牌桶
+"""
+import asyncio
+import json
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+
+_log = get_app_logger("rate_limit")
+
+
+class TokenBucket:
+    """预约式令牌桶：每次预约按到达顺序排队（允许透支），返回需要等待的秒数。"""
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, cost: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= cost
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, delta: float) -> None:
+        """按实际消耗修正：delta>0 退还令牌，delta<0 追加扣除。"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + delta)
+
+
+class RateLimitLease:
+    """单次调用的限流凭证，用于回填实际Token消耗。"""
+
+    def __init__(self, limiter: "ModelRateLimiter", estimated_tokens: int):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+
+    def record_usage(self, response: Any) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        actual = usage.get("total_tokens") if isinstance(usage, dict) else None
+        if actual:
+            self.limiter.tokens.adjust(self.estimated_tokens - int(actual))
+
+
+class ModelRateLimiter:
+    """单个模型的RPS/TPM令牌桶，并发上限由所有模型共享。"""
+
+    def __init__(self, model: str, requests_per_second: float, tokens_per_minute: float):
+        self.model = model
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.acquired = 0
+        self.total_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, prompt: str) -> AsyncIterator[RateLimitLease]:
+        """先按到达顺序预约本模型的令牌并等待，再获取全局并发名额后执行调用。
+
+        节流等待期间不占用并发名额，被限流的模型不会阻塞其他仍有额度的模型。
+        """
+        estimated = estimate_tokens(prompt)
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        semaphore = _get_semaphore()
+        acquired = False
+        try:
+            delay = max(self.requests.reserve(1), self.tokens.reserve(estimated))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await semaphore.acquire()
+            acquired = True
+        except BaseException:
+            if acquired:
+                semaphore.release()
+            with self._lock:
+                self.waiting -= 1
+            raise
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.acquired += 1
+            self.total_wait_seconds += time.monotonic() - started
+        try:
+            yield RateLimitLease(self, estimated)
+        finally:
+            semaphore.release()
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "max_waiting": self.max_waiting,
+                "acquired": self.acquired,
+                "avg_wait_seconds": self.total_wait_seconds / self.acquired if self.acquired else 0.0,
+            }
+
+
+def estimate_tokens(prompt: str) -> int:
+    """粗略估算一次调用的Token数：中文约每字1个Token，另加预期输出长度。"""
+    return len(prompt or "") + Config.LLM_EXPECTED_OUTPUT_TOKENS
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _semaphores[loop] = asyncio.Semaphore(max(1, Config.LLM_MAX_CONCURRENCY))
+        return semaphore
+
+
+def _model_limits(model: str) -> Dict[str, float]:
+    limits = {"rps": Config.LLM_REQUESTS_PER_SECOND, "tpm": Config.LLM_TOKENS_PER_MINUTE}
+    try:
+        overrides = json.loads(Config.LLM_RATE_LIMITS or "{}")
+    except ValueError:
+        _log.warning("LLM_RATE_LIMITS is not valid JSON, ignored")
+        overrides = {}
+    limits.update(overrides.get(model, {}))
+    return limits
+
+
+def get_rate_limiter(model: Optional[str]) -> ModelRateLimiter:
+    """获取进程级共享的模型限流器。"""
+    name = model or "default"
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limits = _model_limits(name)
+            limiter = _limiters[name] = ModelRateLimiter(name, float(limits["rps"]), float(limits["tpm"]))
+        return limiter
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """所有模型限流器的排队深度等指标。"""
+    with _registry_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,160 @@
+"""
+历史答案批量重新评分：按会话分块流式读取、有界并发双Agent评分、断点续跑并批量写回测评结果
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import Config
+from src.core.event_loop import run_sync
+from src.core.logging_utils import get_app_logger
+from src.core.originality_index import OriginalityIndex
+from src.data.database import DatabaseManager
+from src.data.models import AssessmentResult, CreativityDimension, CreativityScore
+
+_log = get_app_logger("rescoring")
+
+DEFAULT_RECOMMENDATIONS = ["继续努力，保持创新思维！"]
+# 有题目因评分服务不可用而延后评分时的等级；重新评分完成后整份结果会被覆盖
+PENDING_LEVEL = "待评分"
+PENDING_RECOMMENDATION = "部分题目待评分服务恢复后重新评分，届时结果将自动更新。"
+
+
+def overall_level(total_score: float) -> str:
+    """总分（满分40）对应的等级。"""
+    return "优秀" if total_score >= 35 else "良好" if total_score >= 30 else "一般"
+
+
+def build_assessment_result(session_id: str, student_id: str, student_name: str,
+                            scores: List[Dict[str, Any]],
+                            completed_at: Optional[datetime] = None) -> AssessmentResult:
+    """按各题评分汇总测评结果；延后评分（deferred）的题目不计入各维度平均分，且结果等级标记为待评分。"""
+    scored = [s for s in scores if not s.get("deferred")]
+    n = max(1, len(scored))
+    dimension_scores = []
+    for dimension in CreativityDimension:
+        score = sum(float(s.get(dimension.value, 0)) for s in scored) / n
+        dimension_scores.append(CreativityScore(
+            dimension=dimension,
+            score=score,
+            max_score=10.0,
+            percentage=score * 10
+        ))
+    total_score = sum(s.score for s in dimension_scores)
+    pending = len(scored) < len(scores)
+    return AssessmentResult(
+        session_id=session_id,
+        student_id=student_id,
+        student_name=student_name,
+        total_score=total_score,
+        dimension_scores=dimension_scores,
+        overall_level=PENDING_LEVEL if pending else overall_level(total_score),
+        recommendations=[PENDING_RECOMMENDATION] if pending else list(DEFAULT_RECOMMENDATIONS),
+        completed_at=completed_at or datetime.now()
+    )
+
+
+class BulkRescorer:
+    """按 session_id 顺序分块重新评分，每块的结果与断点在同一事务中提交，中断后从断点继续。"""
+
+    def __init__(self, graph, db: Optional[DatabaseManager] = None, job_id: str = "default",
+                 chunk_size: Optional[int] = None, concurrency: Optional[int] = None):
+        self.graph = graph
+        self.db = db or graph.db
+        self.job_id = job_id
+        self.chunk_size = max(1, chunk_size or Config.RESCORE_CHUNK_SIZE)
+        self.concurrency = max(1, concurrency or Config.RESCORE_CONCURRENCY)
+        self.retry_wait_seconds = float(Config.CIRCUIT_OPEN_SECONDS)
+        self.max_chunk_retries = max(0, Config.RESCORE_MAX_CHUNK_RETRIES)
+        self.originality = OriginalityIndex(db=self.db, lexical=graph.lexical)
+
+    def reset(self) -> bool:
+        """清除断点，下次运行从头开始。"""
+        return self.db.reset_rescore_checkpoint(self.job_id)
+
+    async def _ascore_session(self, row: Dict[str, Any],
+                              semaphore: asyncio.Semaphore) -> Tuple[Optional[AssessmentResult], int, bool]:
+        """返回 (测评结果, 评分题数, 是否有题目被延后)；没有可评分答案的会话结果为 None。"""
+        contents = {q.get("id"): q.get("content", "") for q in row["questions"]}
+        answers = [a for a in row["answers"] if a.get("question_id") in contents]
+        if not answers:
+            return None, 0, False
+
+        async def score(answer: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.graph.ascore_answer(contents[answer["question_id"]], answer.get("content", ""),
+                                                      row["session_id"], answer["question_id"])
+
+        scores = await asyncio.gather(*(score(a) for a in answers))
+        deferred = any(s.get("deferred") for s in scores)
+        result = build_assessment_result(row["session_id"], row["student_id"], row["student_name"],
+                                         list(scores), row["end_time"])
+        return result, len(scores), deferred
+
+    async def _ascore_chunk(self, rows: List[Dict[str, Any]]) -> Tuple[List[AssessmentResult], int]:
+        """对一块会话评分；评分服务熔断导致有题目被延后时等待后整块重试，避免写入不完整的结果。
+
+        重试 max_chunk_retries 次后仍不可用则抛出 RuntimeError，断点不前进，服务恢复后重新运行即可继续。
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        retries = 0
+        while True:
+            outcomes = await asyncio.gather(*(self._ascore_session(row, semaphore) for row in rows))
+            if not any(deferred for _, _, deferred in outcomes):
+                results = [result for result, _, _ in outcomes if result is not None]
+                return results, sum(count for _, count, _ in outcomes)
+            if retries >= self.max_chunk_retries:
+                raise RuntimeError(f"rescore {self.job_id}: scoring service unavailable after {retries} retries "
+                                   f"(chunk ending at {rows[-1]['session_id']})")
+            retries += 1
+            _log.warning("rescore %s: scoring service unavailable, retrying chunk after %.0fs",
+                         self.job_id, self.retry_wait_seconds)
+            await asyncio.sleep(self.retry_wait_seconds)
+
+    async def arun(self, max_sessions: Optional[int] = None) -> Dict[str, Any]:
+        """执行（或继续）重新评分任务，返回本次运行的统计。"""
+        checkpoint = await asyncio.to_thread(self.db.get_rescore_checkpoint, self.job_id)
+        resumed_from = checkpoint["last_session_id"] if checkpoint else ""
+        if resumed_from:
+            _log.info("rescore %s: resuming after session %s (%d sessions done)",
+                      self.job_id, resumed_from, checkpoint["sessions_done"])
+        chunks = self.db.iter_assessment_session_rows(resumed_from, self.chunk_size)
+        started = time.monotonic()
+        sessions = answers = results_written = 0
+        finished = False
+        while max_sessions is None or sessions < max_sessions:
+            rows = await asyncio.to_thread(next, chunks, None)
+            if rows is None:
+                finished = True
+                break
+            if max_sessions is not None:
+                rows = rows[:max_sessions - sessions]
+            results, scored = await self._ascore_chunk(rows)
+            committed = await asyncio.to_thread(self.db.commit_rescore_chunk, self.job_id, results,
+                                                rows[-1]["session_id"], scored, len(rows))
+            if not committed:
+                raise RuntimeError(f"rescore {self.job_id}: failed to commit chunk ending at {rows[-1]['session_id']}")
+            sessions += len(rows)
+            answers += scored
+            results_written += len(results)
+            elapsed = time.monotonic() - started
+            _log.info("rescore %s: %d sessions, %d answers, %.2f answers/s",
+                      self.job_id, sessions, answers, answers / elapsed if elapsed > 0 else 0.0)
+        if finished:
+            # 全部会话处理完毕后按重新评分后的语料一次性重建独创性索引（逐块收录会重复计入已收录的答案）
+            await asyncio.to_thread(self.originality.rebuild)
+        elapsed = time.monotonic() - started
+        return {
+            "job_id": self.job_id,
+            "resumed_from": resumed_from,
+            "sessions": sessions,
+            "answers": answers,
+            "results_written": results_written,
+            "elapsed_seconds": elapsed,
+            "answers_per_second": answers / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def run(self, max_sessions: Optional[int] = None) -> Dict[str, Any]:
+        """arun 的同步包装。"""
+        return run_sync(self.arun(max_sessions))
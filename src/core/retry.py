@@ -0,0 +1,129 @@
+"""
+LLM评分调用的重试策略：按错误类型决定是否重试及等待时间（指数退避 + 抖动，遵循 Retry-After）
+"""
+import contextvars
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+
+from src.core.circuit_breaker import CircuitOpenError
+from src.core.config import Config
+
+RATE_LIMIT = "rate_limit"
+SERVER = "server"
+TRANSPORT = "transport"
+PARSE = "parse"
+CIRCUIT_OPEN = "circuit_open"
+FATAL = "fatal"
+
+# 当前评分请求的截止时间（time.monotonic()），由 score_answer 设置，子任务自动继承
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("scoring_deadline", default=None)
+
+
+class ScoreParseError(ValueError):
+    """模型输出无法解析为完整的评分JSON。"""
+
+
+def set_deadline(seconds: float) -> contextvars.Token:
+    """为当前上下文设置截止时间（seconds <= 0 表示不限），已有更早的截止时间时保持不变。"""
+    deadline = time.monotonic() + seconds if seconds > 0 else None
+    current = _deadline.get()
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """距截止时间的秒数；未设置截止时间时返回 None。"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def classify_error(exc: BaseException) -> str:
+    """将调用异常归类为 rate_limit / server / transport / parse / circuit_open / fatal。"""
+    if isinstance(exc, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(exc, ScoreParseError):
+        return PARSE
+    if isinstance(exc, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(exc, (openai.APIConnectionError, httpx.TransportError, TimeoutError, ConnectionError)):
+        return TRANSPORT
+    status = getattr(exc, "status_code", None)
+    if status == 429:
+        return RATE_LIMIT
+    if isinstance(status, int) and (status >= 500 or status == 408):
+        return SERVER
+    return FATAL
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """读取响应头 retry-after-ms / Retry-After（秒数或HTTP日期）。"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000.0)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """限流/服务端错误：指数退避并全抖动（不短于 Retry-After）；传输错误：短间隔快速重试；
+    解析失败：按 parse_retries 重新请求；熔断及其余错误不重试。"""
+
+    def __init__(self, max_attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None, transport_delay: Optional[float] = None,
+                 parse_retries: Optional[int] = None):
+        self.max_attempts = max(1, Config.SCORING_RETRY_MAX_ATTEMPTS if max_attempts is None else max_attempts)
+        self.base_delay = Config.SCORING_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.SCORING_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.transport_delay = Config.SCORING_RETRY_TRANSPORT_DELAY if transport_delay is None else transport_delay
+        self.parse_retries = Config.SCORING_PARSE_RETRIES if parse_retries is None else parse_retries
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def next_delay(self, kind: str, attempt: int, exc: BaseException, parse_failures: int) -> Optional[float]:
+        """第 attempt 次（从1计）失败后的等待秒数；不再重试时返回 None。"""
+        if kind == PARSE:
+            return 0.0 if parse_failures <= self.parse_retries else None
+        if kind not in (RATE_LIMIT, SERVER, TRANSPORT) or attempt >= self.max_attempts:
+            return None
+        if kind == TRANSPORT:
+            delay = random.uniform(0.5, 1.5) * self.transport_delay
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+            retry_after = retry_after_seconds(exc)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            self.count("deadline_exceeded")
+            return None
+        return delay
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts)
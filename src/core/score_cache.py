@@ -0,0 +1,144 @@
+"""
+按内容寻址的LLM评分缓存：内存LRU + SQLite持久化
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from src.core.config import Config
+from src.core.logging_utils import get_app_logger
+from src.data.database import DatabaseManager
+
+_log = get_app_logger("score_cache")
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：全半角统一、去首尾空白、合并连续空白。"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WS_RE.sub(" ", text).strip()
+
+
+def make_score_key(question_content: str, answer_text: str, models: Sequence[Optional[str]],
+                   prompt_version: str, scope: str = "dual") -> str:
+    """计算缓存键：sha256(归一化题目, 归一化答案, 模型名, 提示词版本, 评分方式)。"""
+    payload = json.dumps(
+        [normalize_text(question_content), normalize_text(answer_text),
+         [m or "" for m in models], prompt_version, scope],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    """评分缓存：先查进程内LRU，再查 score_cache 表；记录命中/未命中次数。
+
+    命中（含内存LRU命中）不逐次写库，先在内存中累计，淘汰前或累计 evict_every 个键后批量写回 last_hit_at，
+    使数据库按最近命中淘汰时不会删掉只在内存中被频繁命中的条目。
+    """
+
+    def __init__(self, db: Optional[DatabaseManager] = None,
+                 ttl_seconds: Optional[int] = None,
+                 max_entries: Optional[int] = None,
+                 memory_entries: int = 2048,
+                 evict_every: int = 200):
+        self.db = db or DatabaseManager()
+        self.ttl_seconds = Config.SCORE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = Config.SCORE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.memory_entries = memory_entries
+        self.evict_every = evict_every
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._pending_hits: Dict[str, Tuple[int, datetime]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            stored_at, scores = entry
+            if self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return dict(scores)
+
+    def _memory_put(self, key: str, scores: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = (time.time(), dict(scores))
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中返回 None。"""
+        scores = self._memory_get(key)
+        if scores is None:
+            scores = self.db.get_cached_score(key, self.ttl_seconds)
+            if scores is not None:
+                self._memory_put(key, scores)
+        with self._lock:
+            if scores is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                count, _ = self._pending_hits.get(key, (0, None))
+                self._pending_hits[key] = (count + 1, datetime.utcnow())
+            flush = len(self._pending_hits) >= self.evict_every
+        if flush:
+            self.flush_hits()
+        return scores
+
+    def flush_hits(self) -> bool:
+        """把累计的命中次数与最近命中时间批量写回数据库。"""
+        with self._lock:
+            hits, self._pending_hits = self._pending_hits, {}
+        if self.db.record_score_cache_hits(hits):
+            return True
+        with self._lock:
+            # 写回失败时并回待写记录，下次再试
+            for key, (count, last_hit_at) in hits.items():
+                pending, pending_at = self._pending_hits.get(key, (0, last_hit_at))
+                self._pending_hits[key] = (pending + count, max(last_hit_at, pending_at))
+        return False
+
+    def put(self, key: str, scores: Dict[str, Any]) -> None:
+        """写入缓存，每累计 evict_every 次写入触发一次淘汰。"""
+        self._memory_put(key, scores)
+        if not self.db.put_cached_score(key, scores):
+            return
+        with self._lock:
+            self.writes += 1
+            self._writes_since_evict += 1
+            need_evict = self._writes_since_evict >= self.evict_every
+            if need_evict:
+                self._writes_since_evict = 0
+        if need_evict:
+            self.flush_hits()
+            removed = self.db.evict_score_cache(self.max_entries, self.ttl_seconds)
+            with self._lock:
+                self.evictions += removed
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+            }
@@ -0,0 +1,114 @@
+"""
+后台评分队列：提交后立即返回，由共享事件循环上的固定数量 worker 协程完成LLM评分
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, wait
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.config import Config
+from src.core.event_loop import get_shared_loop, run_sync
+from src.core.logging_utils import get_app_logger
+
+_log = get_app_logger("scoring_queue")
+
+JobKey = Tuple[str, str]
+# (Future, 题目内容, 答案文本)
+Job = Tuple[Future, str, str]
+
+
+class ScoringQueue:
+    """进程级评分队列，按 (session_id, question_id) 跟踪每个评分任务。"""
+
+    def __init__(self, graph, max_workers: Optional[int] = None):
+        self.graph = graph
+        self.max_workers = max(1, max_workers or Config.SCORING_WORKERS)
+        self._loop = get_shared_loop()
+        self._jobs: Dict[JobKey, Job] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._workers: list = []
+        self._queue: asyncio.Queue = run_sync(self._start())
+
+    async def _start(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        # 保留 worker 任务引用，避免被垃圾回收
+        self._workers = [asyncio.ensure_future(self._worker(queue, i)) for i in range(self.max_workers)]
+        return queue
+
+    async def _worker(self, queue: asyncio.Queue, worker_id: int) -> None:
+        while True:
+            key, question_content, answer_text, fut = await queue.get()
+            try:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                with self._lock:
+                    self._in_flight += 1
+                try:
+                    scores = await self.graph.ascore_answer(question_content, answer_text, key[0], key[1])
+                    fut.set_result(scores)
+                    with self._lock:
+                        self._completed += 1
+                except Exception as e:
+                    _log.exception("worker %d scoring failed: %s %s", worker_id, key, e)
+                    fut.set_exception(e)
+                    with self._lock:
+                        self._failed += 1
+                finally:
+                    with self._lock:
+                        self._in_flight -= 1
+            finally:
+                queue.task_done()
+
+    def submit(self, session_id: str, question_id: str, question_content: str, answer_text: str) -> Future:
+        """提交评分任务并立即返回 Future；同一题重复提交时以最新答案为准。"""
+        key = (session_id, question_id)
+        fut: Future = Future()
+        with self._lock:
+            previous = self._jobs.get(key)
+            self._jobs[key] = (fut, question_content, answer_text)
+        if previous is not None:
+            previous[0].cancel()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (key, question_content, answer_text, fut))
+        _log.info("submit: session=%s qid=%s", session_id, question_id)
+        return fut
+
+    def pending(self, session_id: str) -> int:
+        """该会话尚未完成的评分任务数。"""
+        with self._lock:
+            return sum(1 for (sid, _), (f, _, _) in self._jobs.items() if sid == session_id and not f.done())
+
+    def collect(self, session_id: str, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """等待该会话剩余的评分任务完成，返回 question_id -> scores，并清理任务记录。
+
+        超时未完成或评分失败的题目登记为延后评分（结果带 deferred 标记），由 rescore_deferred 重新评分并重建会话结果。
+        """
+        with self._lock:
+            jobs = {qid: job for (sid, qid), job in self._jobs.items() if sid == session_id}
+            for qid in jobs:
+                del self._jobs[(session_id, qid)]
+        wait([fut for fut, _, _ in jobs.values()], timeout=timeout)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for qid, (fut, question_content, answer_text) in jobs.items():
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                results[qid] = fut.result()
+            else:
+                reason = "scoring_timeout" if not fut.done() else "scoring_failed"
+                _log.warning("collect: scoring unavailable (%s) for session=%s qid=%s", reason, session_id, qid)
+                results[qid] = self.graph.defer_scoring(question_content, answer_text, reason, session_id, qid)
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """队列深度与完成情况。"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "tracked_jobs": len(self._jobs),
+            }
@@ -0,0 +1,131 @@
+"""
+学生已做题目集合：按题目ID哈希得到的32位键存储的 roaring 风格位图（高16位分桶，桶内稀疏时为有序数组、稠密时为位图）
+"""
+import hashlib
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+_ARRAY_MAX = 4096  # 超过该数量的桶改用 8KB 位图
+_BITMAP_BYTES = 1 << 13
+_ARRAY, _BITMAP = 0, 1
+_HEADER = struct.Struct("<4sI")
+_CONTAINER = struct.Struct("<HBI")
+_MAGIC = b"SEEN"
+_KEY_MASK = 0xFFFFFFFF
+
+
+def id_hash(question_id: str) -> int:
+    """题目ID的64位哈希（blake2b）。"""
+    return int.from_bytes(hashlib.blake2b(question_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def question_key(question_id: str) -> int:
+    """题目在已做集合中的32位键（即 id_hash 的低32位，mmap 题库索引中可直接取得）。"""
+    return id_hash(question_id) & _KEY_MASK
+
+
+def _split(key: int) -> Tuple[int, int]:
+    """把键截断为32位后拆成（高16位桶号, 低16位）。"""
+    key &= _KEY_MASK
+    return key >> 16, key & 0xFFFF
+
+
+class SeenSet:
+    """32位整数集合；序列化后可直接存入数据库。"""
+
+    def __init__(self, keys: Iterable[int] = ()):
+        self._containers: Dict[int, Union[array, bytearray]] = {}
+        self._size = 0
+        self.update(keys)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: int) -> bool:
+        high, low = _split(key)
+        container = self._containers.get(high)
+        if container is None:
+            return False
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        i = bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def add(self, key: int) -> bool:
+        """加入一个键，返回是否为新键。"""
+        high, low = _split(key)
+        container = self._containers.get(high)
+        if container is None:
+            container = self._containers[high] = array("H")
+        if isinstance(container, bytearray):
+            mask = 1 << (low & 7)
+            if container[low >> 3] & mask:
+                return False
+            container[low >> 3] |= mask
+        else:
+            i = bisect_left(container, low)
+            if i < len(container) and container[i] == low:
+                return False
+            container.insert(i, low)
+            if len(container) > _ARRAY_MAX:
+                self._containers[high] = self._to_bitmap(container)
+        self._size += 1
+        return True
+
+    def update(self, keys: Iterable[int]) -> int:
+        """加入多个键，返回新增数量。"""
+        return sum(1 for key in keys if self.add(key))
+
+    def add_question_ids(self, question_ids: Iterable[str]) -> int:
+        return self.update(question_key(qid) for qid in question_ids)
+
+    @staticmethod
+    def _to_bitmap(values: array) -> bytearray:
+        bitmap = bytearray(_BITMAP_BYTES)
+        for low in values:
+            bitmap[low >> 3] |= 1 << (low & 7)
+        return bitmap
+
+    def to_bytes(self) -> bytes:
+        parts = [_HEADER.pack(_MAGIC, len(self._containers))]
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            if isinstance(container, bytearray):
+                cardinality = sum(bin(b).count("1") for b in container)
+                parts.append(_CONTAINER.pack(high, _BITMAP, cardinality))
+                parts.append(bytes(container))
+            else:
+                values = array("H", container)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                parts.append(_CONTAINER.pack(high, _ARRAY, len(values)))
+                parts.append(values.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> "SeenSet":
+        seen = cls()
+        if not data:
+            return seen
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a serialized SeenSet")
+        offset = _HEADER.size
+        for _ in range(count):
+            high, kind, cardinality = _CONTAINER.unpack_from(data, offset)
+            offset += _CONTAINER.size
+            if kind == _BITMAP:
+                seen._containers[high] = bytearray(data[offset:offset + _BITMAP_BYTES])
+                offset += _BITMAP_BYTES
+            else:
+                values = array("H")
+                values.frombytes(data[offset:offset + 2 * cardinality])
+                if sys.byteorder == "big":
+                    values.byteswap()
+                seen._containers[high] = values
+                offset += 2 * cardinality
+            seen._size += cardinality
+        return seen
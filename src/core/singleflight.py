@@ -0,0 +1,50 @@
+"""
+进行中请求合并（singleflight）：相同键的并发调用共享同一次执行及其结果
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """按键合并并发的协程调用：首个调用者发起执行，其余调用者等待同一结果（含异常）。
+
+    执行在独立任务中进行，单个调用者被取消不会中断其他调用者正在等待的结果。
+    不同事件循环的调用互不合并。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """返回 (结果, 是否复用了进行中的调用)。"""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._inflight.get(loop_key)
+            shared = task is not None
+            if shared:
+                self.followers += 1
+            else:
+                self.leaders += 1
+                task = asyncio.ensure_future(factory())
+                self._inflight[loop_key] = task
+                task.add_done_callback(lambda _: self._forget(loop_key, task))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, loop_key: Tuple[int, str], task: asyncio.Future) -> None:
+        with self._lock:
+            if self._inflight.get(loop_key) is task:
+                del self._inflight[loop_key]
+        if not task.cancelled():
+            task.exception()  # 所有调用者均已取消时避免 "exception was never retrieved"
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._inflight)}
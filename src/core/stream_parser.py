@@ -0,0 +1,181 @@
+"""
+流式评分解析：逐块读取模型输出的JSON对象，四个维度分数一出现即可使用，无需等待完整响应
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.data.models import SCORE_DIMENSIONS
+
+_WHITESPACE = " \t\r\n"
+
+
+def _decode_string(raw: str) -> str:
+    """解码JSON字符串内容；被截断的转义序列直接丢弃。"""
+    for end in range(len(raw), max(-1, len(raw) - 6), -1):
+        try:
+            return json.loads(f'"{raw[:end]}"')
+        except ValueError:
+            continue
+    return raw
+
+
+class IncrementalScoreParser:
+    """增量解析顶层JSON对象的键值：字符串、数字逐个完成，嵌套对象/数组整体跳过后再解码。
+
+    对象之前的任意文字（如代码块标记）会被忽略；只解析第一个顶层对象。
+    """
+
+    def __init__(self, dimensions: Sequence[str] = SCORE_DIMENSIONS):
+        self.dimensions = tuple(dimensions)
+        self.values: Dict[str, Any] = {}
+        self.done = False
+        self.chars = 0
+        self._state = "start"
+        self._key: List[str] = []
+        self._current_key: Optional[str] = None
+        self._value: List[str] = []
+        self._escape = False
+        self._depth = 0
+        self._nested_string = False
+
+    @property
+    def scores_ready(self) -> bool:
+        return all(k in self.values for k in self.dimensions)
+
+    def partial(self, key: str) -> Optional[str]:
+        """key 对应的字符串值仍在生成中时返回已收到的部分。"""
+        if self._state == "string" and self._current_key == key:
+            return _decode_string("".join(self._value))
+        return None
+
+    def should_stop(self, max_comment_chars: int) -> bool:
+        """分数已齐且评语已完整或达到 max_comment_chars 个字符时，可提前结束读取。"""
+        if self.done:
+            return True
+        if not self.scores_ready:
+            return False
+        if "comments" in self.values or max_comment_chars <= 0:
+            return True
+        comments = self.partial("comments")
+        return comments is not None and len(comments) >= max_comment_chars
+
+    def result(self, max_comment_chars: Optional[int] = None) -> Dict[str, Any]:
+        """已解析的键值；评语尚未结束时附上已收到（并截断到 max_comment_chars）的部分。"""
+        data = dict(self.values)
+        comments = data.get("comments")
+        if comments is None:
+            comments = self.partial("comments")
+        if isinstance(comments, str):
+            if max_comment_chars is not None and max_comment_chars >= 0:
+                comments = comments[:max_comment_chars]
+            data["comments"] = comments
+        return data
+
+    def feed(self, text: str) -> List[str]:
+        """追加一段输出，返回本段中新完成的键。"""
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            self.chars += 1
+            key = self._step(ch)
+            if key is not None:
+                completed.append(key)
+        return completed
+
+    def _finish(self, value: Any) -> str:
+        key = self._current_key
+        self.values[key] = value
+        self._current_key = None
+        self._value = []
+        self._state = "key_or_end"
+        return key
+
+    def _finish_scalar(self) -> str:
+        raw = "".join(self._value).strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        return self._finish(value)
+
+    def _step(self, ch: str) -> Optional[str]:
+        state = self._state
+        if state == "start":
+            if ch == "{":
+                self._state = "key_or_end"
+        elif state == "key_or_end":
+            if ch == '"':
+                self._key = []
+                self._state = "key"
+            elif ch == "}":
+                self.done = True
+        elif state == "key":
+            if self._escape:
+                self._escape = False
+                self._key.append(ch)
+            elif ch == "\\":
+                self._escape = True
+                self._key.append(ch)
+            elif ch == '"':
+                self._current_key = _decode_string("".join(self._key))
+                self._state = "colon"
+            else:
+                self._key.append(ch)
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value_start"
+        elif state == "value_start":
+            if ch in _WHITESPACE:
+                return None
+            self._value = []
+            if ch == '"':
+                self._state = "string"
+            elif ch in "{[":
+                self._value.append(ch)
+                self._depth = 1
+                self._nested_string = False
+                self._state = "nested"
+            else:
+                self._value.append(ch)
+                self._state = "scalar"
+        elif state == "string":
+            if self._escape:
+                self._escape = False
+                self._value.append(ch)
+            elif ch == "\\":
+                self._escape = True
+                self._value.append(ch)
+            elif ch == '"':
+                return self._finish(_decode_string("".join(self._value)))
+            else:
+                self._value.append(ch)
+        elif state == "scalar":
+            if ch in ",}" or ch in _WHITESPACE:
+                key = self._finish_scalar()
+                if ch == "}":
+                    self.done = True
+                return key
+            self._value.append(ch)
+        elif state == "nested":
+            self._value.append(ch)
+            if self._nested_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._nested_string = False
+            elif ch == '"':
+                self._nested_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        value = json.loads("".join(self._value))
+                    except ValueError:
+                        value = "".join(self._value)
+                    return self._finish(value)
+        return None
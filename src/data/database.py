@@ -1,16 +1,18 @@
 """
 数据库管理模块
 """
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, JSON
+from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, JSON, LargeBinary
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple
 import json
 
 from src.data.models import StudentProfile, AssessmentResult, AssessmentSession, Question, Answer, CreativityScore
 from src.core.config import Config
 from src.core.logging_utils import get_app_logger
+from src.core.seen_set import SeenSet
 
 Base = declarative_base()
 _db_log = get_app_logger("database")
@@ -54,11 +56,114 @@ class AssessmentResultDB(Base):
     recommendations = Column(JSON)   # 存储建议
     completed_at = Column(DateTime, nullable=False)
 
+class ScoreCacheDB(Base):
+    """LLM评分缓存数据库模型（按内容哈希寻址）"""
+    __tablename__ = "score_cache"
+    
+    cache_key = Column(String, primary_key=True)
+    scores = Column(JSON, nullable=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class DeferredScoreDB(Base):
+    """待重新评分的答案（LLM服务不可用时记录）"""
+    __tablename__ = "deferred_scores"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, index=True)
+    question_id = Column(String)
+    question_content = Column(Text, nullable=False)
+    answer_text = Column(Text, nullable=False)
+    reason = Column(String)
+    status = Column(String, default="pending", index=True)  # pending, done
+    created_at = Column(DateTime, default=datetime.utcnow)
+    scored_at = Column(DateTime)
+
+class IdeaTermDB(Base):
+    """独创性倒排索引：每道题各想法词项的文档频率"""
+    __tablename__ = "idea_terms"
+    
+    question_key = Column(String, primary_key=True)
+    term = Column(String, primary_key=True)
+    df = Column(Integer, nullable=False, default=0)
+
+class IdeaCorpusDB(Base):
+    """独创性倒排索引：每道题已收录的答案数"""
+    __tablename__ = "idea_corpus"
+    
+    question_key = Column(String, primary_key=True)
+    doc_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class AnswerSignatureDB(Base):
+    """近重复检测：已评分答案的 MinHash 签名及其评分"""
+    __tablename__ = "answer_signatures"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    question_key = Column(String, nullable=False, index=True)
+    signature = Column(LargeBinary, nullable=False)
+    evaluation = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RescoreCheckpointDB(Base):
+    """批量重新评分任务的断点"""
+    __tablename__ = "rescore_checkpoints"
+    
+    job_id = Column(String, primary_key=True)
+    last_session_id = Column(String, nullable=False, default="")
+    sessions_done = Column(Integer, nullable=False, default=0)
+    answers_scored = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class GraphCheckpointDB(Base):
+    """LangGraph 测评工作流检查点（thread_id 即会话ID）"""
+    __tablename__ = "graph_checkpoints"
+    
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    parent_checkpoint_id = Column(String)
+    checkpoint_type = Column(String, nullable=False)
+    checkpoint = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String, nullable=False)
+    checkpoint_metadata = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class GraphWriteDB(Base):
+    """LangGraph 节点的中间写入（挂在所属检查点上）"""
+    __tablename__ = "graph_writes"
+    
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    value_type = Column(String, nullable=False)
+    value = Column(LargeBinary, nullable=False)
+
+class StudentSeenQuestionsDB(Base):
+    """学生已做过的题目集合（序列化的 SeenSet），创建会话时更新，抽题时无需扫描历史会话"""
+    __tablename__ = "student_seen_questions"
+    
+    student_id = Column(String, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+def _answer_to_json(answer: Answer) -> Dict[str, Any]:
+    """答案转为可写入JSON列的字典（时间戳存为ISO字符串，与 get_assessment_session 的解析对应）"""
+    data = answer.dict()
+    data["timestamp"] = answer.timestamp.isoformat()
+    return data
+
 class DatabaseManager:
     """数据库管理器"""
     
-    def __init__(self):
-        self.engine = create_engine(Config.DATABASE_URL)
+    def __init__(self, database_url: Optional[str] = None):
+        self.engine = create_engine(database_url or Config.DATABASE_URL)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         self._create_tables()
     
@@ -155,12 +260,13 @@ class DatabaseManager:
                 start_time=session_data.start_time,
                 end_time=session_data.end_time,
                 questions=[q.dict() for q in session_data.questions],
-                answers=[a.dict() for a in session_data.answers],
+                answers=[_answer_to_json(a) for a in session_data.answers],
                 status=session_data.status
             )
             session.add(db_session)
             session.commit()
             session.close()
+            self.add_seen_questions(session_data.student_id, [q.id for q in session_data.questions])
             return True
         except Exception as e:
             print(f"创建测评会话失败: {e}")
@@ -176,7 +282,7 @@ class DatabaseManager:
             
             if db_session:
                 db_session.end_time = session_data.end_time
-                db_session.answers = [a.dict() for a in session_data.answers]
+                db_session.answers = [_answer_to_json(a) for a in session_data.answers]
                 db_session.status = session_data.status
                 session.commit()
                 session.close()
@@ -360,3 +466,765 @@ class DatabaseManager:
         except Exception as e:
             print(f"获取同龄人测评结果失败: {e}")
             return []
+    
+    # 评分缓存管理
+    def get_cached_score(self, cache_key: str, ttl_seconds: int) -> Optional[Dict[str, Any]]:
+        """读取评分缓存（只读），过期条目视为未命中（由 evict_score_cache 删除）；命中记录见 record_score_cache_hits"""
+        try:
+            session = self.get_session()
+            db_entry = session.query(ScoreCacheDB.scores, ScoreCacheDB.created_at).filter(
+                ScoreCacheDB.cache_key == cache_key
+            ).first()
+            session.close()
+            if db_entry is None:
+                return None
+            if ttl_seconds > 0 and db_entry.created_at < datetime.utcnow() - timedelta(seconds=ttl_seconds):
+                return None
+            return dict(db_entry.scores or {})
+        except Exception as e:
+            _db_log.warning("get_cached_score failed for %s: %s", cache_key, e)
+            return None
+    
+    def put_cached_score(self, cache_key: str, scores: Dict[str, Any]) -> bool:
+        """写入（或覆盖）评分缓存"""
+        try:
+            session = self.get_session()
+            now = datetime.utcnow()
+            session.merge(ScoreCacheDB(
+                cache_key=cache_key,
+                scores=scores,
+                hit_count=0,
+                created_at=now,
+                last_hit_at=now
+            ))
+            session.commit()
+            session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("put_cached_score failed for %s: %s", cache_key, e)
+            return False
+    
+    def record_score_cache_hits(self, hits: Dict[str, Tuple[int, datetime]]) -> bool:
+        """在一个事务中批量累加命中次数并更新最近命中时间：{cache_key: (命中次数, 最近命中时间)}"""
+        if not hits:
+            return True
+        try:
+            session = self.get_session()
+            try:
+                for cache_key, (count, last_hit_at) in hits.items():
+                    session.query(ScoreCacheDB).filter(ScoreCacheDB.cache_key == cache_key).update({
+                        ScoreCacheDB.hit_count: ScoreCacheDB.hit_count + count,
+                        ScoreCacheDB.last_hit_at: last_hit_at,
+                    }, synchronize_session=False)
+                session.commit()
+            finally:
+                session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("record_score_cache_hits failed: %s", e)
+            return False
+    
+    def evict_score_cache(self, max_entries: int, ttl_seconds: int) -> int:
+        """淘汰过期条目，并按最近命中时间裁剪到 max_entries 条；返回删除条数"""
+        try:
+            session = self.get_session()
+            removed = 0
+            if ttl_seconds > 0:
+                cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+                removed += session.query(ScoreCacheDB).filter(
+                    ScoreCacheDB.created_at < cutoff
+                ).delete(synchronize_session=False)
+            total = session.query(ScoreCacheDB).count()
+            if max_entries > 0 and total > max_entries:
+                stale_keys = [row.cache_key for row in session.query(ScoreCacheDB.cache_key).order_by(
+                    ScoreCacheDB.last_hit_at.asc()
+                ).limit(total - max_entries)]
+                removed += session.query(ScoreCacheDB).filter(
+                    ScoreCacheDB.cache_key.in_(stale_keys)
+                ).delete(synchronize_session=False)
+            session.commit()
+            session.close()
+            if removed:
+                _db_log.info("evict_score_cache removed %d entries", removed)
+            return removed
+        except Exception as e:
+            _db_log.warning("evict_score_cache failed: %s", e)
+            return 0
+    
+    # 待重新评分管理
+    def add_deferred_score(self, question_content: str, answer_text: str, reason: str,
+                           session_id: Optional[str] = None, question_id: Optional[str] = None) -> bool:
+        """记录一条待重新评分的答案；同一会话同一题已有待处理记录时更新该记录而不重复插入"""
+        try:
+            session = self.get_session()
+            row = None
+            if session_id is not None and question_id is not None:
+                row = session.query(DeferredScoreDB).filter(
+                    DeferredScoreDB.session_id == session_id,
+                    DeferredScoreDB.question_id == question_id,
+                    DeferredScoreDB.status == "pending"
+                ).first()
+            if row is None:
+                session.add(DeferredScoreDB(
+                    session_id=session_id,
+                    question_id=question_id,
+                    question_content=question_content,
+                    answer_text=answer_text,
+                    reason=reason,
+                    status="pending",
+                    created_at=datetime.utcnow()
+                ))
+            else:
+                row.question_content = question_content
+                row.answer_text = answer_text
+                row.reason = reason
+            session.commit()
+            session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("add_deferred_score failed: session=%s qid=%s error=%s", session_id, question_id, e)
+            return False
+    
+    def get_pending_deferred_scores(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """按记录顺序获取待重新评分的答案"""
+        try:
+            session = self.get_session()
+            rows = session.query(DeferredScoreDB).filter(
+                DeferredScoreDB.status == "pending"
+            ).order_by(DeferredScoreDB.id.asc()).limit(limit).all()
+            items = [{
+                "id": row.id,
+                "session_id": row.session_id,
+                "question_id": row.question_id,
+                "question_content": row.question_content,
+                "answer_text": row.answer_text,
+                "reason": row.reason,
+                "created_at": row.created_at
+            } for row in rows]
+            session.close()
+            return items
+        except Exception as e:
+            _db_log.warning("get_pending_deferred_scores failed: %s", e)
+            return []
+    
+    def mark_deferred_scores_done(self, ids: List[int]) -> bool:
+        """将待重新评分记录标记为已完成"""
+        if not ids:
+            return True
+        try:
+            session = self.get_session()
+            session.query(DeferredScoreDB).filter(DeferredScoreDB.id.in_(ids)).update(
+                {"status": "done", "scored_at": datetime.utcnow()}, synchronize_session=False
+            )
+            session.commit()
+            session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("mark_deferred_scores_done failed: %s", e)
+            return False
+    
+    # 独创性倒排索引管理
+    def add_idea_document(self, question_key: str, terms: List[str]) -> bool:
+        """收录一份答案：该题文档数 +1，答案中每个想法词项的文档频率 +1
+
+        计数在 SQL 中递增（UPDATE ... SET df = df + 1），并发收录不会丢失增量；
+        并发首次插入同一词项时主键冲突，回滚后重试（此时改为递增）。
+        """
+        unique_terms = list(dict.fromkeys(terms))
+        for attempt in range(3):
+            try:
+                session = self.get_session()
+                try:
+                    self._increment_idea_counts(session, question_key, unique_terms)
+                    session.commit()
+                finally:
+                    session.close()
+                return True
+            except IntegrityError as e:
+                if attempt == 2:
+                    _db_log.warning("add_idea_document failed for %s: %s", question_key, e)
+            except Exception as e:
+                _db_log.warning("add_idea_document failed for %s: %s", question_key, e)
+                return False
+        return False
+    
+    def _increment_idea_counts(self, session: Session, question_key: str, terms: List[str]) -> None:
+        updated = session.query(IdeaCorpusDB).filter(IdeaCorpusDB.question_key == question_key).update(
+            {IdeaCorpusDB.doc_count: IdeaCorpusDB.doc_count + 1, IdeaCorpusDB.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        if not updated:
+            session.add(IdeaCorpusDB(question_key=question_key, doc_count=1, updated_at=datetime.utcnow()))
+        if not terms:
+            session.flush()
+            return
+        existing = [row.term for row in session.query(IdeaTermDB.term).filter(
+            IdeaTermDB.question_key == question_key,
+            IdeaTermDB.term.in_(terms)
+        )]
+        if existing:
+            session.query(IdeaTermDB).filter(
+                IdeaTermDB.question_key == question_key,
+                IdeaTermDB.term.in_(existing)
+            ).update({IdeaTermDB.df: IdeaTermDB.df + 1}, synchronize_session=False)
+        known = set(existing)
+        session.add_all([IdeaTermDB(question_key=question_key, term=t, df=1) for t in terms if t not in known])
+        session.flush()
+    
+    def get_idea_term_stats(self, question_key: str, terms: List[str]) -> Tuple[int, Dict[str, int]]:
+        """查询该题已收录答案数及给定词项的文档频率"""
+        try:
+            session = self.get_session()
+            corpus = session.query(IdeaCorpusDB).filter(IdeaCorpusDB.question_key == question_key).first()
+            doc_count = corpus.doc_count if corpus else 0
+            dfs: Dict[str, int] = {}
+            if doc_count and terms:
+                for row in session.query(IdeaTermDB).filter(
+                    IdeaTermDB.question_key == question_key,
+                    IdeaTermDB.term.in_(list(set(terms)))
+                ):
+                    dfs[row.term] = row.df
+            session.close()
+            return doc_count, dfs
+        except Exception as e:
+            _db_log.warning("get_idea_term_stats failed for %s: %s", question_key, e)
+            return 0, {}
+    
+    def replace_idea_index(self, doc_counts: Dict[str, int], term_dfs: Dict[str, Dict[str, int]]) -> bool:
+        """用批量构建的统计整体替换倒排索引（单个事务）"""
+        try:
+            session = self.get_session()
+            session.query(IdeaTermDB).delete(synchronize_session=False)
+            session.query(IdeaCorpusDB).delete(synchronize_session=False)
+            now = datetime.utcnow()
+            session.bulk_insert_mappings(IdeaCorpusDB, [
+                {"question_key": k, "doc_count": n, "updated_at": now} for k, n in doc_counts.items()
+            ])
+            session.bulk_insert_mappings(IdeaTermDB, [
+                {"question_key": k, "term": term, "df": df}
+                for k, dfs in term_dfs.items() for term, df in dfs.items()
+            ])
+            session.commit()
+            session.close()
+            _db_log.info("replace_idea_index: %d questions", len(doc_counts))
+            return True
+        except Exception as e:
+            _db_log.exception("replace_idea_index failed: %s", e)
+            return False
+    
+    def iter_session_answers(self, chunk_size: int = 500):
+        """按会话分块遍历已保存的 (题目内容, 答案内容)"""
+        last_id = ""
+        while True:
+            session = self.get_session()
+            try:
+                rows = session.query(AssessmentSessionDB).filter(
+                    AssessmentSessionDB.session_id > last_id
+                ).order_by(AssessmentSessionDB.session_id.asc()).limit(chunk_size).all()
+                pairs = []
+                for row in rows:
+                    contents = {q.get("id"): q.get("content", "") for q in (row.questions or [])}
+                    for a in (row.answers or []):
+                        if a.get("question_id") in contents:
+                            pairs.append((contents[a["question_id"]], a.get("content", "")))
+            finally:
+                session.close()
+            if not rows:
+                return
+            last_id = rows[-1].session_id
+            yield from pairs
+    
+    # 近重复答案签名管理
+    def add_answer_signature(self, question_key: str, signature: bytes, evaluation: Dict[str, Any]) -> Optional[int]:
+        """保存答案签名与评分，返回记录ID"""
+        try:
+            session = self.get_session()
+            row = AnswerSignatureDB(
+                question_key=question_key,
+                signature=signature,
+                evaluation=evaluation,
+                created_at=datetime.utcnow()
+            )
+            session.add(row)
+            session.commit()
+            entry_id = row.id
+            session.close()
+            return entry_id
+        except Exception as e:
+            _db_log.warning("add_answer_signature failed for %s: %s", question_key, e)
+            return None
+    
+    def iter_answer_signatures(self, limit: int, chunk_size: int = 5000):
+        """按ID升序遍历最近的 limit 条签名，产出 (id, question_key, signature)"""
+        session = self.get_session()
+        try:
+            newest = session.query(AnswerSignatureDB.id).order_by(
+                AnswerSignatureDB.id.desc()
+            ).offset(max(0, limit - 1)).limit(1).scalar()
+            query = session.query(AnswerSignatureDB.id, AnswerSignatureDB.question_key, AnswerSignatureDB.signature)
+            if newest is not None:
+                query = query.filter(AnswerSignatureDB.id >= newest)
+            for row in query.order_by(AnswerSignatureDB.id.asc()).yield_per(chunk_size):
+                yield row.id, row.question_key, row.signature
+        except Exception as e:
+            _db_log.warning("iter_answer_signatures failed: %s", e)
+        finally:
+            session.close()
+    
+    def get_answer_signature_evaluation(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """读取签名记录对应的评分"""
+        try:
+            session = self.get_session()
+            row = session.query(AnswerSignatureDB.evaluation).filter(AnswerSignatureDB.id == entry_id).first()
+            session.close()
+            return dict(row.evaluation) if row else None
+        except Exception as e:
+            _db_log.warning("get_answer_signature_evaluation failed for %s: %s", entry_id, e)
+            return None
+    
+    def prune_answer_signatures(self, keep: int) -> int:
+        """只保留最新的 keep 条签名，返回删除条数"""
+        try:
+            session = self.get_session()
+            cutoff = session.query(AnswerSignatureDB.id).order_by(
+                AnswerSignatureDB.id.desc()
+            ).offset(keep).limit(1).scalar()
+            removed = 0
+            if cutoff is not None:
+                removed = session.query(AnswerSignatureDB).filter(
+                    AnswerSignatureDB.id <= cutoff
+                ).delete(synchronize_session=False)
+                session.commit()
+            session.close()
+            return removed
+        except Exception as e:
+            _db_log.warning("prune_answer_signatures failed: %s", e)
+            return 0
+    
+    # 批量重新评分管理
+    def iter_assessment_session_rows(self, after_session_id: str = "", chunk_size: int = 100):
+        """按 session_id 顺序分块遍历会话原始数据（不做模型校验），每次产出一个列表"""
+        last_id = after_session_id or ""
+        while True:
+            session = self.get_session()
+            try:
+                rows = session.query(AssessmentSessionDB).filter(
+                    AssessmentSessionDB.session_id > last_id
+                ).order_by(AssessmentSessionDB.session_id.asc()).limit(chunk_size).all()
+                chunk = [{
+                    "session_id": row.session_id,
+                    "student_id": row.student_id,
+                    "student_name": row.student_name,
+                    "end_time": row.end_time,
+                    "questions": row.questions or [],
+                    "answers": row.answers or [],
+                } for row in rows]
+            finally:
+                session.close()
+            if not chunk:
+                return
+            last_id = chunk[-1]["session_id"]
+            yield chunk
+    
+    def get_rescore_checkpoint(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """读取重新评分任务断点"""
+        try:
+            session = self.get_session()
+            row = session.query(RescoreCheckpointDB).filter(RescoreCheckpointDB.job_id == job_id).first()
+            checkpoint = None
+            if row:
+                checkpoint = {
+                    "job_id": row.job_id,
+                    "last_session_id": row.last_session_id,
+                    "sessions_done": row.sessions_done,
+                    "answers_scored": row.answers_scored,
+                    "started_at": row.started_at,
+                    "updated_at": row.updated_at,
+                }
+            session.close()
+            return checkpoint
+        except Exception as e:
+            _db_log.warning("get_rescore_checkpoint failed for %s: %s", job_id, e)
+            return None
+    
+    def reset_rescore_checkpoint(self, job_id: str) -> bool:
+        """删除任务断点，下次从头开始"""
+        try:
+            session = self.get_session()
+            session.query(RescoreCheckpointDB).filter(RescoreCheckpointDB.job_id == job_id).delete()
+            session.commit()
+            session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("reset_rescore_checkpoint failed for %s: %s", job_id, e)
+            return False
+    
+    def _upsert_assessment_results(self, session: Session, results: List[AssessmentResult]) -> None:
+        """在调用方的事务中按 session_id 写入（覆盖）测评结果（不提交）"""
+        session_ids = [r.session_id for r in results]
+        existing = {}
+        if session_ids:
+            existing = {row.session_id: row for row in session.query(AssessmentResultDB).filter(
+                AssessmentResultDB.session_id.in_(session_ids)
+            ).all()}
+        for result in results:
+            row = existing.get(result.session_id)
+            if row is None:
+                row = AssessmentResultDB(result_id=f"result_{result.session_id}", session_id=result.session_id)
+                session.add(row)
+            row.student_id = result.student_id
+            row.student_name = result.student_name
+            row.total_score = result.total_score
+            row.dimension_scores = [s.dict() for s in result.dimension_scores]
+            row.overall_level = result.overall_level
+            row.recommendations = result.recommendations
+            row.completed_at = result.completed_at
+    
+    def replace_assessment_results(self, results: List[AssessmentResult],
+                                   sessions: Optional[List[AssessmentSession]] = None) -> bool:
+        """批量写入（覆盖）测评结果；给出 sessions 时在同一事务中更新这些会话保存的答案（含各题评分）"""
+        try:
+            session = self.get_session()
+            try:
+                self._upsert_assessment_results(session, results)
+                answers = {s.session_id: [_answer_to_json(a) for a in s.answers] for s in sessions or []}
+                if answers:
+                    for row in session.query(AssessmentSessionDB).filter(
+                        AssessmentSessionDB.session_id.in_(list(answers))
+                    ):
+                        row.answers = answers[row.session_id]
+                session.commit()
+            finally:
+                session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("replace_assessment_results failed: %s", e)
+            return False
+    
+    def commit_rescore_chunk(self, job_id: str, results: List[AssessmentResult],
+                             last_session_id: str, answers_scored: int, sessions: int) -> bool:
+        """在同一事务中批量写入（覆盖）测评结果并推进任务断点；sessions 为本块处理的会话数（含无答案的会话）"""
+        try:
+            session = self.get_session()
+            try:
+                self._upsert_assessment_results(session, results)
+                checkpoint = session.query(RescoreCheckpointDB).filter(RescoreCheckpointDB.job_id == job_id).first()
+                if checkpoint is None:
+                    checkpoint = RescoreCheckpointDB(job_id=job_id, sessions_done=0, answers_scored=0,
+                                                     started_at=datetime.utcnow())
+                    session.add(checkpoint)
+                checkpoint.last_session_id = last_session_id
+                checkpoint.sessions_done += sessions
+                checkpoint.answers_scored += answers_scored
+                checkpoint.updated_at = datetime.utcnow()
+                session.commit()
+            finally:
+                session.close()
+            return True
+        except Exception as e:
+            _db_log.exception("commit_rescore_chunk failed: job=%s last=%s error=%s", job_id, last_session_id, e)
+            return False
+    
+    # 离线批量导入
+    def get_assessment_result_level(self, session_id: str) -> Optional[str]:
+        """会话已保存结果的等级；没有结果时返回 None"""
+        try:
+            session = self.get_session()
+            level = session.query(AssessmentResultDB.overall_level).filter(
+                AssessmentResultDB.session_id == session_id
+            ).scalar()
+            session.close()
+            return level
+        except Exception as e:
+            _db_log.warning("get_assessment_result_level failed for %s: %s", session_id, e)
+            return None
+    
+    def assessment_session_exists(self, session_id: str) -> bool:
+        """会话是否已存在"""
+        try:
+            session = self.get_session()
+            exists = session.query(AssessmentSessionDB.session_id).filter(
+                AssessmentSessionDB.session_id == session_id
+            ).first() is not None
+            session.close()
+            return exists
+        except Exception as e:
+            _db_log.warning("assessment_session_exists failed for %s: %s", session_id, e)
+            return False
+    
+    def save_completed_assessment(self, profile: StudentProfile, session_data: AssessmentSession,
+                                  result: AssessmentResult) -> bool:
+        """在同一事务中写入（或更新）学生档案、已完成的测评会话及其结果，提交后再更新学生的已做题目集合
+
+        并发导入同一学生的多次测评时可能同时首次插入档案，主键冲突后回滚重试（此时档案已存在，改为更新）。
+        已做题目集合单独提交，其更新失败不影响测评结果的保存。
+        """
+        for attempt in range(3):
+            try:
+                session = self.get_session()
+                try:
+                    self._write_completed_assessment(session, profile, session_data, result)
+                    session.commit()
+                finally:
+                    session.close()
+                self.add_seen_questions(session_data.student_id, [q.id for q in session_data.questions])
+                return True
+            except IntegrityError as e:
+                if attempt == 2 or self.assessment_session_exists(session_data.session_id):
+                    _db_log.warning("save_completed_assessment failed: session=%s error=%s",
+                                    session_data.session_id, e)
+                    return False
+            except Exception as e:
+                _db_log.warning("save_completed_assessment failed: session=%s error=%s", session_data.session_id, e)
+                return False
+        return False
+    
+    def _write_completed_assessment(self, session: Session, profile: StudentProfile,
+                                    session_data: AssessmentSession, result: AssessmentResult) -> None:
+        db_profile = session.query(StudentProfileDB).filter(
+            StudentProfileDB.student_id == profile.student_id
+        ).first()
+        if db_profile is None:
+            session.add(StudentProfileDB(
+                student_id=profile.student_id,
+                name=profile.name,
+                age=profile.age,
+                grade=profile.grade,
+                school=profile.school,
+                created_at=profile.created_at,
+                updated_at=profile.updated_at
+            ))
+        else:
+            db_profile.name = profile.name
+            db_profile.age = profile.age
+            db_profile.grade = profile.grade
+            db_profile.school = profile.school
+            db_profile.updated_at = datetime.utcnow()
+        session.add(AssessmentSessionDB(
+            session_id=session_data.session_id,
+            student_id=session_data.student_id,
+            student_name=session_data.student_name,
+            start_time=session_data.start_time,
+            end_time=session_data.end_time,
+            questions=[q.dict() for q in session_data.questions],
+            answers=[_answer_to_json(a) for a in session_data.answers],
+            status=session_data.status
+        ))
+        session.add(AssessmentResultDB(
+            result_id=f"result_{result.session_id}",
+            session_id=result.session_id,
+            student_id=result.student_id,
+            student_name=result.student_name,
+            total_score=result.total_score,
+            dimension_scores=[s.dict() for s in result.dimension_scores],
+            overall_level=result.overall_level,
+            recommendations=result.recommendations,
+            completed_at=result.completed_at
+        ))
+        session.flush()
+    
+    # 学生已做题目管理
+    def _merge_seen_questions(self, session: Session, student_id: str, question_ids: List[str]) -> bool:
+        """在调用方的事务中把 question_ids 并入学生的已做题目集合（不提交）
+
+        集合只增不减，以 count 作版本号条件更新；读取后被并发修改时不写入并返回 False。
+        """
+        if not question_ids:
+            return True
+        row = session.query(StudentSeenQuestionsDB.data, StudentSeenQuestionsDB.count).filter(
+            StudentSeenQuestionsDB.student_id == student_id
+        ).first()
+        seen = SeenSet.from_bytes(row.data if row else None)
+        if not seen.add_question_ids(question_ids) and row is not None:
+            return True
+        values = {"data": seen.to_bytes(), "count": len(seen), "updated_at": datetime.utcnow()}
+        if row is None:
+            session.add(StudentSeenQuestionsDB(student_id=student_id, **values))
+            session.flush()
+            return True
+        return session.query(StudentSeenQuestionsDB).filter(
+            StudentSeenQuestionsDB.student_id == student_id,
+            StudentSeenQuestionsDB.count == row.count
+        ).update(values, synchronize_session=False) == 1
+    
+    def add_seen_questions(self, student_id: str, question_ids: List[str]) -> bool:
+        """记录学生做过的题目
+
+        同一学生的并发合并互不覆盖：集合已被修改或并发首次插入主键冲突时，回滚后重新读取并合并。
+        """
+        for attempt in range(10):
+            try:
+                session = self.get_session()
+                try:
+                    if self._merge_seen_questions(session, student_id, question_ids):
+                        session.commit()
+                        return True
+                    session.rollback()
+                finally:
+                    session.close()
+            except IntegrityError:
+                continue
+            except Exception as e:
+                _db_log.warning("add_seen_questions failed for %s: %s", student_id, e)
+                return False
+        _db_log.warning("add_seen_questions gave up for %s after concurrent updates", student_id)
+        return False
+    
+    def get_seen_questions(self, student_id: str) -> SeenSet:
+        """读取学生已做题目集合；没有记录或读取失败时返回空集合"""
+        try:
+            session = self.get_session()
+            row = session.query(StudentSeenQuestionsDB.data).filter(
+                StudentSeenQuestionsDB.student_id == student_id
+            ).first()
+            session.close()
+            return SeenSet.from_bytes(row.data if row else None)
+        except Exception as e:
+            _db_log.warning("get_seen_questions failed for %s: %s", student_id, e)
+            return SeenSet()
+    
+    # 工作流检查点管理
+    def put_graph_checkpoint(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str,
+                             parent_checkpoint_id: Optional[str], checkpoint: Tuple[str, bytes],
+                             metadata: Tuple[str, bytes], keep: int = 0) -> bool:
+        """保存检查点；keep>0 时只保留该会话最新的 keep 个检查点及其写入"""
+        try:
+            session = self.get_session()
+            try:
+                session.merge(GraphCheckpointDB(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    parent_checkpoint_id=parent_checkpoint_id,
+                    checkpoint_type=checkpoint[0],
+                    checkpoint=checkpoint[1],
+                    metadata_type=metadata[0],
+                    checkpoint_metadata=metadata[1],
+                    created_at=datetime.utcnow()
+                ))
+                if keep > 0:
+                    stale = [row.checkpoint_id for row in session.query(GraphCheckpointDB.checkpoint_id).filter(
+                        GraphCheckpointDB.thread_id == thread_id,
+                        GraphCheckpointDB.checkpoint_ns == checkpoint_ns,
+                        GraphCheckpointDB.checkpoint_id != checkpoint_id
+                    ).order_by(GraphCheckpointDB.checkpoint_id.desc()).offset(keep - 1).all()]
+                    if stale:
+                        for model in (GraphCheckpointDB, GraphWriteDB):
+                            session.query(model).filter(
+                                model.thread_id == thread_id,
+                                model.checkpoint_ns == checkpoint_ns,
+                                model.checkpoint_id.in_(stale)
+                            ).delete(synchronize_session=False)
+                session.commit()
+            finally:
+                session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("put_graph_checkpoint failed: thread=%s error=%s", thread_id, e)
+            return False
+    
+    def _graph_checkpoint_row(self, row: GraphCheckpointDB) -> Dict[str, Any]:
+        return {
+            "thread_id": row.thread_id,
+            "checkpoint_ns": row.checkpoint_ns,
+            "checkpoint_id": row.checkpoint_id,
+            "parent_checkpoint_id": row.parent_checkpoint_id,
+            "checkpoint": (row.checkpoint_type, row.checkpoint),
+            "metadata": (row.metadata_type, row.checkpoint_metadata),
+        }
+    
+    def get_graph_checkpoint(self, thread_id: str, checkpoint_ns: str = "",
+                             checkpoint_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """读取指定检查点；未指定 checkpoint_id 时返回最新的一个"""
+        try:
+            session = self.get_session()
+            query = session.query(GraphCheckpointDB).filter(
+                GraphCheckpointDB.thread_id == thread_id,
+                GraphCheckpointDB.checkpoint_ns == checkpoint_ns
+            )
+            if checkpoint_id:
+                query = query.filter(GraphCheckpointDB.checkpoint_id == checkpoint_id)
+            row = query.order_by(GraphCheckpointDB.checkpoint_id.desc()).first()
+            result = self._graph_checkpoint_row(row) if row else None
+            session.close()
+            return result
+        except Exception as e:
+            _db_log.warning("get_graph_checkpoint failed: thread=%s error=%s", thread_id, e)
+            return None
+    
+    def list_graph_checkpoints(self, thread_id: Optional[str] = None, checkpoint_ns: Optional[str] = None,
+                               before_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按检查点ID倒序列出检查点"""
+        try:
+            session = self.get_session()
+            query = session.query(GraphCheckpointDB)
+            if thread_id is not None:
+                query = query.filter(GraphCheckpointDB.thread_id == thread_id)
+            if checkpoint_ns is not None:
+                query = query.filter(GraphCheckpointDB.checkpoint_ns == checkpoint_ns)
+            if before_id:
+                query = query.filter(GraphCheckpointDB.checkpoint_id < before_id)
+            query = query.order_by(GraphCheckpointDB.thread_id, GraphCheckpointDB.checkpoint_id.desc())
+            if limit is not None:
+                query = query.limit(limit)
+            rows = [self._graph_checkpoint_row(row) for row in query.all()]
+            session.close()
+            return rows
+        except Exception as e:
+            _db_log.warning("list_graph_checkpoints failed: thread=%s error=%s", thread_id, e)
+            return []
+    
+    def put_graph_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, task_id: str,
+                         writes: List[Tuple[int, str, Tuple[str, bytes]]]) -> bool:
+        """保存节点中间写入，writes 为 (idx, channel, (类型, 数据)) 列表"""
+        try:
+            session = self.get_session()
+            try:
+                for idx, channel, (value_type, value) in writes:
+                    session.merge(GraphWriteDB(
+                        thread_id=thread_id,
+                        checkpoint_ns=checkpoint_ns,
+                        checkpoint_id=checkpoint_id,
+                        task_id=task_id,
+                        idx=idx,
+                        channel=channel,
+                        value_type=value_type,
+                        value=value
+                    ))
+                session.commit()
+            finally:
+                session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("put_graph_writes failed: thread=%s error=%s", thread_id, e)
+            return False
+    
+    def get_graph_writes(self, thread_id: str, checkpoint_ns: str,
+                         checkpoint_id: str) -> List[Tuple[str, str, Tuple[str, bytes]]]:
+        """读取检查点的中间写入，返回 (task_id, channel, (类型, 数据)) 列表"""
+        try:
+            session = self.get_session()
+            rows = session.query(GraphWriteDB).filter(
+                GraphWriteDB.thread_id == thread_id,
+                GraphWriteDB.checkpoint_ns == checkpoint_ns,
+                GraphWriteDB.checkpoint_id == checkpoint_id
+            ).order_by(GraphWriteDB.task_id, GraphWriteDB.idx).all()
+            writes = [(row.task_id, row.channel, (row.value_type, row.value)) for row in rows]
+            session.close()
+            return writes
+        except Exception as e:
+            _db_log.warning("get_graph_writes failed: thread=%s error=%s", thread_id, e)
+            return []
+    
+    def delete_graph_thread(self, thread_id: str) -> bool:
+        """删除会话的全部检查点与写入"""
+        try:
+            session = self.get_session()
+            for model in (GraphCheckpointDB, GraphWriteDB):
+                session.query(model).filter(model.thread_id == thread_id).delete(synchronize_session=False)
+            session.commit()
+            session.close()
+            return True
+        except Exception as e:
+            _db_log.warning("delete_graph_thread failed: thread=%s error=%s", thread_id, e)
+            return False
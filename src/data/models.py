@@ -20,6 +20,9 @@ class CreativityDimension(str, Enum):
     ORIGINALITY = "originality"
     ELABORATION = "elaboration"
 
+# 评分结果（LLM返回的JSON）中的四个维度字段
+SCORE_DIMENSIONS = tuple(d.value for d in CreativityDimension)
+
 class Question(BaseModel):
     """测评题目模型"""
     id: str
@@ -37,6 +40,7 @@ class Answer(BaseModel):
     content: str
     timestamp: datetime
     time_spent: int  # 秒
+    scores: Optional[Dict[str, Any]] = None  # 该题评分结果（延后评分的题目带 deferred 标记）
 
 class AssessmentSession(BaseModel):
     """测评会话模型"""
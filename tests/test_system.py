@@ -95,6 +95,1458 @@ def test_creativity_graph():
         print(f"❌ 创造力测评图测试失败: {e}")
         return False
 
+def _build_fake_graph(responses_a, responses_b):
+    """构建使用假LLM的测评图（不访问网络）"""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from src.core.creativity_graph import CreativityAssessmentGraph
+
+    graph = CreativityAssessmentGraph()
+    graph.llm_a = FakeListChatModel(responses=responses_a)
+    graph.llm_b = FakeListChatModel(responses=responses_b)
+    graph.score_cache = None
+    graph.near_duplicates = None
+    return graph
+
+class _SlowLLM:
+    """按给定延迟返回固定文本的假LLM"""
+
+    def __init__(self, delays, text):
+        self.delays = list(delays)
+        self.text = text
+
+    async def ainvoke(self, messages):
+        import asyncio
+        from types import SimpleNamespace
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0)
+        return SimpleNamespace(content=self.text)
+
+def test_async_scoring():
+    """测试异步双Agent评分及同步包装"""
+    print("测试异步双Agent评分...")
+    import asyncio
+    from src.core.event_loop import run_sync
+
+    ok_a = '{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4, "comments": "A"}'
+    ok_b = '```json\n{"fluency": 6, "flexibility": 6, "originality": 7, "elaboration": 4, "comments": "B"}```'
+    graph = _build_fake_graph([ok_a], [ok_b])
+    scores = graph.score_answer("列举砖头的用途", "盖房子、压纸、当锤子")
+    assert scores["fluency"] == 7.0 and scores["originality"] == 6.0
+    assert scores["comments"] == "A: A | B: B"
+
+    graph = _build_fake_graph([ok_a], ["不是JSON"])
+    scores = run_sync(graph.ascore_answer("列举砖头的用途", "盖房子"))
+    assert scores["fluency"] == 8.0 and scores["comments"] == "A: A"
+
+    graph = _build_fake_graph(["坏"], ["坏"])
+    scores = asyncio.run(graph.ascore_answer("列举砖头的用途", "盖房子"))
+    assert scores["flexibility"] == 7.0 and scores["fluency"] == graph.provisional_score("盖房子")["fluency"]
+    print("✅ 异步评分正常")
+    return True
+
+def test_score_cache():
+    """测试内容寻址评分缓存"""
+    print("测试评分缓存...")
+    import tempfile
+    from src.core.score_cache import ScoreCache, make_score_key
+    from src.data.database import DatabaseManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(f"sqlite:///{tmp}/cache.db")
+        key = make_score_key("列举 砖头的用途", "盖房子", ["model-a", "model-b"], "v1")
+        assert key == make_score_key(" 列举\n 砖头的用途 ", "盖房子\n", ["model-a", "model-b"], "v1")
+        assert key != make_score_key("列举 砖头的用途", "盖房子", ["model-a", "model-c"], "v1")
+
+        graph = _build_fake_graph(
+            ['{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4, "comments": "A"}'],
+            ['{"fluency": 6, "flexibility": 6, "originality": 7, "elaboration": 4, "comments": "B"}'],
+        )
+        graph.score_cache = ScoreCache(db=db, max_entries=1, evict_every=1)
+        first = graph.score_answer("列举砖头的用途", "盖房子")
+        graph.llm_a = graph.llm_b = None  # 命中缓存时不应再调用LLM
+        second = graph.score_answer("列举砖头的用途", " 盖房子")
+        assert second["cached"] and second["fluency"] == first["fluency"]
+        assert graph.score_cache.stats()["hits"] == 1
+
+        # 新的缓存实例（模拟重启）仍能从 SQLite 命中
+        assert ScoreCache(db=db).get(graph._score_cache_key("列举砖头的用途", "盖房子")) is not None
+        assert ScoreCache(db=db, ttl_seconds=0).get("missing") is None
+
+        # 命中不逐次写库；内存命中也计入，淘汰前批量写回 last_hit_at，热点条目不被淘汰
+        import time
+        from src.data.database import ScoreCacheDB
+        cache = ScoreCache(db=db, max_entries=2, evict_every=100)
+        cache.put("hot", {"fluency": 1.0})
+        time.sleep(0.01)
+        cache.put("cold", {"fluency": 2.0})
+        assert cache.get("hot") is not None and cache.get("hot") is not None  # 均为内存命中
+        session = db.get_session()
+        assert session.query(ScoreCacheDB).filter(ScoreCacheDB.cache_key == "hot").one().hit_count == 0
+        session.close()
+        cache.evict_every = 1
+        time.sleep(0.01)
+        cache.put("new", {"fluency": 3.0})  # 触发淘汰，先写回命中
+        session = db.get_session()
+        rows = {r.cache_key: r.hit_count for r in session.query(ScoreCacheDB).all()}
+        session.close()
+        assert rows == {"hot": 2, "new": 0}, rows
+        db.engine.dispose()
+    print("✅ 评分缓存正常")
+    return True
+
+def test_batch_scoring():
+    """测试批量评分及逐条回退"""
+    print("测试批量评分...")
+    batch_a = ('```json\n[{"index": 1, "fluency": 8, "flexibility": 8, "originality": 8, "elaboration": 8, "comments": "a1"},'
+               ' {"index": 2, "fluency": 4, "flexibility": 4, "originality": 4, "elaboration": 4, "comments": "a2"}]```')
+    # Agent B 第2项缺失维度，应回退为单条评分
+    batch_b = '[{"index": 1, "fluency": 6, "flexibility": 6, "originality": 6, "elaboration": 6}, {"index": 2, "fluency": 5}]'
+    single_b = '{"fluency": 6, "flexibility": 6, "originality": 6, "elaboration": 6, "comments": "b2"}'
+    graph = _build_fake_graph([batch_a], [batch_b, single_b])
+    results = graph.score_answers_batch([("题目一", "答案一"), ("题目二", "答案二")], batch_size=2)
+    assert [r["fluency"] for r in results] == [7.0, 5.0]
+    assert results[1]["comments"] == "A: a2 | B: b2"
+
+    # 熔断时批量评分按传入的 (session_id, question_id) 登记延后评分，便于重新评分后重建会话结果
+    import tempfile
+    from src.data.database import DatabaseManager
+
+    class _DownLLM:
+        model_name = "batch-down-model"
+
+        async def ainvoke(self, messages):
+            raise ConnectionError("endpoint unreachable")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        down = _build_fake_graph([], [])
+        down.db = DatabaseManager(f"sqlite:///{tmp}/batch.db")
+        down.llm_a = down.llm_b = _DownLLM()
+        for i in range(5):
+            down.score_answer("题目", f"答案{i}")
+        deferred = down.score_answers_batch([("题目一", "答案一"), ("题目二", "答案二")], batch_size=2,
+                                            ids=[("s1", "q1"), ("s1", "q2")])
+        assert all(r.get("deferred") for r in deferred)
+        pending = down.db.get_pending_deferred_scores()
+        assert sorted((p["session_id"], p["question_id"]) for p in pending[-2:]) == [("s1", "q1"), ("s1", "q2")]
+        down.db.engine.dispose()
+
+    parsed = graph._parse_batch_evaluation_text('[{"index": 2, "fluency": 1, "flexibility": 2, "originality": 3, "elaboration": 4}, {"index": 1, "flu', 3)
+    assert parsed[0] is None and parsed[1]["elaboration"] == 4.0 and parsed[2] is None
+    print("✅ 批量评分正常")
+    return True
+
+def test_latency_budget():
+    """测试延迟预算与对冲请求"""
+    print("测试延迟预算...")
+    import asyncio
+    import contextlib
+    import time
+    from src.core.config import Config
+    from src.core.event_loop import run_sync
+
+    ok = '{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4}'
+    graph = _build_fake_graph([], [])
+    saved = (Config.SCORING_LATENCY_BUDGET, Config.SCORING_HEDGE_ENABLED, Config.SCORING_HEDGE_MIN_SAMPLES)
+    try:
+        Config.SCORING_LATENCY_BUDGET = 0.2
+        graph.llm_a, graph.llm_b = _SlowLLM([0.01], ok), _SlowLLM([5], ok)
+        started = time.time()
+        scores = graph.score_answer("题目", "答案")
+        assert time.time() - started < 1 and scores["single_agent"]
+
+        Config.SCORING_LATENCY_BUDGET = 0
+        Config.SCORING_HEDGE_ENABLED, Config.SCORING_HEDGE_MIN_SAMPLES = True, 3
+        graph = _build_fake_graph([], [])
+        graph.llm_a, graph.llm_b = _SlowLLM([0.05] * 3 + [5, 0.05], ok), _SlowLLM([], ok)
+        for i in range(3):
+            graph.score_answer("题目", f"答案{i}")
+        started = time.time()
+        scores = graph.score_answer("题目", "慢答案")
+        assert time.time() - started < 1 and "single_agent" not in scores
+        assert graph.latency_stats()["AgentA"]["count"] == 4
+
+        # 对冲请求发出后外层被取消：主请求与对冲请求都应被取消
+        class _HangingLLM:
+            model_name = "hanging-model"
+
+            def __init__(self):
+                self.cancelled = 0
+
+            async def ainvoke(self, messages):
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    self.cancelled += 1
+                    raise
+
+        async def cancel_after_hedge(llm):
+            task = asyncio.ensure_future(graph._ahedged_call("AgentA", llm, "提示"))
+            await asyncio.sleep(0.4)
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.05)
+            return llm.cancelled
+
+        hanging = _HangingLLM()
+        assert run_sync(cancel_after_hedge(hanging)) == 2
+    finally:
+        Config.SCORING_LATENCY_BUDGET, Config.SCORING_HEDGE_ENABLED, Config.SCORING_HEDGE_MIN_SAMPLES = saved
+    print("✅ 延迟预算正常")
+    return True
+
+def test_circuit_breaker():
+    """测试熔断后快速失败并记录待重新评分"""
+    print("测试熔断器...")
+    import tempfile
+    import time
+    from src.core.rescoring import PENDING_LEVEL, build_assessment_result
+    from src.data.database import DatabaseManager
+    from src.data.models import Answer, AssessmentSession, Question, QuestionType
+
+    class _DownLLM:
+        model_name = "down-model"
+
+        async def ainvoke(self, messages):
+            raise ConnectionError("endpoint unreachable")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        graph = _build_fake_graph([], [])
+        graph.db = DatabaseManager(f"sqlite:///{tmp}/deferred.db")
+        graph.llm_a = graph.llm_b = _DownLLM()
+        for i in range(5):
+            scores = graph.score_answer("题目", f"答案{i}")
+        assert graph._breaker_for(graph.llm_a).state == "open"
+        assert scores.get("deferred") and "fluency" not in scores
+
+        # 限流与客户端错误说明端点可达，不触发熔断
+        from src.core.retry import RetryPolicy
+
+        class _StatusError(Exception):
+            def __init__(self, status_code):
+                super().__init__(f"HTTP {status_code}")
+                self.status_code = status_code
+
+        class _RejectingLLM:
+            def __init__(self, name, status_code):
+                self.model_name, self.status_code = name, status_code
+
+            async def ainvoke(self, messages):
+                raise _StatusError(self.status_code)
+
+        throttled = _build_fake_graph([], [])
+        throttled.db = graph.db
+        throttled.retry_policy = RetryPolicy(max_attempts=1)
+        throttled.llm_a, throttled.llm_b = _RejectingLLM("throttled-model", 429), _RejectingLLM("bad-request-model", 400)
+        for i in range(6):
+            assert not throttled.score_answer("题目", f"限流答案{i}").get("deferred")
+        assert throttled._breaker_for(throttled.llm_a).state == "closed"
+        assert throttled._breaker_for(throttled.llm_b).state == "closed"
+
+        started = time.time()
+        scores = graph.score_answer("题目", "熔断期间的答案", session_id="s1", question_id="q1")
+        assert scores.get("deferred") and time.time() - started < 0.5
+        pending = graph.db.get_pending_deferred_scores()
+        assert pending[-1]["question_id"] == "q1"
+
+        # 全部题目延后的结果标记为待评分，服务恢复后重新评分并覆盖保存的结果
+        result = build_assessment_result("s1", "stu1", "测试学生", [scores])
+        assert result.overall_level == PENDING_LEVEL and result.total_score == 0
+        now = datetime.now()
+        profile = StudentProfile(student_id="stu1", name="测试学生", age=12, grade="六年级", school="测试学校",
+                                 created_at=now, updated_at=now)
+        question = Question(id="q1", type=QuestionType.DIVERGENT_THINKING, title="题", content="题目",
+                            time_limit=300, dimensions=[], scoring_criteria={})
+        scored_question = Question(id="q0", type=QuestionType.DIVERGENT_THINKING, title="题", content="已评分题目",
+                                   time_limit=300, dimensions=[], scoring_criteria={})
+        stored = {"fluency": 10, "flexibility": 10, "originality": 10, "elaboration": 10}
+        session = AssessmentSession(session_id="s1", student_id="stu1", student_name="测试学生", start_time=now,
+                                    end_time=now, questions=[scored_question, question], status="completed",
+                                    answers=[Answer(question_id="q0", student_id="stu1", content="已评分的答案",
+                                                    timestamp=now, time_spent=0, scores=stored),
+                                             Answer(question_id="q1", student_id="stu1", content="熔断期间的答案",
+                                                    timestamp=now, time_spent=0, scores=scores)])
+        assert graph.db.save_completed_assessment(profile, session, result)
+        # 服务恢复但双Agent均无法给出有效评分时不以默认分覆盖，答案保持待评分
+        saved_policy = graph.retry_policy
+        graph.retry_policy = RetryPolicy(max_attempts=1)
+        graph.llm_a, graph.llm_b = _ScriptedLLM(["无法解析"] * 20), _ScriptedLLM(["无法解析"] * 20)
+        assert graph.rescore_deferred() == 0
+        assert len(graph.db.get_pending_deferred_scores()) == len(pending)
+        assert graph.db.get_assessment_results("stu1")[0].overall_level == PENDING_LEVEL
+        graph.retry_policy = saved_policy
+        ok = '{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4}'
+        graph.llm_a, graph.llm_b = _ScriptedLLM([ok] * 20), _ScriptedLLM([ok] * 20)
+        assert graph.rescore_deferred() == len(pending)
+        assert len(graph.llm_a.steps) == 20 - len(pending)  # 已评分的题目沿用保存的评分，不再调用LLM
+        rebuilt = graph.db.get_assessment_results("stu1")
+        assert len(rebuilt) == 1 and rebuilt[0].overall_level != PENDING_LEVEL and rebuilt[0].total_score == 31.5
+        assert graph.db.get_assessment_session("s1").answers[1].scores["fluency"] == 8
+        graph.db.engine.dispose()
+    print("✅ 熔断器正常")
+    return True
+
+def test_lexical_scorer():
+    """测试本地流畅性/精细性预评分"""
+    print("测试本地预评分...")
+    from src.core.lexical_scorer import LexicalScorer
+
+    scorer = LexicalScorer()
+    assert scorer.ideas("1. 盖房子\n2. 当锤子\n3. 盖房子") == ["盖房子", "当锤子"]
+    assert scorer.ideas("①压纸②垫桌脚") == ["压纸", "垫桌脚"]
+    assert scorer.ideas("盖房子，压纸，当锤子") == ["盖房子", "压纸", "当锤子"]
+    assert scorer.score("")["fluency"] == 0.0
+
+    short = scorer.score("盖房子")
+    many = scorer.score("盖房子、压纸、当锤子、垫桌脚、做书立、练力气")
+    detailed = scorer.score("可以做成花坛的边框，因为砖头结实耐用，通过错位摆放还能形成图案，从而美化校园。")
+    assert many["fluency"] > short["fluency"]
+    assert detailed["elaboration"] > many["elaboration"]
+
+    batch = scorer.score_batch(["盖房子", "可以做成花坛的边框，因为砖头结实耐用，通过错位摆放还能形成图案，从而美化校园。"])
+    assert batch.shape == (2, 2) and batch[0, 0] == short["fluency"] and batch[1, 1] == detailed["elaboration"]
+    print("✅ 本地预评分正常")
+    return True
+
+def test_originality_index():
+    """测试统计独创性倒排索引"""
+    print("测试统计独创性...")
+    import tempfile
+    from src.core.originality_index import OriginalityIndex
+    from src.data.database import DatabaseManager, AssessmentSessionDB
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(f"sqlite:///{tmp}/originality.db")
+        index = OriginalityIndex(db=db, min_documents=3)
+        question = "请尽可能多地列举出砖头的用途。"
+        for answer in ["盖房子、压纸", "盖房子、当锤子", "盖房子、压纸、垫桌脚"]:
+            assert index.add_answer(question, answer)
+        assert index.score(question, "盖房子") == 0.0
+        assert index.score(question, "盖房子、做雕塑") == 5.0
+        assert index.score(question, "可以拿来盖房子") == 5.0  # 换种说法的常见想法仍计为常见
+        assert index.score("另一道题", "盖房子") is None
+
+        # 并发收录同一题的答案（含首次出现的词项）不丢失计数
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(8) as pool:
+            assert all(pool.map(lambda _: db.add_idea_document("concurrent", ["新词", "盖房子"]), range(16)))
+        assert db.get_idea_term_stats("concurrent", ["新词", "盖房子"]) == (16, {"新词": 16, "盖房子": 16})
+
+        session = db.get_session()
+        session.add(AssessmentSessionDB(
+            session_id="s1", student_id="stu", student_name="测试", start_time=datetime.now(),
+            questions=[{"id": "q1", "content": question}],
+            answers=[{"question_id": "q1", "content": "做雕塑、盖房子"}],
+        ))
+        session.commit()
+        session.close()
+        assert index.rebuild() == {"answers": 1, "questions": 1}
+        assert index.score(question, "做雕塑") is None  # 重建后语料不足 min_documents
+        db.engine.dispose()
+    print("✅ 统计独创性正常")
+    return True
+
+def test_near_duplicate():
+    """测试近重复答案检测与评分复用"""
+    print("测试近重复检测...")
+    import tempfile
+    from src.core.near_duplicate import NearDuplicateIndex
+    from src.data.database import DatabaseManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(f"sqlite:///{tmp}/near_dup.db")
+        index = NearDuplicateIndex(db=db, threshold=0.8, max_entries=2)
+        question = "请设计一个创新的解决方案来解决以下问题：如何减少食物浪费？"
+        answer = "在学校食堂设置称重台，每次吃完把剩饭称重，按月公布各班级的浪费排行榜，浪费最少的班级获得奖励。"
+        assert index.add(question, answer, {"fluency": 6.0, "comments": "原评分"})
+        assert not index.add(question, "不知道", {"fluency": 1.0})  # 过短答案不收录
+
+        hit = index.lookup(question, answer.replace("。", "！") + "  ")
+        assert hit is not None and hit["evaluation"]["fluency"] == 6.0
+        assert index.lookup("另一道题", answer) is None
+        assert index.lookup(question, "开发一个手机应用记录家庭每天的食物消耗，并提醒临期食品。") is None
+
+        reloaded = NearDuplicateIndex(db=db, threshold=0.8)
+        assert reloaded.lookup(question, answer)["evaluation"]["comments"] == "原评分"
+
+        index.add(question, "开发一个手机应用记录家庭每天的食物消耗，并提醒临期食品。", {"fluency": 5.0})
+        index.add(question, "把剩菜做成堆肥用于校园菜园种植蔬菜，再把蔬菜送回食堂。", {"fluency": 5.0})
+        assert index.stats()["entries"] == 2
+        assert index.lookup(question, answer) is None  # 最旧条目已被淘汰
+        db.engine.dispose()
+    print("✅ 近重复检测正常")
+    return True
+
+def test_bulk_rescoring():
+    """测试历史答案批量重新评分与断点续跑"""
+    print("测试批量重新评分...")
+    import tempfile
+    from src.core.rescoring import BulkRescorer
+    from src.data.database import DatabaseManager, AssessmentSessionDB, AssessmentResultDB
+
+    ok = '{"fluency": 8, "flexibility": 8, "originality": 8, "elaboration": 8, "comments": "ok"}'
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(f"sqlite:///{tmp}/rescore.db")
+        graph = _build_fake_graph([], [])
+        graph.db = db
+        graph.llm_a = _SlowLLM([], ok)
+        graph.llm_b = _SlowLLM([], ok)
+
+        session = db.get_session()
+        for sid, answers in (("s1", ["盖房子"]), ("s2", []), ("s3", ["压纸", "当锤子"])):
+            session.add(AssessmentSessionDB(
+                session_id=sid, student_id=f"stu_{sid}", student_name="测试", start_time=datetime.now(),
+                end_time=datetime.now(),
+                questions=[{"id": f"q{i}", "content": "列举砖头的用途"} for i in range(len(answers))],
+                answers=[{"question_id": f"q{i}", "content": a} for i, a in enumerate(answers)],
+            ))
+        session.add(AssessmentResultDB(
+            result_id="old", session_id="s1", student_id="stu_s1", student_name="测试", total_score=1.0,
+            dimension_scores=[], overall_level="一般", recommendations=[], completed_at=datetime.now(),
+        ))
+        session.commit()
+        session.close()
+
+        rescorer = BulkRescorer(graph, db=db, job_id="t", chunk_size=1, concurrency=2)
+        first = rescorer.run(max_sessions=2)
+        assert first["sessions"] == 2 and first["answers"] == 1
+        assert db.get_rescore_checkpoint("t")["last_session_id"] == "s2"
+
+        second = rescorer.run()
+        assert second["resumed_from"] == "s2" and second["sessions"] == 1 and second["answers"] == 2
+        results = {r.session_id: r for r in db.get_all_assessment_results()}
+        assert set(results) == {"s1", "s3"}
+        assert results["s1"].total_score == 32.0 and results["s1"].overall_level == "良好"
+        checkpoint = db.get_rescore_checkpoint("t")
+        assert checkpoint["answers_scored"] == 3 and checkpoint["sessions_done"] == 3  # 含无答案的 s2
+        from src.core.originality_index import question_key
+        assert db.get_idea_term_stats(question_key("列举砖头的用途"), [])[0] == 3  # 全部完成后重建独创性索引
+
+        # 评分服务持续不可用：整块重试有上限，且延后记录按 (会话, 题目) 去重
+        class _DownLLM:
+            model_name = "rescore-down-model"
+
+            async def ainvoke(self, messages):
+                raise ConnectionError("endpoint unreachable")
+
+        graph.llm_a = graph.llm_b = _DownLLM()
+        for i in range(5):
+            graph.score_answer("题目", f"预热{i}")
+        rescorer = BulkRescorer(graph, db=db, job_id="down", chunk_size=5)
+        rescorer.retry_wait_seconds, rescorer.max_chunk_retries = 0, 2
+        try:
+            rescorer.run()
+            assert False, "should give up after max_chunk_retries"
+        except RuntimeError:
+            pass
+        assert db.get_rescore_checkpoint("down") is None
+        pending = [p for p in db.get_pending_deferred_scores() if p["session_id"]]
+        assert sorted((p["session_id"], p["question_id"]) for p in pending) == [("s1", "q0"), ("s3", "q0"), ("s3", "q1")]
+        db.engine.dispose()
+    print("✅ 批量重新评分正常")
+    return True
+
+def test_jsonl_ingestion():
+    """测试离线测评JSONL批量导入"""
+    print("测试离线批量导入...")
+    import json
+    import tempfile
+    from src.core.rescoring import PENDING_LEVEL
+    from src.data.database import DatabaseManager
+
+    ok = '{"fluency": 6, "flexibility": 6, "originality": 6, "elaboration": 6, "comments": "ok"}'
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(f"sqlite:///{tmp}/ingest.db")
+        graph = _build_fake_graph([], [])
+        graph.db = graph.originality.db = db
+        graph.llm_a = _SlowLLM([], ok)
+        graph.llm_b = _SlowLLM([], ok)
+
+        path = os.path.join(tmp, "cohort.jsonl")
+        records = [
+            {"student_id": f"s{i}", "name": f"学生{i}", "age": 12, "grade": "六年级", "school": "实验小学",
+             "answers": [{"question": "请尽可能多地列举出砖头的用途。", "answer": f"盖房子{i}"},
+                         {"question": "请描述一个想象中的海底城市。", "type": "imagination", "answer": "透明穹顶"}]}
+            for i in range(5)
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.write('{"student_id": "bad", "answers": []}\n')
+            f.write("not json\n")
+
+        summary = graph.ingest_jsonl(path, concurrency=3)
+        assert summary["students"] == 5 and summary["answers"] == 10
+        assert summary["failed"] == 2 and {f["line"] for f in summary["failures"]} == {6, 7}
+        assert summary["answers_per_second"] > 0
+
+        results = db.get_assessment_results("s3")
+        assert len(results) == 1 and results[0].total_score == 24.0
+        assert db.get_student_profile("s3").school == "实验小学"
+        session = db.get_assessment_session(results[0].session_id)
+        assert session.status == "completed" and session.answers[0].content == "盖房子3"
+
+        from src.core.originality_index import question_key
+        assert db.get_idea_term_stats(question_key("请尽可能多地列举出砖头的用途。"), ["房子"]) == (5, {"房子": 5})
+
+        again = graph.ingest_jsonl(path)
+        assert again["students"] == 0 and again["skipped"] == 5
+
+        # 同一学生的多次测评并发导入：首次插入档案冲突后重试，两次测评都写入
+        retakes = os.path.join(tmp, "retakes.jsonl")
+        with open(retakes, "w", encoding="utf-8") as f:
+            for i in range(4):
+                f.write(json.dumps({"student_id": "retake", "name": "重测学生", "session_id": f"retake_{i}",
+                                    "answers": [{"question": "请尽可能多地列举出砖头的用途。", "answer": f"答案{i}"}]},
+                                   ensure_ascii=False) + "\n")
+        summary = graph.ingest_jsonl(retakes, concurrency=4)
+        assert summary["students"] == 4 and summary["failed"] == 0
+        assert len(db.get_assessment_results("retake")) == 4
+
+        # 导入时评分服务不可用：结果标记为待评分，服务恢复后重新导入会重新评分而非跳过
+        class _DownLLM:
+            model_name = "ingest-down-model"
+
+            async def ainvoke(self, messages):
+                raise ConnectionError("endpoint unreachable")
+
+        graph.llm_a = graph.llm_b = _DownLLM()
+        for i in range(5):
+            graph.score_answer("题目", f"预热{i}")
+        late = os.path.join(tmp, "late.jsonl")
+        with open(late, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"student_id": "late", "name": "补录学生", "session_id": "late_1",
+                                "answers": [{"question": "请尽可能多地列举出砖头的用途。", "answer": "盖房子"}]},
+                               ensure_ascii=False) + "\n")
+        assert graph.ingest_jsonl(late)["deferred_answers"] == 1
+        assert db.get_assessment_result_level("late_1") == PENDING_LEVEL
+        graph.llm_a, graph.llm_b = _SlowLLM([], ok), _SlowLLM([], ok)
+        rerun = graph.ingest_jsonl(late)
+        assert rerun["students"] == 1 and rerun["skipped"] == 0 and rerun["deferred_answers"] == 0
+        results = db.get_assessment_results("late")
+        assert len(results) == 1 and results[0].total_score == 24.0
+        assert graph.ingest_jsonl(late)["skipped"] == 1
+        db.engine.dispose()
+    print("✅ 离线批量导入正常")
+    return True
+
+def test_concurrent_assessments():
+    """测试多名学生测评并发运行、会话内答案并行评估"""
+    print("测试并发测评...")
+    import time
+    from src.core.config import Config
+
+    ok = '{"fluency": 5, "flexibility": 6, "originality": 7, "elaboration": 8, "comments": "ok"}'
+    graph = _build_fake_graph([], [])
+    graph.llm_a = _SlowLLM([0.2] * 100, ok)
+    graph.llm_b = _SlowLLM([0.2] * 100, ok)
+
+    students = [(f"stu{i}", f"学生{i}") for i in range(4)]
+    started = time.time()
+    results = graph.run_assessments(students, max_concurrency=4)
+    elapsed = time.time() - started
+    assert [r["student_id"] for r in results] == ["stu0", "stu1", "stu2", "stu3"]
+    assert len({r["session_id"] for r in results}) == 4
+    for r in results:
+        assert len(r["session_data"]["evaluations"]) == Config.MAX_QUESTIONS
+        assert r["session_data"]["final_results"]["total_score"] == 26.0
+    # 4 名学生 × MAX_QUESTIONS 题 × 2 个Agent，每次调用 0.2 秒，串行需数秒
+    assert elapsed < 2.0, elapsed
+
+    single = graph.run_assessment("stu_single", "单人")
+    assert single["session_data"]["final_results"]["total_score"] == 26.0
+    print("✅ 并发测评正常")
+    return True
+
+def test_graph_checkpoint_resume():
+    """测试测评工作流检查点持久化与中断续跑"""
+    print("测试检查点续跑...")
+    import asyncio
+    import tempfile
+    from src.core.checkpointer import DatabaseCheckpointSaver
+    from src.core.config import Config
+    from src.core.score_cache import ScoreCache
+    from src.data.database import DatabaseManager, GraphWriteDB
+
+    ok = '{"fluency": 6, "flexibility": 6, "originality": 6, "elaboration": 6, "comments": "ok"}'
+
+    class _CountingLLM(_SlowLLM):
+        calls = 0
+
+        async def ainvoke(self, messages):
+            _CountingLLM.calls += 1
+            return await super().ainvoke(messages)
+
+    def build(db):
+        graph = _build_fake_graph([], [])
+        graph.db = db
+        graph.score_cache = ScoreCache(db=db)
+        graph.llm_a = _CountingLLM([], ok)
+        graph.llm_b = _CountingLLM([], ok)
+        graph.checkpointer = DatabaseCheckpointSaver(db)
+        graph.graph = graph._build_graph()
+        return graph
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(f"sqlite:///{tmp}/checkpoint.db")
+        graph = build(db)
+        real_score = graph.ascore_answer
+        seen = []
+
+        async def crashing_score(question_content, answer_text, session_id=None, question_id=None):
+            seen.append(question_id)
+            if len(seen) > 1:
+                await asyncio.sleep(0.2)
+                raise RuntimeError("simulated crash")
+            return await real_score(question_content, answer_text, session_id, question_id)
+
+        graph.ascore_answer = crashing_score
+        try:
+            graph.run_assessment("stu", "学生", session_id="resume-1")
+            assert False, "应当中断"
+        except RuntimeError:
+            pass
+        snapshot = build(db).graph.get_state({"configurable": {"thread_id": "resume-1"}})
+        assert snapshot.next == ("evaluate_answers",)
+        collected = [(a.question_id, a.time_spent) for a in snapshot.values["answers"]]
+        assert len(collected) == Config.MAX_QUESTIONS
+
+        # 模拟进程重启：新实例从检查点继续，已评分的答案命中缓存
+        _CountingLLM.calls = 0
+        resumed = build(db).run_assessment("stu", "学生", session_id="resume-1")
+        assert [(a.question_id, a.time_spent) for a in resumed["answers"]] == collected
+        assert len(resumed["session_data"]["evaluations"]) == Config.MAX_QUESTIONS
+        assert _CountingLLM.calls == 2 * (Config.MAX_QUESTIONS - 1)
+
+        # 测评正常结束后删除该会话的检查点与写入
+        assert db.list_graph_checkpoints("resume-1") == []
+        session = db.get_session()
+        assert session.query(GraphWriteDB).filter(GraphWriteDB.thread_id == "resume-1").count() == 0
+        session.close()
+        finished = build(db).run_assessment("stu", "学生")
+        assert db.list_graph_checkpoints(finished["session_id"]) == []
+        batch = build(db).run_assessments([("stu2", "学生2")])
+        assert db.list_graph_checkpoints(batch[0]["session_id"]) == []
+        db.engine.dispose()
+    print("✅ 检查点续跑正常")
+    return True
+
+def test_shared_http_transport():
+    """测试所有LLM客户端共享HTTP连接池并复用长连接"""
+    print("测试共享HTTP连接池...")
+    import asyncio
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from langchain_openai import ChatOpenAI
+    from src.core.http_transport import chat_client_kwargs, http_pool_stats
+
+    ok = '{"fluency": 6, "flexibility": 6, "originality": 6, "elaboration": 6, "comments": "ok"}'
+    body = json.dumps({
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "local",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": ok}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }).encode("utf-8")
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        first, second = _build_fake_graph([], []), _build_fake_graph([], [])
+        from src.core.creativity_graph import CreativityAssessmentGraph
+        real = CreativityAssessmentGraph()
+        other = CreativityAssessmentGraph()
+        assert real.llm_a.http_async_client is other.llm_b.http_async_client
+        assert real.llm_a.http_client is other.llm_b.http_client
+
+        local = ChatOpenAI(openai_api_key="sk-test", base_url=f"http://127.0.0.1:{server.server_port}/v1",
+                           model="local-shared-pool", max_retries=0, **chat_client_kwargs())
+        first.llm_a = first.llm_b = second.llm_a = second.llm_b = local
+        before = http_pool_stats()["requests"]
+        for i in range(3):
+            assert first.score_answer("列举砖头的用途", f"答案{i}")["fluency"] == 6.0
+            assert second.score_answer("列举砖头的用途", f"回答{i}")["fluency"] == 6.0
+        stats = http_pool_stats()
+        assert stats["requests"] - before == 12
+        assert 1 <= stats["async"]["connections"] <= 2  # 两个Agent并发，各复用一条长连接
+
+        # 共享事件循环之外（asyncio.run）调用同一客户端：使用该循环自己的连接池
+        for _ in range(2):
+            reply = asyncio.run(local.ainvoke("列举砖头的用途"))
+            assert json.loads(reply.content)["fluency"] == 6
+        assert http_pool_stats()["requests"] - before == 14
+    finally:
+        server.shutdown()
+    print("✅ 共享HTTP连接池正常")
+    return True
+
+def test_ensemble_scoring():
+    """测试N评分者集成：法定人数一致时提前结束并取消慢评分者"""
+    print("测试多评分者集成...")
+    import time
+    from src.core.ensemble import EnsembleScorer, RaterConfig, aggregate_scores, parse_rater_configs
+
+    raters = parse_rater_configs('[{"model": "m1"}, {"model": "m2"}, {"model": "m3", "temperature": 0.5}]')
+    assert [r.name for r in raters] == ["Rater1", "Rater2", "Rater3"]
+    assert aggregate_scores([{"fluency": 1}, {"fluency": 5}, {"fluency": 9}])["fluency"] == 5.0
+    assert aggregate_scores([{"fluency": 1}, {"fluency": 5}, {"fluency": 6}, {"fluency": 7}, {"fluency": 100}],
+                            "trimmed_mean", 0.2)["fluency"] == 6.0
+
+    def reply(f, o):
+        return '{"fluency": %s, "flexibility": 6, "originality": %s, "elaboration": 5, "comments": "ok"}' % (f, o)
+
+    graph = _build_fake_graph([], [])
+    slow = _SlowLLM([2.0], reply(2, 2))
+    graph.ensemble = EnsembleScorer(graph, raters, clients=[
+        _SlowLLM([0.05], reply(8, 6)), _SlowLLM([0.1], reply(7, 7)), slow], quorum=2, tolerance=1.0)
+    started = time.perf_counter()
+    scores = graph.score_answer("列举砖头的用途", "盖房子、压纸、当锤子、垫桌脚")
+    assert time.perf_counter() - started < 1.0  # 未等待慢评分者
+    assert scores["fluency"] == 7.5 and scores["originality"] == 6.5
+    assert scores["raters"] == 2 and scores["quorum"] is True
+    assert graph.ensemble.stats()["cancelled_calls"] == 1
+
+    # 无法达成一致时等待全部评分者，按中位数聚合
+    graph.ensemble = EnsembleScorer(graph, [RaterConfig(name=f"R{i}") for i in range(3)], clients=[
+        _SlowLLM([0.05], reply(2, 2)), _SlowLLM([0.1], reply(9, 5)), _SlowLLM([0.15], reply(5, 9))],
+        quorum=2, tolerance=1.0, aggregation="median")
+    scores = graph.score_answer("列举砖头的用途", "盖房子")
+    assert scores["fluency"] == 5.0 and scores["originality"] == 5.0
+    assert scores["raters"] == 3 and "quorum" not in scores
+
+    # 评分者温度或角色提示变化时缓存键随之变化，不复用旧评分
+    key = graph._score_cache_key("列举砖头的用途", "盖房子")
+    graph.ensemble.raters[0].temperature = 0.7
+    warmer = graph._score_cache_key("列举砖头的用途", "盖房子")
+    graph.ensemble.raters[0].role_hint = "严格的评分者"
+    assert len({key, warmer, graph._score_cache_key("列举砖头的用途", "盖房子")}) == 3
+    print("✅ 多评分者集成正常")
+    return True
+
+def test_streaming_scoring():
+    """测试流式评分：增量解析分数并在评语达到上限后提前结束"""
+    print("测试流式评分...")
+    from src.core.config import Config
+    from src.core.stream_parser import IncrementalScoreParser
+
+    parser = IncrementalScoreParser()
+    assert parser.feed('```json\n{"fluency": 8, "flexibility": 6') == ["fluency"]
+    assert parser.feed('.5, "originality": 5, "elaboration": 4, "comments": "很好\\"') == [
+        "flexibility", "originality", "elaboration"]
+    assert parser.scores_ready and parser.partial("comments") == '很好"'
+    assert parser.should_stop(2) and not parser.should_stop(10)
+
+    long_a = '{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4, "comments": "%s"}' % ("甲" * 300)
+    long_b = '{"fluency": 6, "flexibility": 6, "originality": 7, "elaboration": 4, "comments": "%s"}' % ("乙" * 300)
+    saved = (Config.SCORING_STREAM_ENABLED, Config.SCORING_STREAM_COMMENT_CHARS)
+    Config.SCORING_STREAM_ENABLED, Config.SCORING_STREAM_COMMENT_CHARS = True, 10
+    try:
+        graph = _build_fake_graph([long_a], [long_b])
+        scores = graph.score_answer("列举砖头的用途", "盖房子、压纸、当锤子")
+    finally:
+        Config.SCORING_STREAM_ENABLED, Config.SCORING_STREAM_COMMENT_CHARS = saved
+    assert scores["fluency"] == 7.0 and scores["originality"] == 6.0
+    assert scores["comments"] == "A: %s | B: %s" % ("甲" * 10, "乙" * 10)
+    stats = graph.stream_stats()
+    assert stats["streams"] == 2 and stats["early_stops"] == 2 and stats["fallbacks"] == 0
+    assert stats["first_score"]["AgentA.first_score"]["count"] == 1
+    print("✅ 流式评分正常")
+    return True
+
+def test_singleflight_scoring():
+    """测试相同答案的并发评分请求合并为一次LLM调用"""
+    print("测试并发请求合并...")
+    import asyncio
+    from src.core.event_loop import run_sync
+
+    reply = '{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4, "comments": "ok"}'
+    graph = _build_fake_graph([], [])
+    graph.llm_a, graph.llm_b = _SlowLLM([0.1, 0.1, 0.1], reply), _SlowLLM([0.1, 0.1, 0.1], reply)
+
+    async def burst():
+        return await asyncio.gather(
+            graph.ascore_answer("列举砖头的用途", "盖房子、压纸", "s1", "q1"),
+            graph.ascore_answer("列举砖头的用途", " 盖房子、压纸 ", "s1", "q1"),
+            graph.ascore_answer("列举砖头的用途", "盖房子、压纸", "s2", "q1"),
+            graph.ascore_answer("列举砖头的用途", "当锤子", "s1", "q2"),
+        )
+
+    results = run_sync(burst())
+    assert len(graph.llm_a.delays) == 1 and len(graph.llm_b.delays) == 1  # 两组不同答案各调用一次
+    assert [bool(r.get("coalesced")) for r in results] == [False, True, True, False]
+    assert all(r["fluency"] == 8.0 for r in results)
+    assert results[0] is not results[1]
+    assert graph.singleflight.stats() == {"leaders": 2, "followers": 2, "in_flight": 0}
+    print("✅ 并发请求合并正常")
+    return True
+
+class _ScriptedLLM:
+    """按顺序抛出异常或返回文本的假LLM，记录收到的提示词（各实例使用独立的熔断器）"""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.prompts = []
+        self.model_name = f"scripted-{id(self)}"
+
+    async def ainvoke(self, messages):
+        from types import SimpleNamespace
+        self.prompts.append(messages[-1].content)
+        step = self.steps.pop(0)
+        if isinstance(step, BaseException):
+            raise step
+        return SimpleNamespace(content=step)
+
+def test_retry_policy():
+    """测试评分调用的分类重试：限流退避遵循 Retry-After、解析失败重新请求、截止时间"""
+    print("测试评分重试策略...")
+    import time
+    import httpx
+    import openai
+    from src.core.retry import RetryPolicy, classify_error, retry_after_seconds
+
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+
+    def status_error(cls, status, headers=None):
+        return cls("error", response=httpx.Response(status, headers=headers or {}, request=request), body=None)
+
+    limited = status_error(openai.RateLimitError, 429, {"retry-after": "0.2"})
+    assert classify_error(limited) == "rate_limit" and retry_after_seconds(limited) == 0.2
+    assert classify_error(status_error(openai.InternalServerError, 503)) == "server"
+    assert classify_error(openai.APIConnectionError(request=request)) == "transport"
+    assert classify_error(status_error(openai.AuthenticationError, 401)) == "fatal"
+
+    ok = '{"fluency": 8, "flexibility": 6, "originality": 5, "elaboration": 4, "comments": "ok"}'
+    graph = _build_fake_graph([], [])
+    graph.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05, transport_delay=0.01)
+    graph.llm_a = _ScriptedLLM([limited, ok])
+    graph.llm_b = _ScriptedLLM(['{"fluency": 6, "flexibility": 6, "originality": 7, "elaboration"', ok])
+    started = time.perf_counter()
+    scores = graph.score_answer("列举砖头的用途", "盖房子、压纸、当锤子")
+    assert time.perf_counter() - started >= 0.2  # 等待了 Retry-After
+    assert scores["fluency"] == 8.0 and "自动评分" not in scores["comments"]
+    assert "无法解析" in graph.llm_b.prompts[1] and "无法解析" not in graph.llm_b.prompts[0]
+    stats = graph.retry_stats()
+    assert stats["retry_rate_limit"] == 1 and stats["retry_parse"] == 1 and stats["success_after_retry"] == 2
+
+    # 持续的服务端错误在达到次数上限后放弃；致命错误不重试
+    graph.llm_a = _ScriptedLLM([status_error(openai.InternalServerError, 500)] * 3)
+    graph.llm_b = _ScriptedLLM([status_error(openai.AuthenticationError, 401)])
+    scores = graph.score_answer("列举砖头的用途", "当锤子")
+    assert graph.llm_a.steps == [] and graph.llm_b.steps == []
+    assert "自动评分" in scores["comments"]
+    stats = graph.retry_stats()
+    assert stats["gave_up_server"] == 1 and stats["gave_up_fatal"] == 1
+
+    # 退避时间超出截止时间时直接放弃
+    from src.core.config import Config
+    saved = Config.SCORING_DEADLINE_SECONDS
+    Config.SCORING_DEADLINE_SECONDS = 0.1
+    try:
+        graph.llm_a = _ScriptedLLM([status_error(openai.RateLimitError, 429, {"retry-after": "5"}), ok])
+        graph.llm_b = _ScriptedLLM([ok])
+        started = time.perf_counter()
+        scores = graph.score_answer("列举砖头的用途", "垫桌脚")
+    finally:
+        Config.SCORING_DEADLINE_SECONDS = saved
+    assert time.perf_counter() - started < 1.0
+    assert scores["fluency"] == 8.0 and graph.retry_stats()["deadline_exceeded"] == 1
+    print("✅ 评分重试策略正常")
+    return True
+
+def test_question_index():
+    """测试题库索引的分层抽样与维度覆盖"""
+    print("测试题库索引...")
+    import random
+    from src.core.question_bank import FILE_MAP, QuestionIndex, _build_item, get_question_index
+    from src.data.models import CreativityDimension, QuestionType
+
+    bank = {t: [_build_item(t, i + 1) for i in range(2000)] for t in FILE_MAP}
+    bank[QuestionType.IMAGINATION.value] = bank[QuestionType.IMAGINATION.value][:2]
+    index = QuestionIndex(bank)
+    assert len(index) == 6002 and index.get("div_7").type == QuestionType.DIVERGENT_THINKING
+    rng = random.Random(7)
+    for k in (3, 4, 8, 12):
+        questions = index.sample(k, rng)
+        assert len(questions) == len({q.id for q in questions}) == k
+        counts = {}
+        for q in questions:
+            counts[q.type] = counts.get(q.type, 0) + 1
+        if k >= 4:
+            assert len(counts) == 4 and max(counts.values()) - min(counts.values()) <= (k + 3) // 4
+        covered = {d for q in questions for d in q.dimensions}
+        if k >= 2:
+            assert covered == set(CreativityDimension)
+    assert len(index.sample(10000, rng)) == 6002
+
+    # 仅含单一维度组合的类型不足时，由其他类型补足
+    small = QuestionIndex({QuestionType.DIVERGENT_THINKING.value: bank[QuestionType.DIVERGENT_THINKING.value][:1],
+                           QuestionType.CONVERGENT_THINKING.value: bank[QuestionType.CONVERGENT_THINKING.value][:50]})
+    assert len(small.sample(5, rng)) == 5
+
+    graph_questions = get_question_index().sample(4)
+    assert all(q.content for q in graph_questions)
+    print("✅ 题库索引正常")
+    return True
+
+def test_mmap_question_bank():
+    """测试 JSONL + 偏移索引题库：转换、按ID查找与只读取被抽中题目的抽样"""
+    print("测试 mmap 题库...")
+    import json
+    import random
+    import tempfile
+    from src.core.question_bank import FILE_MAP, _build_item
+    from src.core.question_store import MmapQuestionIndex, convert_json_bank
+    from src.data.models import CreativityDimension, QuestionType
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for qtype, fname in FILE_MAP.items():
+            items = [_build_item(qtype, i + 1) for i in range(500)]
+            if qtype == QuestionType.IMAGINATION.value:
+                items.append({"id": "bad", "type": "unknown"})
+            with open(os.path.join(tmp, fname), "w", encoding="utf-8") as f:
+                json.dump(items, f, ensure_ascii=False)
+        path = os.path.join(tmp, "bank.jsonl")
+        assert convert_json_bank(tmp, path) == {"written": 2000, "skipped": 1}
+
+        index = MmapQuestionIndex(path)
+        try:
+            assert len(index) == 2000
+            assert index.get("con_42").content.startswith("请找出以下物品的共同点")
+            assert index.get_item("missing") is None
+            assert len(index.by_type[QuestionType.DIVERGENT_THINKING]) == 500
+            assert len(index.by_dimension[CreativityDimension.ORIGINALITY]) == 1500
+
+            reads = []
+            read_item = index.item
+            index.item = lambda pos: reads.append(pos) or read_item(pos)
+            questions = index.sample(6, random.Random(3))
+            assert len(reads) == 6 and len({q.id for q in questions}) == 6
+            assert {d for q in questions for d in q.dimensions} == set(CreativityDimension)
+            assert {q.type for q in questions} == set(QuestionType)
+        finally:
+            index.close()
+
+        # 题目数与文件大小相同但内容不同的新题库与旧索引混用时拒绝打开；仅 mtime 变化（复制）时仍可打开
+        import shutil
+        from src.core.question_store import index_paths, write_jsonl_bank
+        other = os.path.join(tmp, "other.jsonl")
+        with open(path, "r", encoding="utf-8") as f:
+            write_jsonl_bank(reversed([json.loads(line) for line in f]), other)
+        assert os.path.getsize(other) == os.path.getsize(path)
+        saved = os.path.join(tmp, "saved.jsonl")
+        shutil.copyfile(path, saved)
+        shutil.copyfile(other, path)
+        try:
+            MmapQuestionIndex(path)
+            assert False, "stale index accepted"
+        except ValueError:
+            pass
+        shutil.copyfile(saved, path)
+        os.utime(path, ns=(1, 1))
+        MmapQuestionIndex(path).close()
+        shutil.copyfile(index_paths(other)[1], index_paths(path)[1])
+        try:
+            MmapQuestionIndex(path)
+            assert False, "mixed index generations accepted"
+        except ValueError:
+            pass
+
+        # 首次加载时 JSONL 题库无法打开：回退JSON题库而不是让抽题失败
+        from src.core import question_bank, question_store
+        from src.core.config import Config
+        saved = (question_bank.QUESTIONS_DIR, question_bank._index, question_bank._cache, question_bank._signature,
+                 question_store.JSONL_BANK_PATH, Config.QUESTION_BANK_RELOAD_SECONDS)
+        try:
+            question_bank.QUESTIONS_DIR, question_bank._index, question_bank._cache = tmp, None, {}
+            question_store.JSONL_BANK_PATH, Config.QUESTION_BANK_RELOAD_SECONDS = path, 0
+            index = question_bank.get_question_index()
+            assert not isinstance(index, MmapQuestionIndex) and index.get("con_42") is not None
+        finally:
+            (question_bank.QUESTIONS_DIR, question_bank._index, question_bank._cache, question_bank._signature,
+             question_store.JSONL_BANK_PATH, Config.QUESTION_BANK_RELOAD_SECONDS) = saved
+    print("✅ mmap 题库正常")
+    return True
+
+def test_question_bank_reload():
+    """测试题库文件变化后后台重新加载并原子替换快照"""
+    print("测试题库热更新...")
+    import json
+    import tempfile
+    import time
+    from src.core import question_bank
+    from src.core.question_bank import FILE_MAP, QuestionBankReloader, _build_item, get_question_index, reload_question_bank
+    from src.core import question_store
+    from src.core.config import Config
+    from src.core.question_store import convert_json_bank
+    from src.data.models import QuestionType
+
+    def write_bank(directory, extra=None, raw=None):
+        for qtype, fname in FILE_MAP.items():
+            items = [_build_item(qtype, i + 1) for i in range(10)]
+            if qtype == QuestionType.DIVERGENT_THINKING.value and extra:
+                items.append(extra)
+            with open(os.path.join(directory, fname), "w", encoding="utf-8") as f:
+                if raw is not None and qtype == QuestionType.DIVERGENT_THINKING.value:
+                    f.write(raw)
+                else:
+                    json.dump(items, f, ensure_ascii=False)
+
+    saved = (question_bank.QUESTIONS_DIR, question_bank._index, question_bank._cache, question_bank._signature)
+    saved_store = (question_store.JSONL_BANK_PATH, Config.QUESTION_BANK_CLOSE_GRACE_SECONDS)
+    global_reloader = question_bank._reloader
+    if global_reloader is not None:
+        global_reloader.stop()  # 避免进程级重新加载线程与本测试的轮询交错
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            question_bank.QUESTIONS_DIR = tmp
+            write_bank(tmp)
+            assert reload_question_bank(force=True)
+            old = get_question_index()
+            assert len(old) == 40
+
+            extra = dict(_build_item(QuestionType.DIVERGENT_THINKING.value, 99), id="div_new", content="新增题目")
+            write_bank(tmp, extra=extra)
+            reloader = QuestionBankReloader(interval=0.05)
+            assert not reloader.poll()  # 首次发现变化，等待文件写完
+            assert reloader.poll() and reloader.reloads == 1
+            new = get_question_index()
+            assert new is not old and new.get("div_new").content == "新增题目"
+            assert old.get("div_new") is None and len(old.sample(4)) == 4  # 旧快照仍可继续使用
+
+            write_bank(tmp, raw='[{"id": "div_1", ')  # 写入中途的损坏文件
+            assert not reloader.poll() and not reloader.poll()
+            assert get_question_index() is new
+
+            write_bank(tmp)
+            reloader.start()
+            for _ in range(100):
+                if get_question_index() is not new:
+                    break
+                time.sleep(0.02)
+            reloader.stop()
+            assert get_question_index().get("div_new") is None and len(get_question_index()) == 40
+
+            # 存在 JSONL 题库时只监视 JSONL 及其索引；替换后旧 mmap 快照在宽限期后关闭
+            question_store.JSONL_BANK_PATH = os.path.join(tmp, "bank.jsonl")
+            Config.QUESTION_BANK_CLOSE_GRACE_SECONDS = 0
+            convert_json_bank(tmp, question_store.JSONL_BANK_PATH)
+            assert reload_question_bank(force=True)
+            mmap_old = get_question_index()
+            assert len(mmap_old) == 40
+            reloader = QuestionBankReloader(interval=0.05)
+            reloader.poll()
+            write_bank(tmp, extra=extra)
+            assert not reloader.poll() and not reloader.poll()  # JSON题库的修改不会触发无效的重新加载
+            convert_json_bank(tmp, question_store.JSONL_BANK_PATH)
+            assert not reloader.poll() and reloader.poll()
+            assert get_question_index().get("div_new").content == "新增题目"
+            for _ in range(100):
+                if mmap_old._file.closed:
+                    break
+                time.sleep(0.01)
+            assert mmap_old._file.closed
+        finally:
+            (question_bank.QUESTIONS_DIR, question_bank._index,
+             question_bank._cache, question_bank._signature) = saved
+            question_store.JSONL_BANK_PATH, Config.QUESTION_BANK_CLOSE_GRACE_SECONDS = saved_store
+            if global_reloader is not None:
+                global_reloader.start()
+    print("✅ 题库热更新正常")
+    return True
+
+def test_question_generator():
+    """测试题库生成：组合空间枚举、内容去重、多进程分片合并与LLM扩充填充项"""
+    print("测试题库生成...")
+    import json
+    import tempfile
+    from src.core.event_loop import run_sync
+    from src.core.question_generator import (DEFAULT_SLOT_VALUES, aexpand_slot_values, build_candidate,
+                                             generate_question_bank, space_size)
+    from src.core.question_store import MmapQuestionIndex
+    from src.data.models import QuestionType
+
+    divergent = QuestionType.DIVERGENT_THINKING.value
+    assert space_size(divergent, DEFAULT_SLOT_VALUES) == 640
+    item = build_candidate(divergent, DEFAULT_SLOT_VALUES, 5)
+    assert item == {**build_candidate(divergent, DEFAULT_SLOT_VALUES, 5), "generated_at": item["generated_at"]}
+
+    llm = _SlowLLM([0, 0], "1. 纸杯\n- 砖头\n牙刷\n")
+    slots = run_sync(aexpand_slot_values(llm, {"主题": ["砖头", "雨伞"]}, per_slot=40, batch=20))
+    assert slots == {"主题": ["砖头", "雨伞", "纸杯", "牙刷"]}
+
+    class _ListLLM:
+        """依次返回不同列表并记录提示词的假LLM"""
+
+        def __init__(self, replies):
+            self.replies, self.prompts = list(replies), []
+
+        async def ainvoke(self, messages):
+            from types import SimpleNamespace
+            self.prompts.append(messages[0].content)
+            return SimpleNamespace(content=self.replies.pop(0))
+
+    llm = _ListLLM(["纸杯\n牙刷", "铅笔\n纸杯", "橡皮"])
+    slots = run_sync(aexpand_slot_values(llm, {"主题": ["砖头"]}, per_slot=4, batch=2))
+    assert slots == {"主题": ["砖头", "纸杯", "牙刷", "铅笔"]}
+    assert "纸杯、牙刷" in llm.prompts[1]  # 同一槽位的后续批次带上已收集的值
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.jsonl")
+        summary = generate_question_bank(output=path, workers=2, include_existing=False)
+        assert summary["types"][divergent] == {"space": 640, "candidates": 640, "unique": 640, "yield": 1.0}
+        report = summary["types"][QuestionType.CREATIVE_PROBLEM_SOLVING.value]
+        assert 0 < report["unique"] < report["candidates"]  # 不含数量要求的题干变体产生重复
+        assert summary["written"] == summary["unique"] and summary["yield"] < 1
+        index = MmapQuestionIndex(path)
+        try:
+            assert len(index) == summary["unique"]
+            contents = [index.item(pos)["content"] for pos in range(len(index))]
+            assert len(set(contents)) == len(contents)
+        finally:
+            index.close()
+
+        with open(path, "a", encoding="utf-8") as f:  # 如以 convert_question_bank.py --input 导入的教师出题
+            f.write(json.dumps({"id": "teacher_1", "type": divergent, "title": "教师出题", "content": "回形针能做什么？",
+                                "dimensions": ["fluency"]}, ensure_ascii=False) + "\n")
+        limited = generate_question_bank(per_type=50, output=path, workers=1, include_existing=True)
+        assert all(r["candidates"] == 50 for r in limited["types"].values())
+        assert limited["written"] == limited["existing"] + limited["unique"]
+        assert limited["existing"] > summary["written"]
+        index = MmapQuestionIndex(path)
+        try:
+            assert index.get("teacher_1").content == "回形针能做什么？"
+        finally:
+            index.close()
+        assert not [f for f in os.listdir(tmp) if "shard" in f or f.endswith(".tmp")]
+    print("✅ 题库生成正常")
+    return True
+
+def test_question_no_repeat():
+    """测试学生已做题目集合：位图序列化、抽样跳过已做题目、创建会话时更新"""
+    print("测试不重复抽题...")
+    import random
+    import tempfile
+    from src.core.question_bank import FILE_MAP, QuestionIndex, _build_item
+    from src.core.question_store import MmapQuestionIndex, write_jsonl_bank
+    from src.core.seen_set import SeenSet, question_key
+    from src.data.database import DatabaseManager
+    from src.data.models import AssessmentSession
+
+    keys = list(range(5000)) + [1 << 20, 0xFFFFFFFF]
+    seen = SeenSet(keys)
+    assert len(seen) == len(keys) and not seen.add(4999) and 4999 in seen and 5000 not in seen
+    restored = SeenSet.from_bytes(seen.to_bytes())
+    assert len(restored) == len(keys) and all(k in restored for k in keys) and (1 << 21) not in restored
+    assert len(SeenSet.from_bytes(None)) == 0
+    # 超过32位的键（如完整的64位 id_hash）在加入、查询与序列化时一致截断为32位
+    from src.core.seen_set import id_hash
+    wide = SeenSet([id_hash("con_1")])
+    assert id_hash("con_1") in wide and question_key("con_1") in wide
+    assert question_key("con_1") in SeenSet.from_bytes(wide.to_bytes())
+
+    bank = {t: [_build_item(t, i + 1) for i in range(20)] for t in FILE_MAP}
+    index = QuestionIndex(bank)
+    rng = random.Random(3)
+    seen = SeenSet()
+    drawn = set()
+    for _ in range(10):  # 80 道题每次抽 8 道，十次恰好不重复地抽完
+        questions = index.sample(8, rng, seen=seen)
+        ids = {q.id for q in questions}
+        assert len(ids) == 8 and not ids & drawn
+        drawn |= ids
+        seen.add_question_ids(ids)
+    assert len(drawn) == 80
+    assert len(index.sample(8, rng, seen=seen)) == 8  # 全部做过后允许重复
+    fresh = {q.id for q in index.sample(8, rng, seen=SeenSet(index.key(p) for p in range(77)))}
+    assert len(fresh) == 8 and {q.id for q in index.questions[77:]} <= fresh
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.jsonl")
+        write_jsonl_bank((item for items in bank.values() for item in items), path)
+        mmap_index = MmapQuestionIndex(path)
+        try:
+            assert all(mmap_index.key(p) == question_key(mmap_index.question(p).id) for p in range(len(mmap_index)))
+            half = SeenSet(mmap_index.key(p) for p in range(0, 80, 2))
+            assert not {mmap_index.key(p) for p in mmap_index.sample_positions(12, rng, seen=half)} & set(
+                mmap_index.key(p) for p in range(0, 80, 2))
+        finally:
+            mmap_index.close()
+
+        db = DatabaseManager(f"sqlite:///{tmp}/seen.db")
+        questions = index.sample(4, rng)
+        assert db.create_assessment_session(AssessmentSession(
+            session_id="s1", student_id="stu", student_name="测试学生", start_time=datetime.now(),
+            questions=questions))
+        assert db.add_seen_questions("stu", [questions[0].id, "extra"])
+        stored = db.get_seen_questions("stu")
+        assert len(stored) == 5 and all(question_key(q.id) in stored for q in questions)
+        assert len(db.get_seen_questions("nobody")) == 0
+
+        # 同一学生的多次测评并发保存：结果全部保存，已做题目集合不丢失任何一次的题目
+        from concurrent.futures import ThreadPoolExecutor
+        from src.core.rescoring import build_assessment_result
+        from src.data.models import StudentProfile
+        now = datetime.now()
+        profile = StudentProfile(student_id="stu2", name="测试学生", age=12, grade="六年级", school="测试学校",
+                                 created_at=now, updated_at=now)
+
+        def save(i):
+            session = AssessmentSession(session_id=f"c{i}", student_id="stu2", student_name="测试学生",
+                                        start_time=now, end_time=now, status="completed",
+                                        questions=index.questions[i * 4:i * 4 + 4])
+            result = build_assessment_result(f"c{i}", "stu2", "测试学生", [])
+            return db.save_completed_assessment(profile, session, result)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert all(pool.map(save, range(8)))
+        stored = db.get_seen_questions("stu2")
+        assert len(stored) == 32 and all(question_key(q.id) in stored for q in index.questions[:32])
+        db.engine.dispose()
+    print("✅ 不重复抽题正常")
+    return True
+
+class _QueueGraph:
+    """评分队列测试用的假测评图：按答案文本返回评分，答案为 boom 时抛出异常"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = []
+        self.deferred = []
+
+    async def ascore_answer(self, question_content, answer_text, session_id, question_id):
+        import asyncio
+        self.calls.append((session_id, question_id, answer_text))
+        await asyncio.sleep(self.delay)
+        if answer_text == "boom":
+            raise RuntimeError("boom")
+        return {"answer": answer_text}
+
+    def defer_scoring(self, question_content, answer_text, reason, session_id, question_id):
+        self.deferred.append((session_id, question_id, answer_text, reason))
+        return {"deferred": True}
+
+def test_scoring_queue():
+    """测试后台评分队列：重复提交取消旧任务、按会话收集结果、失败与超时的题目登记延后评分"""
+    print("测试评分队列...")
+    from src.core.scoring_queue import ScoringQueue
+
+    graph = _QueueGraph(0.05)
+    queue = ScoringQueue(graph, max_workers=1)
+    queue.submit("s1", "q1", "题目", "slow")
+    old = queue.submit("s1", "q2", "题目", "old")
+    queue.submit("s1", "q2", "题目", "new")  # 旧任务尚在排队，被取消
+    queue.submit("s2", "q1", "题目", "other")
+    queue.submit("s1", "q3", "题目", "boom")
+    assert old.cancelled()
+
+    results = queue.collect("s1", timeout=5)
+    assert results == {"q1": {"answer": "slow"}, "q2": {"answer": "new"}, "q3": {"deferred": True}}
+    assert graph.deferred == [("s1", "q3", "boom", "scoring_failed")]
+    assert ("s1", "q2", "old") not in graph.calls
+    assert queue.stats()["tracked_jobs"] == 1  # 只清理 s1 的任务
+    assert queue.collect("s2", timeout=5) == {"q1": {"answer": "other"}}
+    assert queue.pending("s2") == 0 and queue.collect("s2") == {}
+    stats = queue.stats()
+    assert stats["completed"] == 3 and stats["failed"] == 1 and stats["tracked_jobs"] == 0
+
+    # 超时仍在评分的题目按会话与题目登记延后评分，不以默认分作为最终结果
+    graph.delay = 0.5
+    queue.submit("s3", "q1", "题目", "late")
+    assert queue.collect("s3", timeout=0.05) == {"q1": {"deferred": True}}
+    assert graph.deferred[-1] == ("s3", "q1", "late", "scoring_timeout")
+
+    import tempfile
+    from src.data.database import DatabaseManager
+    with tempfile.TemporaryDirectory() as tmp:
+        real = _build_fake_graph([], [])
+        real.db = DatabaseManager(f"sqlite:///{tmp}/queue.db")
+        assert real.defer_scoring("题目", "late", "scoring_timeout", "s3", "q1")["deferred"]
+        pending = real.db.get_pending_deferred_scores()
+        assert [(p["session_id"], p["question_id"]) for p in pending] == [("s3", "q1")]
+        real.db.engine.dispose()
+    print("✅ 评分队列正常")
+    return True
+
+def test_adaptive_scoring():
+    """测试自适应复评：复评原因判断、跳过与抽样复评、一致性统计、缓存键与延迟预算"""
+    print("测试自适应复评...")
+    import tempfile
+    import time
+    from src.core.config import Config
+    from src.core.score_cache import ScoreCache
+    from src.data.database import DatabaseManager
+
+    confident = '{"fluency": 9, "flexibility": 9, "originality": 9, "elaboration": 9}'
+    uncertain = '{"fluency": 6, "flexibility": 6, "originality": 6, "elaboration": 6}'
+    other = '{"fluency": 4, "flexibility": 6, "originality": 8, "elaboration": 6}'
+    answer = "可以当作花盆、书立和门挡"
+    saved = (Config.SCORING_ADAPTIVE, Config.SCORING_SECOND_OPINION_RATE, Config.SCORING_LATENCY_BUDGET)
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        Config.SCORING_ADAPTIVE, Config.SCORING_LATENCY_BUDGET = True, 0
+        graph = _build_fake_graph([], [])
+        graph.score_cache = ScoreCache(db=DatabaseManager(f"sqlite:///{tmp.name}/cache.db"))
+        scores = {k: 9 for k in ("fluency", "flexibility", "originality", "elaboration")}
+        Config.SCORING_SECOND_OPINION_RATE = 0
+        assert graph._second_opinion_reason(None, answer) == "agent_a_failed"
+        assert graph._second_opinion_reason({**scores, "fluency": "abc"}, answer) == "agent_a_failed"
+        assert graph._second_opinion_reason({k: 6 for k in scores}, answer) == "uncertain"
+        assert graph._second_opinion_reason({k: 6 for k in scores}, "好") is None  # 过短答案不复评
+        assert graph._second_opinion_reason(scores, answer) is None
+        Config.SCORING_SECOND_OPINION_RATE = 1
+        assert graph._second_opinion_reason(scores, answer) == "sampled"
+
+        # 确定性高且未抽中：只调用 Agent A，结果只在自适应版本下缓存，关闭自适应后不会被当作双Agent评分
+        Config.SCORING_SECOND_OPINION_RATE = 0
+        graph.llm_a, graph.llm_b = _ScriptedLLM([confident]), _ScriptedLLM([])
+        result = graph.score_answer("题目", answer)
+        assert result["second_opinion"] == "skipped" and not graph.llm_b.prompts
+        assert graph._cache_get(graph._score_cache_key("题目", answer)) is not None
+        Config.SCORING_ADAPTIVE = False
+        assert graph._cache_get(graph._score_cache_key("题目", answer)) is None
+        Config.SCORING_ADAPTIVE = True
+
+        # 不确定时复评，抽样复评计入无偏统计
+        graph.llm_a, graph.llm_b = _ScriptedLLM([uncertain]), _ScriptedLLM([other])
+        assert graph.score_answer("题目", answer + "1")["second_opinion"] == "uncertain"
+        Config.SCORING_SECOND_OPINION_RATE = 1
+        graph.llm_a, graph.llm_b = _ScriptedLLM([confident]), _ScriptedLLM([confident])
+        assert graph.score_answer("题目", answer + "2")["second_opinion"] == "sampled"
+        stats = graph.rater_agreement_stats()
+        assert stats["all"]["pairs"] == 2 and stats["sampled"]["pairs"] == 1
+        assert stats["all"]["fluency"] == 1.0 and stats["all"]["flexibility"] == 0.0
+        assert stats["sampled"]["originality"] == 0.0
+
+        # Agent B 超出延迟预算时取消，按单Agent评分返回且不缓存
+        Config.SCORING_LATENCY_BUDGET = 0.2
+        graph.llm_a, graph.llm_b = _ScriptedLLM([confident]), _SlowLLM([5], confident)
+        started = time.time()
+        result = graph.score_answer("题目", answer + "3")
+        assert time.time() - started < 1 and result["single_agent"]
+        assert graph._cache_get(graph._score_cache_key("题目", answer + "3")) is None
+    finally:
+        Config.SCORING_ADAPTIVE, Config.SCORING_SECOND_OPINION_RATE, Config.SCORING_LATENCY_BUDGET = saved
+        tmp.cleanup()
+    print("✅ 自适应复评正常")
+    return True
+
+def test_rate_limiter():
+    """测试LLM限流：令牌桶节流时间、TPM按实际用量退还/追扣、异常与取消时释放并发名额"""
+    print("测试LLM限流...")
+    import asyncio
+    import time
+    from types import SimpleNamespace
+    from src.core.config import Config
+    from src.core.rate_limit import ModelRateLimiter, TokenBucket, estimate_tokens
+
+    bucket = TokenBucket(10, 1)
+    assert bucket.reserve(1) == 0
+    assert 0.08 < bucket.reserve(1) <= 0.1 and 0.18 < bucket.reserve(1) <= 0.2  # 按到达顺序排队
+    bucket.adjust(100)
+    assert bucket._tokens == 1  # 退还不超过容量
+    assert TokenBucket(0, 1).reserve(1000) == 0  # rate<=0 表示不限
+
+    saved = Config.LLM_MAX_CONCURRENCY
+    try:
+        Config.LLM_MAX_CONCURRENCY = 1  # asyncio.run 使用新的事件循环，信号量按新配置创建
+
+        async def throttled():
+            limiter = ModelRateLimiter("rl-test", 20, 60000)
+            limiter.requests = TokenBucket(20, 1)
+            started = time.monotonic()
+            for _ in range(4):
+                async with limiter.slot("提示"):
+                    pass
+            return time.monotonic() - started, limiter.stats()
+
+        elapsed, stats = asyncio.run(throttled())
+        assert 0.13 < elapsed < 1 and stats["acquired"] == 4 and stats["in_flight"] == 0
+
+        async def usage():
+            limiter = ModelRateLimiter("rl-test", 0, 60)
+            limiter.tokens = TokenBucket(1e-6, 5000)
+            estimated = estimate_tokens("提示")
+            async with limiter.slot("提示") as lease:
+                reserved = limiter.tokens._tokens
+                lease.record_usage(SimpleNamespace(usage_metadata={"total_tokens": 50}))
+                refunded = limiter.tokens._tokens
+            async with limiter.slot("提示") as lease:
+                before = limiter.tokens._tokens
+                lease.record_usage(SimpleNamespace(usage_metadata={"total_tokens": estimated + 300}))
+                corrected = limiter.tokens._tokens
+                lease.record_usage(SimpleNamespace(usage_metadata={}))  # 无用量信息时不修正
+                assert limiter.tokens._tokens == corrected
+            return estimated, reserved, refunded, before, corrected
+
+        estimated, reserved, refunded, before, corrected = asyncio.run(usage())
+        assert abs(reserved - (5000 - estimated)) < 0.01
+        assert abs(refunded - (5000 - 50)) < 0.01
+        assert abs(corrected - (before - 300)) < 0.01
+
+        async def release():
+            limiter = ModelRateLimiter("rl-test", 0, 0)
+            try:
+                async with limiter.slot("提示"):
+                    raise RuntimeError("调用失败")
+            except RuntimeError:
+                pass
+            entered = asyncio.Event()
+
+            async def hold():
+                async with limiter.slot("提示"):
+                    entered.set()
+                    await asyncio.sleep(5)
+
+            holder = asyncio.ensure_future(hold())
+            await entered.wait()
+            waiter = asyncio.ensure_future(hold())  # 等待并发名额时被取消
+            await asyncio.sleep(0.01)
+            assert limiter.stats()["waiting"] == 1
+            waiter.cancel()
+            holder.cancel()
+            await asyncio.gather(holder, waiter, return_exceptions=True)
+            async with limiter.slot("提示"):
+                pass
+            return limiter.stats()
+
+        stats = asyncio.run(asyncio.wait_for(release(), timeout=2))
+        assert stats["in_flight"] == 0 and stats["waiting"] == 0 and stats["acquired"] == 3
+
+        async def two_models():
+            slow, fast = ModelRateLimiter("rl-slow", 2, 0), ModelRateLimiter("rl-fast", 0, 0)
+
+            async def call(limiter):
+                async with limiter.slot("提示"):
+                    await asyncio.sleep(0.01)
+                return time.monotonic()
+
+            started = time.monotonic()
+            throttled = [asyncio.ensure_future(call(slow)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            fast_done = await call(fast)
+            slow_done = await asyncio.gather(*throttled)
+            return fast_done - started, max(slow_done) - started
+
+        fast_elapsed, slow_elapsed = asyncio.run(two_models())
+        assert fast_elapsed < 0.3 and slow_elapsed > 0.45  # 慢模型节流等待时不占用唯一的并发名额
+    finally:
+        Config.LLM_MAX_CONCURRENCY = saved
+    print("✅ LLM限流正常")
+    return True
+
 def main():
     """主测试函数"""
     print("🧪 学生创造力测评系统 - 系统测试")
@@ -105,6 +1557,31 @@ def main():
         ("配置检查", test_config),
         ("数据库连接", test_database),
         ("创造力测评图", test_creativity_graph),
+        ("异步评分", test_async_scoring),
+        ("评分缓存", test_score_cache),
+        ("批量评分", test_batch_scoring),
+        ("延迟预算", test_latency_budget),
+        ("熔断器", test_circuit_breaker),
+        ("本地预评分", test_lexical_scorer),
+        ("统计独创性", test_originality_index),
+        ("近重复检测", test_near_duplicate),
+        ("批量重新评分", test_bulk_rescoring),
+        ("离线批量导入", test_jsonl_ingestion),
+        ("并发测评", test_concurrent_assessments),
+        ("检查点续跑", test_graph_checkpoint_resume),
+        ("共享HTTP连接池", test_shared_http_transport),
+        ("多评分者集成", test_ensemble_scoring),
+        ("流式评分", test_streaming_scoring),
+        ("并发请求合并", test_singleflight_scoring),
+        ("评分重试策略", test_retry_policy),
+        ("题库索引", test_question_index),
+        ("mmap题库", test_mmap_question_bank),
+        ("题库热更新", test_question_bank_reload),
+        ("题库生成", test_question_generator),
+        ("不重复抽题", test_question_no_repeat),
+        ("评分队列", test_scoring_queue),
+        ("自适应复评", test_adaptive_scoring),
+        ("LLM限流", test_rate_limiter),
     ]
     
     passed = 0